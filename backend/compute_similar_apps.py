@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Offline job that precomputes similar apps for the app store.
+
+    python compute_similar_apps.py              # write computed_similar_app_ids
+    python compute_similar_apps.py --dry-run    # print neighbours only
+
+Each app becomes a TF-IDF vector over the words of its name, short
+description, description and its category. The top-k cosine neighbours
+of every app are computed in batches and written to
+`computed_similar_app_ids`, which get_app_details serves after the
+curated `similar_app_ids`. Run it after catalog changes, e.g. nightly.
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent
+sys.path.append(str(backend_dir))
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv(backend_dir / '.env')
+
+TOKEN_PATTERN = re.compile(r"\w+")
+WRITE_CHUNK_SIZE = 1000
+
+def app_terms(app: dict) -> List[str]:
+    text = " ".join(app.get(field) or "" for field in ("name", "name", "short_description", "description"))
+    terms = [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1]
+    # Category as its own term so it can't collide with a description word
+    if app.get("category"):
+        terms.append(f"category:{app['category'].lower()}")
+    return terms
+
+def tfidf_matrix(documents: List[List[str]], max_df: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """L2-normalised TF-IDF rows stored column-wise (CSC): col_ptr, row_indices, values.
+
+    Terms in more than max_df of the documents carry little signal and make
+    the similarity products dense, so they are dropped.
+    """
+    rows, terms, counts = [], [], []
+    vocabulary: Dict[str, int] = {}
+    for row, document in enumerate(documents):
+        term_counts: Dict[int, int] = {}
+        for term in document:
+            index = vocabulary.setdefault(term, len(vocabulary))
+            term_counts[index] = term_counts.get(index, 0) + 1
+        rows.extend([row] * len(term_counts))
+        terms.extend(term_counts.keys())
+        counts.extend(term_counts.values())
+
+    n_docs = len(documents)
+    rows = np.asarray(rows, dtype=np.int64)
+    terms = np.asarray(terms, dtype=np.int64)
+    tf = 1.0 + np.log(np.asarray(counts, dtype=np.float64))  # sublinear term frequency
+
+    df = np.bincount(terms, minlength=len(vocabulary))
+    idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+    keep = df[terms] <= max(max_df * n_docs, 1)
+    rows, terms, values = rows[keep], terms[keep], tf[keep] * idf[terms[keep]]
+
+    norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=n_docs))
+    values = values / np.where(norms > 0, norms, 1.0)[rows]
+
+    order = np.lexsort((rows, terms))
+    col_ptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(terms, minlength=len(vocabulary)), out=col_ptr[1:])
+    return col_ptr, rows[order], values[order]
+
+def top_neighbours(col_ptr: np.ndarray, row_indices: np.ndarray, values: np.ndarray, n_docs: int,
+                   top_k: int, batch_size: int, min_score: float) -> List[List[Tuple[int, float]]]:
+    """Top-k cosine neighbours per document, computed batch by batch.
+
+    For a batch of documents every (document, term) weight is multiplied
+    with the term's column and summed into a dense batch x n_docs block,
+    so memory stays at batch_size * n_docs scores.
+    """
+    # Row-wise view of the same matrix to get each document's terms
+    terms = np.repeat(np.arange(len(col_ptr) - 1), np.diff(col_ptr))
+    by_row = np.argsort(row_indices, kind="stable")
+    row_ptr = np.zeros(n_docs + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row_indices, minlength=n_docs), out=row_ptr[1:])
+
+    neighbours: List[List[Tuple[int, float]]] = []
+    for start in range(0, n_docs, batch_size):
+        stop = min(start + batch_size, n_docs)
+        entries = by_row[row_ptr[start]:row_ptr[stop]]
+        local_rows = row_indices[entries] - start
+        batch_terms = terms[entries]
+        weights = values[entries]
+
+        # Expand every (document, term) pair over the term's column
+        lengths = col_ptr[batch_terms + 1] - col_ptr[batch_terms]
+        pair = np.repeat(np.arange(len(entries)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = np.repeat(col_ptr[batch_terms], lengths) + offsets
+
+        scores = np.bincount(
+            local_rows[pair] * n_docs + row_indices[positions],
+            weights=weights[pair] * values[positions],
+            minlength=(stop - start) * n_docs
+        ).reshape(stop - start, n_docs)
+        scores[np.arange(stop - start), np.arange(start, stop)] = -1.0  # not its own neighbour
+
+        k = min(top_k, n_docs - 1)
+        if k <= 0:
+            neighbours.extend([] for _ in range(stop - start))
+            continue
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for local, row_candidates in enumerate(candidates):
+            ranked = sorted(row_candidates, key=lambda column: -scores[local, column])
+            neighbours.append([
+                (int(column), float(scores[local, column]))
+                for column in ranked if scores[local, column] >= min_score
+            ])
+    return neighbours
+
+async def compute_similar_apps(args):
+    # Connect to MongoDB
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[os.environ['DB_NAME']]
+
+    try:
+        apps = await db.apps.find(
+            {}, {"name": 1, "short_description": 1, "description": 1, "category": 1}
+        ).to_list(None)
+        print(f"Computing similar apps for {len(apps)} apps")
+        if len(apps) < 2:
+            return
+
+        col_ptr, row_indices, values = tfidf_matrix([app_terms(app) for app in apps], args.max_df)
+        neighbours = top_neighbours(
+            col_ptr, row_indices, values, len(apps), args.top_k, args.batch_size, args.min_score
+        )
+
+        now = datetime.utcnow()
+        operations = []
+        for app, app_neighbours in zip(apps, neighbours):
+            similar_ids = [str(apps[index]["_id"]) for index, _ in app_neighbours]
+            if args.dry_run:
+                names = ", ".join(f"{apps[index].get('name')} ({score:.2f})" for index, score in app_neighbours)
+                print(f"{app.get('name')}: {names}")
+                continue
+            operations.append(UpdateOne(
+                {"_id": app["_id"]},
+                {"$set": {"computed_similar_app_ids": similar_ids, "similar_computed_at": now}}
+            ))
+
+        for start in range(0, len(operations), WRITE_CHUNK_SIZE):
+            await db.apps.bulk_write(operations[start:start + WRITE_CHUNK_SIZE], ordered=False)
+        if operations:
+            print(f"✅ Updated similar apps for {len(operations)} apps")
+
+    except Exception as e:
+        print(f"❌ Computing similar apps failed: {e}")
+        raise
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute similar apps from app text")
+    parser.add_argument("--top-k", type=int, default=10, help="neighbours stored per app")
+    parser.add_argument("--batch-size", type=int, default=256, help="apps scored per batch")
+    parser.add_argument("--min-score", type=float, default=0.05, help="minimum cosine similarity")
+    parser.add_argument("--max-df", type=float, default=0.5,
+                        help="ignore terms found in more than this fraction of apps")
+    parser.add_argument("--dry-run", action="store_true", help="print neighbours without writing")
+    asyncio.run(compute_similar_apps(parser.parse_args()))
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Migration script to move chats between per-message documents and bucketed
+message storage.
+
+    python migrate_message_buckets.py --min-messages 10000     # busy chats to buckets
+    python migrate_message_buckets.py --chat-id <id>          # one chat
+    python migrate_message_buckets.py --chat-id <id> --revert # back to documents
+
+Messages are copied first, then the chat is switched to the new layout and
+the old copies are removed after a settle delay, so readers always see the
+full history. Re-running the script after an interrupted run is safe:
+buckets of a chat still in document layout are partial copies and are
+rebuilt from scratch, messages left behind after the switch are only
+copied if their id isn't bucketed yet, and unpacking keeps message ids so
+repeated inserts are skipped as duplicates.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent
+sys.path.append(str(backend_dir))
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
+from dotenv import load_dotenv
+
+from utils.message_store import BUCKETED_LAYOUT, DOCUMENT_LAYOUT, bucketed_store, chat_layout
+
+# Load environment variables
+load_dotenv(backend_dir / '.env')
+
+BATCH_SIZE = 5000
+
+async def set_layout(db, chat_id: str, layout: str, settle_seconds: float):
+    """Switch the chat's layout, then wait for in-flight writes to the old one"""
+    chat_filter = {"_id": ObjectId(chat_id)} if ObjectId.is_valid(chat_id) else {"_id": chat_id}
+    result = await db.chats.update_one(chat_filter, {"$set": {"message_layout": layout}})
+    if result.modified_count:
+        await asyncio.sleep(settle_seconds)
+
+async def to_buckets(db, chat: dict, settle_seconds: float) -> int:
+    """Copy document messages into buckets, switch layout, then delete the originals"""
+    chat_id = str(chat["_id"])
+    copied = []
+    if chat_layout(chat) == DOCUMENT_LAYOUT:
+        # Nothing appends to buckets while the chat is in document layout, so
+        # any found here are a partial copy from an interrupted run
+        await db.message_buckets.delete_many({"chat_id": chat_id})
+        batch = []
+        async for message in db.messages.find({"chat_id": chat_id}).sort("timestamp", 1):
+            batch.append(message)
+            if len(batch) == BATCH_SIZE:
+                copied += await bucketed_store.insert_many(db, chat_id, batch)
+                batch = []
+        if batch:
+            copied += await bucketed_store.insert_many(db, chat_id, batch)
+
+        await set_layout(db, chat_id, BUCKETED_LAYOUT, settle_seconds)
+
+        for start in range(0, len(copied), BATCH_SIZE):
+            await db.messages.delete_many({"_id": {"$in": [ObjectId(message_id) for message_id in copied[start:start + BATCH_SIZE]]}})
+
+    # Messages written through the old layout while switching, or originals
+    # an interrupted run copied but didn't delete
+    stragglers = 0
+    async for message in db.messages.find({"chat_id": chat_id}):
+        if not await bucketed_store.find(db, chat_id, str(message["_id"])):
+            await bucketed_store.insert(db, message)
+            stragglers += 1
+        await db.messages.delete_one({"_id": message["_id"]})
+    return len(copied) + stragglers
+
+async def unpack_buckets(db, chat_id: str, delete: bool = False) -> int:
+    unpacked = 0
+    async for bucket in db.message_buckets.find({"chat_id": chat_id}):
+        messages = [{**entry, "chat_id": chat_id} for entry in bucket.get("messages", [])]
+        if messages:
+            try:
+                await db.messages.insert_many(messages, ordered=False)
+            except BulkWriteError as e:
+                # Messages already unpacked by an earlier pass or run
+                if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+        if delete:
+            # A bucket appended to since it was read is kept for the next run
+            await db.message_buckets.delete_one({"_id": bucket["_id"], "count": bucket.get("count")})
+        unpacked += len(messages)
+    return unpacked
+
+async def to_documents(db, chat_id: str, settle_seconds: float) -> int:
+    """Unpack buckets into one document per message, switch layout, then delete the buckets"""
+    await unpack_buckets(db, chat_id)
+    await set_layout(db, chat_id, DOCUMENT_LAYOUT, settle_seconds)
+    # Second pass picks up appends made while switching
+    return await unpack_buckets(db, chat_id, delete=True)
+
+async def migrate_message_buckets(args):
+    # Connect to MongoDB
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[os.environ['DB_NAME']]
+
+    try:
+        if args.chat_id:
+            chat_ids = [args.chat_id]
+        elif args.revert:
+            chat_ids = [str(chat["_id"]) for chat in await db.chats.find(
+                {"message_layout": BUCKETED_LAYOUT}, {"_id": 1}
+            ).to_list(None)]
+            # Plus chats an interrupted revert already switched but left buckets for
+            chat_ids += [chat_id for chat_id in await db.message_buckets.distinct("chat_id")
+                         if chat_id not in chat_ids]
+        else:
+            # Chats with at least --min-messages messages
+            pipeline = [
+                {"$group": {"_id": "$chat_id", "count": {"$sum": 1}}},
+                {"$match": {"count": {"$gte": args.min_messages}}},
+            ]
+            chat_ids = [row["_id"] for row in await db.messages.aggregate(pipeline, allowDiskUse=True).to_list(None)]
+            # Plus bucketed chats with stragglers from an earlier run
+            chat_ids += [str(chat["_id"]) for chat in await db.chats.find(
+                {"message_layout": BUCKETED_LAYOUT}, {"_id": 1}
+            ).to_list(None) if str(chat["_id"]) not in chat_ids]
+
+        print(f"Migrating {len(chat_ids)} chats to {DOCUMENT_LAYOUT if args.revert else BUCKETED_LAYOUT} layout")
+        total = 0
+        for chat_id in chat_ids:
+            chat_filter = {"_id": ObjectId(chat_id)} if ObjectId.is_valid(chat_id) else {"_id": chat_id}
+            chat = await db.chats.find_one(chat_filter, {"message_layout": 1})
+            if not chat:
+                print(f"⚠️  Chat {chat_id} not found, skipping")
+                continue
+
+            if args.revert:
+                moved = await to_documents(db, chat_id, args.settle_seconds)
+            elif chat_layout(chat) == BUCKETED_LAYOUT and not await db.messages.find_one({"chat_id": chat_id}):
+                continue
+            else:
+                moved = await to_buckets(db, chat, args.settle_seconds)
+            total += moved
+            print(f"✅ Chat {chat_id}: moved {moved} messages")
+
+        print(f"✅ Migration completed: moved {total} messages")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        raise
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move chats between message storage layouts")
+    parser.add_argument("--chat-id", help="migrate a single chat")
+    parser.add_argument("--min-messages", type=int, default=10000,
+                        help="migrate chats with at least this many messages")
+    parser.add_argument("--revert", action="store_true", help="move back to one document per message")
+    parser.add_argument("--settle-seconds", type=float, default=5.0,
+                        help="wait after switching layout for in-flight writes")
+    asyncio.run(migrate_message_buckets(parser.parse_args()))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 import uuid
 
@@ -9,6 +9,7 @@ class AppScreenshot(BaseModel):
 
 class AppReview(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    app_id: str
     user_id: str
     username: str
     rating: int = Field(ge=1, le=5)  # 1-5 stars
@@ -32,6 +33,8 @@ class App(BaseModel):
     # App Store metrics
     rating: float = Field(default=0.0, ge=0, le=5)
     rating_count: int = Field(default=0)
+    rating_sum: int = Field(default=0)
+    rating_histogram: Dict[str, int] = Field(default_factory=dict)  # stars ("1"-"5") -> reviews
     download_count: int = Field(default=0)
     
     # Media
@@ -53,8 +56,9 @@ class App(BaseModel):
     is_installed: bool = Field(default=False)
     is_wishlisted: bool = Field(default=False)
     
-    # Similar apps
+    # Similar apps: curated, then precomputed by compute_similar_apps.py
     similar_app_ids: List[str] = Field(default_factory=list)
+    computed_similar_app_ids: List[str] = Field(default_factory=list)
 
 class AppResponse(BaseModel):
     app: App
@@ -55,6 +55,7 @@ class Chat(BaseModel):
     owner_id: Optional[str] = None  # for channels - who owns the channel
     allow_all_messages: bool = Field(default=False)  # for channels - if all subscribers can send messages
     background_style: Optional[str] = Field(default="default")  # background style for channels
+    message_layout: str = Field(default="document")  # "document" or "bucketed" message storage
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -97,8 +98,24 @@ class ChatResponse(BaseModel):
     owner_id: Optional[str] = None
     allow_all_messages: bool = False
     background_style: Optional[str] = "default"
+    unread_count: int = 0
+    last_read_message_id: Optional[str] = None
     created_at: datetime
 
+class ReadCursor(BaseModel):
+    user_id: str
+    chat_id: str
+    last_read_message_id: Optional[str] = None
+    last_read_at: Optional[datetime] = None
+    unread_count: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class TypingEvent(BaseModel):
+    is_typing: bool = True
+
+class MarkReadRequest(BaseModel):
+    message_id: Optional[str] = None  # Defaults to the chat's last message
+
 class MessageResponse(BaseModel):
     id: str
     chat_id: str
@@ -111,4 +128,19 @@ class MessageResponse(BaseModel):
     file_size: Optional[int]
     is_encrypted: bool
     expires_at: Optional[datetime]
-    timestamp: datetime
\ No newline at end of file
+    timestamp: datetime
+
+
+class BatchMessageCreate(BaseModel):
+    chat_ids: List[str] = Field(min_length=1)  # every message goes to every chat
+    messages: List[MessageCreate] = Field(min_length=1)
+
+class BatchMessageResult(BaseModel):
+    chat_id: str
+    index: int  # position in the request's messages
+    success: bool
+    message: Optional[MessageResponse] = None
+    error: Optional[str] = None
+
+class BatchMessageResponse(BaseModel):
+    results: List[BatchMessageResult]
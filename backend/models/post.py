@@ -50,4 +50,9 @@ class PostResponse(BaseModel):
     created_at: datetime
 
 class ReactionCreate(BaseModel):
-    reaction_type: str  # like, love, laugh, wow, sad, angry
\ No newline at end of file
+    reaction_type: str  # like, love, laugh, wow, sad, angry
+
+class FeedResponse(BaseModel):
+    posts: List[PostResponse]
+    next_cursor: Optional[str] = None  # pass as `cursor` to get the next page
+    has_more: bool = False
@@ -0,0 +1,16 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any
+
+class ChangeEntry(BaseModel):
+    seq: int
+    type: str
+    chat_id: Optional[str] = None
+    entity_id: Optional[str] = None
+    user_id: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
+
+class SyncResponse(BaseModel):
+    changes: List[ChangeEntry] = Field(default_factory=list)
+    next_since: int
+    has_more: bool = False
+    reset: bool = False  # True when the client must do a full reload
@@ -49,6 +49,14 @@ class UserResponse(BaseModel):
     last_seen: datetime
     created_at: datetime
 
+class PresenceQuery(BaseModel):
+    user_ids: List[str] = Field(max_length=500)
+
+class PresenceStatus(BaseModel):
+    user_id: str
+    is_online: bool
+    last_seen: Optional[datetime] = None
+
 class AuthResponse(BaseModel):
     user: UserResponse
     access_token: str
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
+import logging
+
+from ..utils.auth import get_admin_user
+from ..utils.request_stats import TimedRoute
+from ..utils.profiler import slow_query_profiler
+from ..utils.indexes import index_registry
+
+logger = logging.getLogger(__name__)
+
+def create_admin_router(db: AsyncIOMotorDatabase) -> APIRouter:
+    router = APIRouter(prefix="/admin", tags=["admin"], route_class=TimedRoute)
+    
+    @router.get("/slow-queries")
+    async def get_slow_queries(
+        limit: int = Query(20, ge=1, le=100),
+        current_user: dict = Depends(get_admin_user)
+    ):
+        """Get the slowest recorded query shapes with their explained plans"""
+        return {
+            "threshold_ms": slow_query_profiler.threshold_ms,
+            "queries": slow_query_profiler.worst(limit)
+        }
+    
+    @router.delete("/slow-queries")
+    async def reset_slow_queries(current_user: dict = Depends(get_admin_user)):
+        """Clear the slow query buffer"""
+        slow_query_profiler.reset()
+        return {"message": "Slow query buffer cleared"}
+    
+    @router.get("/indexes")
+    async def get_indexes(
+        refresh: bool = Query(False),
+        current_user: dict = Depends(get_admin_user)
+    ):
+        """Get declared indexes and drift from the live database"""
+        if refresh:
+            await index_registry.verify(db)
+        return index_registry.report()
+    
+    return router
@@ -1,18 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List, Optional
 import logging
 from datetime import datetime
 from bson import ObjectId
 
-from models.app import App, AppResponse, AppListResponse, AppReview
-from models.user import User
-from auth.dependencies import get_current_user
-from database import db
+from ..models.app import App, AppResponse, AppListResponse, AppReview
+from ..models.user import User
+from ..utils.auth import get_current_user
+from ..utils.request_stats import TimedRoute
+from ..utils.app_catalog import app_catalog, app_from_doc
+from ..utils import app_ratings
+from ..utils.concurrency import gather_queries
 
 logger = logging.getLogger(__name__)
 
-def create_app_router():
-    router = APIRouter()
+def create_app_router(db: AsyncIOMotorDatabase) -> APIRouter:
+    router = APIRouter(tags=["apps"], route_class=TimedRoute)
 
     @router.get("/apps", response_model=AppListResponse)
     async def get_apps(
@@ -25,35 +29,10 @@ def create_app_router():
     ):
         """Get list of apps with pagination and filtering"""
         try:
-            # Build filter
-            filter_dict = {}
-            if category:
-                filter_dict["category"] = category
-            if search:
-                filter_dict["$or"] = [
-                    {"name": {"$regex": search, "$options": "i"}},
-                    {"developer": {"$regex": search, "$options": "i"}},
-                    {"description": {"$regex": search, "$options": "i"}}
-                ]
-
-            # Build sort
-            sort_dict = {
-                "rating": [("rating", -1), ("rating_count", -1)],
-                "downloads": [("download_count", -1)],
-                "name": [("name", 1)],
-                "updated": [("last_updated", -1)]
-            }
-
+            # Listing, filtering and search run on the in-memory catalog snapshot
+            catalog = await app_catalog.get(db)
             skip = (page - 1) * per_page
-            
-            # Get total count
-            total = await db.apps.count_documents(filter_dict)
-            
-            # Get apps
-            cursor = db.apps.find(filter_dict).sort(sort_dict[sort_by]).skip(skip).limit(per_page)
-            apps_data = await cursor.to_list(per_page)
-            
-            apps = [App(**app_data) for app_data in apps_data]
+            apps, total = catalog.page(sort_by, skip, per_page, category=category, search=search)
             
             return AppListResponse(
                 apps=apps,
@@ -76,9 +55,12 @@ def create_app_router():
     ):
         """Get detailed app information including reviews and similar apps"""
         try:
-            # Get app
+            # Get app and its latest 10 reviews concurrently
             app_filter = {"_id": ObjectId(app_id)} if ObjectId.is_valid(app_id) else {"_id": app_id}
-            app_data = await db.apps.find_one(app_filter)
+            app_data, reviews_data = await gather_queries(
+                db.apps.find_one(app_filter),
+                db.app_reviews.find({"app_id": app_id}).sort("created_at", -1).limit(10).to_list(10)
+            )
             
             if not app_data:
                 raise HTTPException(
@@ -86,20 +68,18 @@ def create_app_router():
                     detail="App not found"
                 )
             
-            app = App(**app_data)
-            
-            # Get reviews (latest 10)
-            reviews_cursor = db.app_reviews.find({"app_id": app_id}).sort("created_at", -1).limit(10)
-            reviews_data = await reviews_cursor.to_list(10)
+            app = app_from_doc(app_data)
             reviews = [AppReview(**review_data) for review_data in reviews_data]
             
-            # Get similar apps
+            # Similar apps from the catalog snapshot: curated first, then precomputed
+            catalog = await app_catalog.get(db)
             similar_apps = []
-            if app.similar_app_ids:
-                similar_filter = {"_id": {"$in": [ObjectId(sid) if ObjectId.is_valid(sid) else sid for sid in app.similar_app_ids]}}
-                similar_cursor = db.apps.find(similar_filter).limit(5)
-                similar_data = await similar_cursor.to_list(5)
-                similar_apps = [App(**app_data) for app_data in similar_data]
+            for similar_id in dict.fromkeys(app.similar_app_ids + app.computed_similar_app_ids):
+                similar_app = catalog.by_id.get(similar_id)
+                if similar_app is not None and similar_id != app.id:
+                    similar_apps.append(similar_app)
+                    if len(similar_apps) == 5:
+                        break
             
             return AppResponse(
                 app=app,
@@ -147,6 +127,7 @@ def create_app_router():
                     }
                 }
             )
+            app_catalog.invalidate()
             
             return {
                 "message": f"App {'pinned' if new_pin_status else 'unpinned'} successfully",
@@ -193,6 +174,7 @@ def create_app_router():
                     }
                 }
             )
+            app_catalog.invalidate()
             
             return {
                 "message": f"App {'added to' if new_wishlist_status else 'removed from'} wishlist successfully",
@@ -247,31 +229,13 @@ def create_app_router():
             
             await db.app_reviews.insert_one(review.dict())
             
-            # Update app rating
-            pipeline = [
-                {"$match": {"app_id": app_id}},
-                {"$group": {
-                    "_id": None,
-                    "avg_rating": {"$avg": "$rating"},
-                    "count": {"$sum": 1}
-                }}
-            ]
-            
-            result = await db.app_reviews.aggregate(pipeline).to_list(1)
-            if result:
-                new_rating = result[0]["avg_rating"]
-                new_count = result[0]["count"]
-                
-                await db.apps.update_one(
-                    app_filter,
-                    {
-                        "$set": {
-                            "rating": round(new_rating, 1),
-                            "rating_count": new_count,
-                            "updated_at": datetime.utcnow()
-                        }
-                    }
-                )
+            # Update app rating from running sums; apps without them yet are
+            # counted from their reviews once
+            if "rating_sum" in app:
+                await app_ratings.add_rating(db, app_id, rating)
+            else:
+                await app_ratings.rebuild(db, app_id)
+            app_catalog.invalidate()
             
             return {"message": "Review created successfully", "review": review}
 
@@ -284,4 +248,4 @@ def create_app_router():
                 detail="Failed to create review"
             )
 
-    return router
\ No newline at end of file
+    return router
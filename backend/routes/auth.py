@@ -7,11 +7,14 @@ import logging
 from ..models.user import User, UserCreate, UserLogin, UserResponse, AuthResponse, NetworkType
 from ..utils.web3_auth import Web3Auth
 from ..utils.auth import create_access_token, get_current_user
+from ..utils.request_stats import TimedRoute
+from ..utils.data_access import reads
+from ..utils.presence import presence
 
 logger = logging.getLogger(__name__)
 
 def create_auth_router(db: AsyncIOMotorDatabase) -> APIRouter:
-    router = APIRouter(prefix="/auth", tags=["authentication"])
+    router = APIRouter(prefix="/auth", tags=["authentication"], route_class=TimedRoute)
     
     @router.post("/generate-message")
     async def generate_auth_message(wallet_address: str, network: NetworkType):
@@ -56,7 +59,7 @@ def create_auth_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 )
             
             # Check if user exists
-            existing_user = await db.users.find_one({
+            existing_user = await reads(db, "auth").users.find_one({
                 "wallet_address": user_data.wallet_address.lower(),
                 "network": user_data.network
             })
@@ -88,6 +91,8 @@ def create_auth_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 new_user.id = str(result.inserted_id)
                 user = new_user
             
+            presence.touch(str(user.id))
+            
             # Create access token
             access_token = create_access_token(
                 data={"sub": str(user.id), "wallet_address": user.wallet_address, "network": user.network}
@@ -132,6 +137,8 @@ def create_auth_router(db: AsyncIOMotorDatabase) -> APIRouter:
                     detail="Invalid user ID format"
                 )
             
+            presence.mark_offline(user_id)
+            
             await db.users.update_one(
                 {"_id": ObjectId(user_id)},
                 {
@@ -166,7 +173,7 @@ def create_auth_router(db: AsyncIOMotorDatabase) -> APIRouter:
                     detail="Invalid user ID format"
                 )
             
-            user_doc = await db.users.find_one({"_id": ObjectId(user_id)})
+            user_doc = await reads(db, "auth").users.find_one({"_id": ObjectId(user_id)})
             
             if not user_doc:
                 raise HTTPException(
@@ -1,21 +1,43 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from datetime import datetime, timedelta
 from typing import List, Optional
+import asyncio
+import json
+import os
 import logging
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
 from ..models.chat import (
     Chat, ChatCreate, ChatResponse, 
     Message, MessageCreate, MessageResponse,
-    ChatType, MessageType
+    ChatType, MessageType, MarkReadRequest, TypingEvent,
+    BatchMessageCreate, BatchMessageResult, BatchMessageResponse
 )
 from ..models.user import User, UserResponse
 from ..utils.auth import get_current_user
+from ..utils.request_stats import TimedRoute
+from ..utils.data_access import reads
+from ..utils import read_state, change_log, message_store
+from ..utils.membership import membership_cache
+from ..utils.message_archive import message_archive
+from ..utils.typing_events import typing_hub
+from ..utils.timelines import timeline_fanout
+from ..utils.write_coalescer import message_coalescer
+
+# Keep-alive interval for idle typing streams
+TYPING_STREAM_KEEPALIVE_SECONDS = 15
+
+# Upper bound for chats x messages in one batch send
+BATCH_SEND_MAX_ITEMS = int(os.getenv("BATCH_SEND_MAX_ITEMS", "100"))
 
 logger = logging.getLogger(__name__)
 
 def create_chat_router(db: AsyncIOMotorDatabase) -> APIRouter:
-    router = APIRouter(prefix="/chats", tags=["chats"])
+    router = APIRouter(prefix="/chats", tags=["chats"], route_class=TimedRoute)
     
     @router.get("/", response_model=List[ChatResponse])
     async def get_user_chats(
@@ -36,8 +58,14 @@ def create_chat_router(db: AsyncIOMotorDatabase) -> APIRouter:
             
             chats = await chats_cursor.to_list(length=None)
             
+            # Unread counters for all chats in one query
+            read_cursors = await read_state.get_read_cursors(
+                db, user_id, [str(chat_doc["_id"]) for chat_doc in chats]
+            )
+            
             chat_responses = []
             for chat_doc in chats:
+                read_cursor = read_cursors.get(str(chat_doc["_id"]), {})
                 chat_responses.append(ChatResponse(
                     id=str(chat_doc["_id"]),
                     name=chat_doc.get("name"),
@@ -56,6 +84,8 @@ def create_chat_router(db: AsyncIOMotorDatabase) -> APIRouter:
                     created_by=chat_doc.get("created_by"),
                     owner_id=chat_doc.get("owner_id"),
                     allow_all_messages=chat_doc.get("allow_all_messages", False),
+                    unread_count=read_state.unread_count(chat_doc, read_cursor),
+                    last_read_message_id=read_cursor.get("last_read_message_id"),
                     created_at=chat_doc.get("created_at")
                 ))
             
@@ -147,6 +177,7 @@ def create_chat_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 subscriber_count=0 if chat_data.chat_type == ChatType.CHANNEL else len(participants),
                 owner_id=user_id if chat_data.chat_type == ChatType.CHANNEL else None,
                 allow_all_messages=False,  # Default to admin-only for channels
+                message_layout=message_store.MESSAGE_LAYOUT,
                 created_by=user_id
             )
             
@@ -157,6 +188,14 @@ def create_chat_router(db: AsyncIOMotorDatabase) -> APIRouter:
             result = await db.chats.insert_one(chat_dict)
             new_chat.id = str(result.inserted_id)
             
+            await change_log.record_change(
+                db,
+                change_log.ChangeType.CHAT_CREATED,
+                chat_id=new_chat.id,
+                entity_id=new_chat.id,
+                data={"name": new_chat.name, "chat_type": new_chat.chat_type}
+            )
+            
             return ChatResponse(
                 id=new_chat.id,
                 name=new_chat.name,
@@ -212,12 +251,13 @@ def create_chat_router(db: AsyncIOMotorDatabase) -> APIRouter:
             # Calculate skip value for pagination
             skip = (page - 1) * limit
             
-            # Get messages
-            messages_cursor = db.messages.find({
-                "chat_id": chat_id
-            }).sort("timestamp", -1).skip(skip).limit(limit)
+            # Get messages from the chat's storage layout
+            store = message_store.store_for(chat)
+            messages = await store.page(db, chat_id, skip, limit)
             
-            messages = await messages_cursor.to_list(length=None)
+            # Scrolling past the hot window reads through to archived segments
+            if len(messages) < limit and chat.get("archived_until"):
+                messages += await message_archive.page(db, chat_id, skip, limit, len(messages), store)
             
             message_responses = []
             for msg_doc in messages:
@@ -293,20 +333,48 @@ def create_chat_router(db: AsyncIOMotorDatabase) -> APIRouter:
             message_dict = new_message.dict()
             message_dict.pop('id', None)  # Remove the UUID id field before inserting
             
-            result = await db.messages.insert_one(message_dict)
-            new_message.id = str(result.inserted_id)
-            
-            # Update chat's last message
-            from bson import ObjectId
+            store = message_store.store_for(chat)
             chat_update_filter = {"_id": ObjectId(chat_id)} if ObjectId.is_valid(chat_id) else {"_id": chat_id}
-            await db.chats.update_one(
-                chat_update_filter,
-                {
-                    "$set": {
-                        "last_message_id": new_message.id,
-                        "last_message_time": new_message.timestamp,
-                        "updated_at": datetime.utcnow()
+            if message_coalescer.enabled and store is message_store.document_store:
+                # Insert and chat update are group-committed with concurrent sends
+                new_message.id = await message_coalescer.insert(message_dict, chat_update_filter)
+            else:
+                new_message.id = await store.insert(db, message_dict)
+                
+                # Update chat's last message
+                await db.chats.update_one(
+                    chat_update_filter,
+                    {
+                        "$set": {
+                            "last_message_id": new_message.id,
+                            "last_message_time": new_message.timestamp,
+                            "updated_at": datetime.utcnow()
+                        }
                     }
+                )
+            
+            # Bump unread counters for the other participants
+            await read_state.record_message_sent(
+                db,
+                chat_id,
+                chat.get("participants", []),
+                user_id,
+                new_message.id,
+                new_message.timestamp
+            )
+            
+            await change_log.record_change(
+                db,
+                change_log.ChangeType.MESSAGE_CREATED,
+                chat_id=chat_id,
+                entity_id=new_message.id,
+                data={
+                    "sender_id": new_message.sender_id,
+                    "content": new_message.content,
+                    "message_type": new_message.message_type,
+                    "sticker_url": new_message.sticker_url,
+                    "expires_at": new_message.expires_at,
+                    "timestamp": new_message.timestamp
                 }
             )
             
@@ -334,6 +402,293 @@ def create_chat_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 detail="Failed to send message"
             )
     
+    @router.post("/messages/batch", response_model=BatchMessageResponse)
+    async def send_messages_batch(
+        batch: BatchMessageCreate,
+        current_user: dict = Depends(get_current_user)
+    ):
+        """Send one or more messages to one or more chats (forwarding, bots)"""
+        try:
+            user_id = current_user["sub"]
+            chat_ids = list(dict.fromkeys(batch.chat_ids))
+            if len(chat_ids) * len(batch.messages) > BATCH_SEND_MAX_ITEMS:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"A batch can hold at most {BATCH_SEND_MAX_ITEMS} messages"
+                )
+            
+            # Check membership of every chat with a single query
+            chat_keys = [ObjectId(chat_id) if ObjectId.is_valid(chat_id) else chat_id for chat_id in chat_ids]
+            chats = {
+                str(chat["_id"]): chat
+                async for chat in db.chats.find(
+                    {"_id": {"$in": chat_keys}, "participants": user_id},
+                    {"participants": 1, "is_secret": 1, "secret_timer": 1, "message_layout": 1}
+                )
+            }
+            
+            results = {}
+            documents, bucketed = [], []
+            # Timestamps are stored with millisecond precision; spacing them keeps
+            # the messages of a batch in request order
+            sent_at = datetime.utcnow()
+            for chat_id in chat_ids:
+                chat = chats.get(chat_id)
+                for index, message_data in enumerate(batch.messages):
+                    if chat is None:
+                        results[(chat_id, index)] = BatchMessageResult(
+                            chat_id=chat_id, index=index, success=False, error="Access denied to this chat"
+                        )
+                        continue
+                    
+                    # Calculate expiry time for secret messages
+                    expires_at = None
+                    if chat.get("is_secret") and message_data.expires_in:
+                        expires_at = datetime.utcnow() + timedelta(seconds=message_data.expires_in)
+                    elif chat.get("is_secret") and chat.get("secret_timer"):
+                        expires_at = datetime.utcnow() + timedelta(seconds=chat["secret_timer"])
+                    
+                    new_message = Message(
+                        chat_id=chat_id,
+                        sender_id=user_id,
+                        content=message_data.content,
+                        message_type=message_data.message_type,
+                        sticker_url=message_data.sticker_url,
+                        is_encrypted=chat.get("is_secret", False),
+                        expires_at=expires_at,
+                        timestamp=sent_at + timedelta(milliseconds=index)
+                    )
+                    message_dict = new_message.dict()
+                    message_dict.pop('id', None)
+                    # Ids are assigned up front so results can be matched to writes
+                    message_dict["_id"] = ObjectId()
+                    new_message.id = str(message_dict["_id"])
+                    
+                    item = (chat_id, index, new_message, message_dict)
+                    if message_store.chat_layout(chat) == message_store.BUCKETED_LAYOUT:
+                        bucketed.append(item)
+                    else:
+                        documents.append(item)
+            
+            # One insert_many for all document-layout chats
+            failed = set()
+            if documents:
+                try:
+                    await db.messages.insert_many([item[3] for item in documents], ordered=False)
+                except BulkWriteError as e:
+                    failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            stored = [item for position, item in enumerate(documents) if position not in failed]
+            failed_items = [item for position, item in enumerate(documents) if position in failed]
+            # Bucket appends go through their store one by one
+            for item in bucketed:
+                try:
+                    await message_store.bucketed_store.insert(db, item[3])
+                    stored.append(item)
+                except Exception as e:
+                    logger.error(f"Error storing batched message in chat {item[0]}: {e}")
+                    failed_items.append(item)
+            
+            for chat_id, index, _, _ in failed_items:
+                results[(chat_id, index)] = BatchMessageResult(
+                    chat_id=chat_id, index=index, success=False, error="Failed to send message"
+                )
+            
+            if stored:
+                newest, counts = {}, {}
+                for chat_id, _, new_message, _ in stored:
+                    if chat_id not in newest or new_message.timestamp >= newest[chat_id].timestamp:
+                        newest[chat_id] = new_message
+                    counts[chat_id] = counts.get(chat_id, 0) + 1
+                
+                # Update every chat's last message with one bulk_write
+                now = datetime.utcnow()
+                await db.chats.bulk_write([
+                    UpdateOne(
+                        {"_id": chats[chat_id]["_id"]},
+                        {"$set": {
+                            "last_message_id": new_message.id,
+                            "last_message_time": new_message.timestamp,
+                            "updated_at": now
+                        }}
+                    )
+                    for chat_id, new_message in newest.items()
+                ], ordered=False)
+                
+                # Bump unread counters for the other participants; writes, so
+                # no group timeout that could cancel them partway
+                await asyncio.gather(*(
+                    read_state.record_message_sent(
+                        db,
+                        chat_id,
+                        chats[chat_id].get("participants", []),
+                        user_id,
+                        new_message.id,
+                        new_message.timestamp,
+                        count=counts[chat_id]
+                    )
+                    for chat_id, new_message in newest.items()
+                ))
+                
+                # One block of change log seqs for the whole batch
+                await change_log.record_changes(db, [
+                    {
+                        "type": change_log.ChangeType.MESSAGE_CREATED,
+                        "chat_id": chat_id,
+                        "entity_id": new_message.id,
+                        "data": {
+                            "sender_id": new_message.sender_id,
+                            "content": new_message.content,
+                            "message_type": new_message.message_type,
+                            "sticker_url": new_message.sticker_url,
+                            "expires_at": new_message.expires_at,
+                            "timestamp": new_message.timestamp
+                        }
+                    }
+                    for chat_id, _, new_message, _ in stored
+                ])
+                
+                for chat_id, index, new_message, _ in stored:
+                    results[(chat_id, index)] = BatchMessageResult(
+                        chat_id=chat_id,
+                        index=index,
+                        success=True,
+                        message=MessageResponse(
+                            id=new_message.id,
+                            chat_id=new_message.chat_id,
+                            sender_id=new_message.sender_id,
+                            content=new_message.content,
+                            message_type=new_message.message_type,
+                            sticker_url=new_message.sticker_url,
+                            file_url=new_message.file_url,
+                            file_name=new_message.file_name,
+                            file_size=new_message.file_size,
+                            is_encrypted=new_message.is_encrypted,
+                            expires_at=new_message.expires_at,
+                            timestamp=new_message.timestamp
+                        )
+                    )
+            
+            return BatchMessageResponse(results=[
+                results[(chat_id, index)]
+                for chat_id in chat_ids
+                for index in range(len(batch.messages))
+            ])
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending message batch: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to send messages"
+            )
+    
+    @router.post("/{chat_id}/read")
+    async def mark_chat_read(
+        chat_id: str,
+        read_data: Optional[MarkReadRequest] = None,
+        current_user: dict = Depends(get_current_user)
+    ):
+        """Mark chat as read up to a message (defaults to the last message)"""
+        try:
+            from bson import ObjectId
+            
+            user_id = current_user["sub"]
+            
+            # Check if user is participant in chat
+            chat_filter = {"_id": ObjectId(chat_id)} if ObjectId.is_valid(chat_id) else {"_id": chat_id}
+            chat = await db.chats.find_one(
+                chat_filter,
+                {"participants": 1, "last_message_id": 1, "last_message_time": 1, "message_layout": 1,
+                 "archived_until": 1, "message_count": 1}
+            )
+            if not chat or user_id not in chat.get("participants", []):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Access denied to this chat"
+                )
+            
+            try:
+                return await read_state.mark_read(
+                    db,
+                    chat,
+                    user_id,
+                    read_data.message_id if read_data else None
+                )
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error marking chat as read: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to mark chat as read"
+            )
+    
+    @router.post("/{chat_id}/typing")
+    async def report_typing(
+        chat_id: str,
+        typing_event: TypingEvent,
+        current_user: dict = Depends(get_current_user)
+    ):
+        """Report that the current user started or stopped typing (never stored)"""
+        user_id = current_user["sub"]
+        
+        if not await membership_cache.is_participant(db, chat_id, user_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied to this chat"
+            )
+        
+        typing_hub.publish(chat_id, user_id, typing_event.is_typing)
+        return {"message": "Typing status updated"}
+    
+    @router.get("/{chat_id}/typing")
+    async def stream_typing(
+        chat_id: str,
+        current_user: dict = Depends(get_current_user)
+    ):
+        """Subscribe to typing indicators of a chat as server-sent events"""
+        user_id = current_user["sub"]
+        
+        if not await membership_cache.is_participant(db, chat_id, user_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied to this chat"
+            )
+        
+        async def event_stream():
+            updates = typing_hub.subscribe(chat_id)
+            try:
+                next_update = asyncio.ensure_future(updates.__anext__())
+                while True:
+                    done, _ = await asyncio.wait({next_update}, timeout=TYPING_STREAM_KEEPALIVE_SECONDS)
+                    if not done:
+                        yield ": keep-alive\n\n"
+                        continue
+                    typing_users = [uid for uid in next_update.result() if uid != user_id]
+                    yield f"data: {json.dumps({'chat_id': chat_id, 'typing': typing_users})}\n\n"
+                    next_update = asyncio.ensure_future(updates.__anext__())
+            finally:
+                if not next_update.done():
+                    next_update.cancel()
+                    try:
+                        await next_update
+                    except (asyncio.CancelledError, StopAsyncIteration):
+                        pass
+                await updates.aclose()
+        
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
     @router.get("/search")
     async def search_chats(
         query: str = Query(..., min_length=1),
@@ -364,7 +719,9 @@ def create_chat_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 if chat_type:
                     search_filter["chat_type"] = chat_type
             
-            chats_cursor = db.chats.find(search_filter).sort("updated_at", -1)
+            # Public channel search tolerates replication lag; own chats read from the primary
+            search_db = reads(db, "channel_search") if chat_type == "channel" else db
+            chats_cursor = search_db.chats.find(search_filter).sort("updated_at", -1)
             chats = await chats_cursor.to_list(length=20)
             
             chat_responses = []
@@ -441,6 +798,18 @@ def create_chat_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 }
             )
             
+            membership_cache.invalidate(chat_id, user_id)
+            timeline_fanout.subscribed(chat, user_id)
+            await read_state.joined(db, chat, user_id)
+            
+            await change_log.record_change(
+                db,
+                change_log.ChangeType.CHAT_SUBSCRIBED,
+                chat_id=chat_id,
+                entity_id=chat_id,
+                user_id=user_id
+            )
+            
             return {"message": "Successfully subscribed to channel"}
             
         except HTTPException:
@@ -491,6 +860,14 @@ def create_chat_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 }
             )
             
+            await change_log.record_change(
+                db,
+                change_log.ChangeType.CHAT_UPDATED,
+                chat_id=chat_id,
+                entity_id=chat_id,
+                data={"is_pinned": new_pin_status}
+            )
+            
             return {
                 "message": f"Chat {'pinned' if new_pin_status else 'unpinned'} successfully",
                 "is_pinned": new_pin_status
@@ -557,6 +934,14 @@ def create_chat_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 {"$set": update_data}
             )
             
+            await change_log.record_change(
+                db,
+                change_log.ChangeType.CHAT_UPDATED,
+                chat_id=chat_id,
+                entity_id=chat_id,
+                data={field: value for field, value in update_data.items() if field != "updated_at"}
+            )
+            
             # Return updated chat
             updated_chat = await db.chats.find_one(chat_filter)
             
@@ -644,6 +1029,14 @@ def create_chat_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 }
             )
             
+            await change_log.record_change(
+                db,
+                change_log.ChangeType.CHAT_UPDATED,
+                chat_id=chat_id,
+                entity_id=chat_id,
+                data={"background_style": background_style}
+            )
+            
             return {
                 "message": "Channel background updated successfully",
                 "background_style": background_style
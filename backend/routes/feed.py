@@ -0,0 +1,92 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Optional
+import logging
+from bson import ObjectId
+
+from ..models.post import FeedResponse, PostResponse
+from ..utils.auth import get_current_user
+from ..utils.request_stats import TimedRoute
+from ..utils.data_access import reads
+from ..utils import home_feed
+from ..utils.timelines import timeline_fanout
+
+logger = logging.getLogger(__name__)
+
+def create_feed_router(db: AsyncIOMotorDatabase) -> APIRouter:
+    router = APIRouter(tags=["feed"], route_class=TimedRoute)
+
+    @router.get("/feed", response_model=FeedResponse)
+    async def get_home_feed(
+        limit: int = Query(20, ge=1, le=50),
+        cursor: Optional[str] = Query(None),
+        current_user: dict = Depends(get_current_user)
+    ):
+        """Get the newest posts across all subscribed channels"""
+        try:
+            user_id = current_user["sub"]
+
+            try:
+                before = home_feed.decode_cursor(cursor) if cursor else None
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+
+            # Subscriptions come from the primary so new subscriptions show up at once
+            channels = await db.chats.find(
+                {"participants": user_id, "chat_type": "channel"},
+                {"name": 1, "last_post_at": 1, "subscriber_count": 1}
+            ).to_list(length=None)
+
+            feed_db = reads(db, "channel_feed")
+            posts, has_more = await timeline_fanout.read_feed(db, feed_db, user_id, channels, limit, before)
+
+            # Authors for the whole page in one query
+            author_ids = list({ObjectId(post["author_id"]) for post in posts if ObjectId.is_valid(post["author_id"])})
+            authors = {}
+            if author_ids:
+                author_docs = await feed_db.users.find(
+                    {"_id": {"$in": author_ids}}, {"name": 1, "avatar": 1}
+                ).to_list(length=None)
+                authors = {str(author["_id"]): author for author in author_docs}
+            channel_names = {str(channel["_id"]): channel.get("name") for channel in channels}
+
+            result = []
+            for post_doc in posts:
+                author = authors.get(post_doc["author_id"])
+                result.append(PostResponse(
+                    id=str(post_doc["_id"]),
+                    channel_id=post_doc["channel_id"],
+                    author_id=post_doc["author_id"],
+                    sequence_number=post_doc.get("sequence_number", 0),
+                    author_name=author.get("name") if author else "Unknown",
+                    author_avatar=author.get("avatar") if author else None,
+                    channel_name=channel_names.get(post_doc["channel_id"]),
+                    text=post_doc.get("text"),
+                    media_url=post_doc.get("media_url"),
+                    media_type=post_doc.get("media_type"),
+                    post_type=post_doc.get("post_type", "text"),
+                    reactions=post_doc.get("reactions", {}),
+                    views=post_doc.get("views", 0),
+                    comments_count=post_doc.get("comments_count", 0),
+                    created_at=post_doc["created_at"]
+                ))
+
+            return FeedResponse(
+                posts=result,
+                next_cursor=home_feed.encode_cursor(posts[-1]) if has_more and posts else None,
+                has_more=has_more
+            )
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting home feed: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to get home feed"
+            )
+
+    return router
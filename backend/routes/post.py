@@ -8,11 +8,18 @@ from datetime import datetime
 from ..models.post import Post, PostCreate, PostResponse, ReactionCreate, MediaType, PostType
 from ..models.user import User
 from ..utils.auth import get_current_user
+from ..utils.request_stats import TimedRoute
+from ..utils.data_access import reads
+from ..utils import change_log
+from ..utils.timelines import timeline_fanout
+from ..utils.membership import membership_cache
+from ..utils.post_cache import post_cache
+from ..utils.concurrency import gather_queries
 
 logger = logging.getLogger(__name__)
 
 def create_post_router(db: AsyncIOMotorDatabase) -> APIRouter:
-    router = APIRouter(prefix="/posts", tags=["posts"])
+    router = APIRouter(prefix="/posts", tags=["posts"], route_class=TimedRoute)
 
     @router.post("/{channel_id}", response_model=PostResponse)
     async def create_post(
@@ -22,8 +29,17 @@ def create_post_router(db: AsyncIOMotorDatabase) -> APIRouter:
     ):
         """Create a new post in a channel (admin only)"""
         try:
+            user_id = current_user["sub"]
+            
+            # Channel, last post (for the next sequence number) and author
+            # don't depend on each other
+            channel, last_post, author = await gather_queries(
+                db.chats.find_one({"_id": ObjectId(channel_id)}),
+                db.posts.find_one({"channel_id": channel_id}, sort=[("sequence_number", -1)]),
+                db.users.find_one({"_id": ObjectId(user_id)})
+            )
+            
             # Check if channel exists
-            channel = await db.chats.find_one({"_id": ObjectId(channel_id)})
             if not channel:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -38,7 +54,6 @@ def create_post_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 )
             
             # Check if user is admin or owner of the channel
-            user_id = current_user["sub"]
             is_owner = channel.get("owner_id") == user_id
             is_admin = user_id in channel.get("admins", [])
             
@@ -52,10 +67,6 @@ def create_post_router(db: AsyncIOMotorDatabase) -> APIRouter:
             post_type = PostType.MEDIA if post_data.media_url else PostType.TEXT
             
             # Get the next sequence number for this channel
-            last_post = await db.posts.find_one(
-                {"channel_id": channel_id},
-                sort=[("sequence_number", -1)]
-            )
             next_sequence = (last_post.get("sequence_number", 0) + 1) if last_post else 1
             
             # Create new post
@@ -76,10 +87,32 @@ def create_post_router(db: AsyncIOMotorDatabase) -> APIRouter:
             result = await db.posts.insert_one(post_dict)
             new_post.id = str(result.inserted_id)
             
-            # Get author info for response
-            author = await db.users.find_one({"_id": ObjectId(user_id)})
+            # Channel order for the home feed merge
+            await db.chats.update_one(
+                {"_id": ObjectId(channel_id)},
+                {"$max": {"last_post_at": new_post.created_at}}
+            )
+            
+            # Subscriber timelines are updated in the background
+            post_dict["_id"] = result.inserted_id
+            timeline_fanout.post_created(channel, post_dict)
+            
+            await change_log.record_change(
+                db,
+                change_log.ChangeType.POST_CREATED,
+                chat_id=channel_id,
+                entity_id=new_post.id,
+                data={
+                    "author_id": new_post.author_id,
+                    "sequence_number": new_post.sequence_number,
+                    "text": new_post.text,
+                    "media_url": new_post.media_url,
+                    "media_type": new_post.media_type.value if new_post.media_type else None,
+                    "created_at": new_post.created_at
+                }
+            )
             
-            return PostResponse(
+            response = PostResponse(
                 id=new_post.id,
                 channel_id=new_post.channel_id,
                 author_id=new_post.author_id,
@@ -96,6 +129,9 @@ def create_post_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 comments_count=new_post.comments_count,
                 created_at=new_post.created_at
             )
+            post_cache.post_created(channel_id, response)
+            
+            return response
             
         except HTTPException:
             raise
@@ -116,7 +152,7 @@ def create_post_router(db: AsyncIOMotorDatabase) -> APIRouter:
         """Get posts from a channel with cursor-based pagination"""
         try:
             # Check if channel exists and user has access
-            channel = await db.chats.find_one({"_id": ObjectId(channel_id)})
+            channel = await db.chats.find_one({"_id": ObjectId(channel_id)}, {"name": 1})
             if not channel:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -125,54 +161,75 @@ def create_post_router(db: AsyncIOMotorDatabase) -> APIRouter:
             
             # Check if user is subscribed to the channel
             user_id = current_user["sub"]
-            if user_id not in channel.get("participants", []):
+            if not await membership_cache.is_participant(db, channel_id, user_id):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="You must be subscribed to view channel posts"
                 )
             
-            # Build query for cursor-based pagination
-            query = {"channel_id": channel_id}
-            if before_sequence:
-                query["sequence_number"] = {"$lt": before_sequence}
-            
-            # Get posts from database - sorted by sequence number descending
-            posts_cursor = db.posts.find(query).sort("sequence_number", -1).limit(limit)
-            
-            posts = await posts_cursor.to_list(length=limit)
+            # Feed reads tolerate replication lag; the access check above uses the primary
+            feed_db = reads(db, "channel_feed")
             
-            # Log debug information
-            logger.info(f"Channel posts query: {query}, found {len(posts)} posts, limit: {limit}")
-            if posts:
-                logger.info(f"Sequence numbers: {[p.get('sequence_number', 0) for p in posts]}")
+            async def load_posts(source_db: AsyncIOMotorDatabase, query: dict, count: int) -> List[PostResponse]:
+                # Get posts from database - sorted by sequence number descending
+                posts = await source_db.posts.find(query).sort("sequence_number", -1).limit(count).to_list(length=count)
+                
+                # Log debug information
+                logger.info(f"Channel posts query: {query}, found {len(posts)} posts, limit: {count}")
+                if posts:
+                    logger.info(f"Sequence numbers: {[p.get('sequence_number', 0) for p in posts]}")
+                
+                # Authors for the whole page in one query
+                author_ids = list({ObjectId(post["author_id"]) for post in posts if ObjectId.is_valid(post["author_id"])})
+                authors = {}
+                if author_ids:
+                    author_docs = await source_db.users.find(
+                        {"_id": {"$in": author_ids}}, {"name": 1, "avatar": 1}
+                    ).to_list(length=None)
+                    authors = {str(author["_id"]): author for author in author_docs}
+                
+                # Convert to PostResponse objects
+                result = []
+                for post_doc in posts:
+                    author = authors.get(post_doc["author_id"])
+                    result.append(PostResponse(
+                        id=str(post_doc["_id"]),
+                        channel_id=post_doc["channel_id"],
+                        author_id=post_doc["author_id"],
+                        sequence_number=post_doc.get("sequence_number", 0),
+                        author_name=author.get("name") if author else "Unknown",
+                        author_avatar=author.get("avatar") if author else None,
+                        channel_name=channel.get("name"),
+                        text=post_doc.get("text"),
+                        media_url=post_doc.get("media_url"),
+                        media_type=post_doc.get("media_type"),
+                        post_type=post_doc.get("post_type", "text"),
+                        reactions=post_doc.get("reactions", {}),
+                        views=post_doc.get("views", 0),
+                        comments_count=post_doc.get("comments_count", 0),
+                        created_at=post_doc["created_at"]
+                    ))
+                return result
+            
+            if not before_sequence and limit <= post_cache.size:
+                # First page: served from the per-channel cache. The cache is
+                # patched by this worker's writes, so it must be loaded from
+                # the primary or a lagging secondary would pin a stale page.
+                cached = await post_cache.get(
+                    channel_id,
+                    lambda: load_posts(reads(db, "read_after_write"), {"channel_id": channel_id}, post_cache.size)
+                )
+                result = cached[:limit]
+            else:
+                # Build query for cursor-based pagination
+                query = {"channel_id": channel_id}
+                if before_sequence:
+                    query["sequence_number"] = {"$lt": before_sequence}
+                result = await load_posts(feed_db, query, limit)
             
             # For frontend display, reverse the order so oldest posts appear first
             # This maintains chat-like chronological order (oldest to newest)
-            posts.reverse()
-            
-            # Convert to PostResponse objects
-            result = []
-            for post_doc in posts:
-                # Get author info
-                author = await db.users.find_one({"_id": ObjectId(post_doc["author_id"])})
-                
-                result.append(PostResponse(
-                    id=str(post_doc["_id"]),
-                    channel_id=post_doc["channel_id"],
-                    author_id=post_doc["author_id"],
-                    sequence_number=post_doc.get("sequence_number", 0),
-                    author_name=author.get("name") if author else "Unknown",
-                    author_avatar=author.get("avatar") if author else None,
-                    channel_name=channel.get("name"),
-                    text=post_doc.get("text"),
-                    media_url=post_doc.get("media_url"),
-                    media_type=post_doc.get("media_type"),
-                    post_type=post_doc.get("post_type", "text"),
-                    reactions=post_doc.get("reactions", {}),
-                    views=post_doc.get("views", 0),
-                    comments_count=post_doc.get("comments_count", 0),
-                    created_at=post_doc["created_at"]
-                ))
+            result.reverse()
             
             return result
             
@@ -201,16 +258,18 @@ def create_post_router(db: AsyncIOMotorDatabase) -> APIRouter:
                     detail="Post not found"
                 )
             
-            # Check if user has access to the channel
-            channel = await db.chats.find_one({"_id": ObjectId(post["channel_id"])})
-            if not channel:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Channel not found"
-                )
-            
+            # Check if user has access to the channel. The channel id comes from
+            # the post, so this can't run alongside it; the membership cache
+            # usually answers without a query.
             user_id = current_user["sub"]
-            if user_id not in channel.get("participants", []):
+            if not await membership_cache.is_participant(db, post["channel_id"], user_id):
+                # Only rejections pay for telling a deleted channel from a non-member
+                channel = await db.chats.find_one({"_id": ObjectId(post["channel_id"])}, {"_id": 1})
+                if not channel:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Channel not found"
+                    )
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="You must be subscribed to react to posts"
@@ -259,6 +318,7 @@ def create_post_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 {"_id": ObjectId(post_id)},
                 {"$set": {"reactions": reactions, "updated_at": datetime.utcnow()}}
             )
+            post_cache.reactions_changed(post["channel_id"], post_id, reactions)
             
             return {"message": "Reaction updated successfully", "reactions": reactions}
             
@@ -314,6 +374,16 @@ def create_post_router(db: AsyncIOMotorDatabase) -> APIRouter:
                     detail="Post not found"
                 )
             
+            timeline_fanout.post_deleted(channel, post_id)
+            post_cache.invalidate(post["channel_id"])
+            
+            await change_log.record_change(
+                db,
+                change_log.ChangeType.POST_DELETED,
+                chat_id=post["channel_id"],
+                entity_id=post_id
+            )
+            
             return {"message": "Post deleted successfully"}
             
         except HTTPException:
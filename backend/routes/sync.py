@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
+import logging
+
+from ..models.sync import SyncResponse
+from ..utils.auth import get_current_user
+from ..utils.request_stats import TimedRoute
+from ..utils import change_log
+
+logger = logging.getLogger(__name__)
+
+def create_sync_router(db: AsyncIOMotorDatabase) -> APIRouter:
+    router = APIRouter(tags=["sync"], route_class=TimedRoute)
+    
+    @router.get("/sync", response_model=SyncResponse, response_model_exclude_none=True)
+    async def sync_changes(
+        since: int = Query(0, ge=0),
+        limit: int = Query(200, ge=1, le=1000),
+        current_user: dict = Depends(get_current_user)
+    ):
+        """Get changes visible to the current user after sequence number `since`"""
+        try:
+            user_id = current_user["sub"]
+            
+            # Only the ids of the user's chats are needed to scope the log
+            chats = await db.chats.find({"participants": user_id}, {"_id": 1}).to_list(length=None)
+            chat_ids = [str(chat["_id"]) for chat in chats]
+            
+            return await change_log.get_changes(db, user_id, chat_ids, since, limit)
+            
+        except Exception as e:
+            logger.error(f"Error syncing changes: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to sync changes"
+            )
+    
+    return router
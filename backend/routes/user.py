@@ -5,13 +5,16 @@ from typing import List, Optional
 from bson import ObjectId
 import logging
 
-from ..models.user import User, UserResponse
+from ..models.user import User, UserResponse, PresenceQuery, PresenceStatus
 from ..utils.auth import get_current_user
+from ..utils.request_stats import TimedRoute
+from ..utils.data_access import reads
+from ..utils.presence import presence, PRESENCE_TIMEOUT_SECONDS
 
 logger = logging.getLogger(__name__)
 
 def create_user_router(db: AsyncIOMotorDatabase) -> APIRouter:
-    router = APIRouter(prefix="/users", tags=["users"])
+    router = APIRouter(prefix="/users", tags=["users"], route_class=TimedRoute)
     
     @router.get("/search", response_model=List[UserResponse])
     async def search_users(
@@ -33,7 +36,7 @@ def create_user_router(db: AsyncIOMotorDatabase) -> APIRouter:
             }
             
             # Find users
-            users_cursor = db.users.find(search_filter).limit(limit)
+            users_cursor = reads(db, "user_search").users.find(search_filter).limit(limit)
             users = await users_cursor.to_list(length=None)
             
             user_responses = []
@@ -46,8 +49,8 @@ def create_user_router(db: AsyncIOMotorDatabase) -> APIRouter:
                     username=user.username,
                     avatar=user.avatar,
                     trust_score=user.trust_score,
-                    is_online=user.is_online,
-                    last_seen=user.last_seen,
+                    is_online=presence.is_online(str(user_doc["_id"])) or user.is_online,
+                    last_seen=presence.last_seen(str(user_doc["_id"])) or user.last_seen,
                     created_at=user.created_at
                 ))
             
@@ -60,6 +63,52 @@ def create_user_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 detail="Failed to search users"
             )
     
+    @router.post("/heartbeat")
+    async def heartbeat(current_user: dict = Depends(get_current_user)):
+        """Keep the current user online (activity is recorded by authentication)"""
+        return {"is_online": True, "timeout": PRESENCE_TIMEOUT_SECONDS}
+    
+    @router.post("/presence", response_model=List[PresenceStatus])
+    async def get_presence(
+        presence_query: PresenceQuery,
+        current_user: dict = Depends(get_current_user)
+    ):
+        """Get online status for a batch of users (chat headers, member lists)"""
+        try:
+            user_ids = list(dict.fromkeys(presence_query.user_ids))
+            online = presence.online_among(user_ids)
+            
+            # Offline users only need last_seen, fetched in one query
+            offline_ids = [ObjectId(uid) for uid in user_ids if uid not in online and ObjectId.is_valid(uid)]
+            stored = {}
+            if offline_ids:
+                users = await db.users.find(
+                    {"_id": {"$in": offline_ids}},
+                    {"is_online": 1, "last_seen": 1}
+                ).to_list(length=None)
+                stored = {str(user_doc["_id"]): user_doc for user_doc in users}
+            
+            statuses = []
+            for uid in user_ids:
+                if uid in online:
+                    statuses.append(PresenceStatus(user_id=uid, is_online=True, last_seen=online[uid]))
+                else:
+                    user_doc = stored.get(uid, {})
+                    statuses.append(PresenceStatus(
+                        user_id=uid,
+                        is_online=user_doc.get("is_online", False),
+                        last_seen=user_doc.get("last_seen")
+                    ))
+            
+            return statuses
+            
+        except Exception as e:
+            logger.error(f"Error getting presence: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to get presence"
+            )
+    
     @router.get("/{user_id}", response_model=UserResponse)
     async def get_user_profile(
         user_id: str,
@@ -90,8 +139,8 @@ def create_user_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 username=user.username,
                 avatar=user.avatar,
                 trust_score=user.trust_score,
-                is_online=user.is_online,
-                last_seen=user.last_seen,
+                is_online=presence.is_online(str(user_doc["_id"])) or user.is_online,
+                last_seen=presence.last_seen(str(user_doc["_id"])) or user.last_seen,
                 created_at=user.created_at
             )
             
@@ -159,8 +208,8 @@ def create_user_router(db: AsyncIOMotorDatabase) -> APIRouter:
                 username=user.username,
                 avatar=user.avatar,
                 trust_score=user.trust_score,
-                is_online=user.is_online,
-                last_seen=user.last_seen,
+                is_online=presence.is_online(str(updated_user_doc["_id"])) or user.is_online,
+                last_seen=presence.last_seen(str(updated_user_doc["_id"])) or user.last_seen,
                 created_at=user.created_at
             )
             
@@ -183,7 +232,7 @@ def create_user_router(db: AsyncIOMotorDatabase) -> APIRouter:
         try:
             skip = (page - 1) * limit
             
-            users_cursor = db.users.find().skip(skip).limit(limit).sort("created_at", -1)
+            users_cursor = reads(db, "user_search").users.find().skip(skip).limit(limit).sort("created_at", -1)
             users = await users_cursor.to_list(length=None)
             
             user_responses = []
@@ -196,8 +245,8 @@ def create_user_router(db: AsyncIOMotorDatabase) -> APIRouter:
                     username=user.username,
                     avatar=user.avatar,
                     trust_score=user.trust_score,
-                    is_online=user.is_online,
-                    last_seen=user.last_seen,
+                    is_online=presence.is_online(str(user_doc["_id"])) or user.is_online,
+                    last_seen=presence.last_seen(str(user_doc["_id"])) or user.last_seen,
                     created_at=user.created_at
                 ))
             
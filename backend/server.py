@@ -1,8 +1,10 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Depends, Query
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
@@ -15,13 +17,37 @@ from .routes.auth import create_auth_router
 from .routes.chat import create_chat_router
 from .routes.user import create_user_router
 from .routes.post import create_post_router
+from .routes.sync import create_sync_router
+from .routes.feed import create_feed_router
+from .routes.app import create_app_router
+from .routes.admin import create_admin_router
+from .utils.lifecycle import lifecycle, MONGO_MIN_POOL_SIZE
+from .utils.presence import presence
+from .utils.message_archive import message_archive
+from .utils.timelines import timeline_fanout
+from .utils.app_catalog import app_catalog
+from .utils.app_ratings import rating_reconciler
+from .utils.write_coalescer import message_coalescer
+from .utils.rate_limit import rate_limiter
+from .utils.metrics import registry, MetricsMiddleware, mongo_command_metrics, mongo_pool_metrics
+from .utils.profiler import slow_query_profiler
+from .utils.request_stats import RequestStatsMiddleware, request_stats_listener
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    event_listeners=[
+        mongo_command_metrics,
+        mongo_pool_metrics,
+        slow_query_profiler,
+        request_stats_listener
+    ]
+)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
@@ -52,29 +78,60 @@ async def create_status_check(input: StatusCheckCreate):
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
+async def get_status_checks(limit: int = Query(100, ge=1, le=1000)):
+    status_checks = await db.status_checks.find().sort("timestamp", -1).to_list(limit)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
 # Include auth routes
 auth_router = create_auth_router(db)
-api_router.include_router(auth_router)
+api_router.include_router(auth_router, dependencies=[Depends(rate_limiter.limit("auth"))])
 
 # Include chat routes
 chat_router = create_chat_router(db)
-api_router.include_router(chat_router)
+api_router.include_router(chat_router, dependencies=[Depends(rate_limiter.limit("chats"))])
 
 # Include user routes
 user_router = create_user_router(db)
-api_router.include_router(user_router)
+api_router.include_router(user_router, dependencies=[Depends(rate_limiter.limit("users"))])
 
 # Include post routes
 post_router = create_post_router(db)
-api_router.include_router(post_router)
+api_router.include_router(post_router, dependencies=[Depends(rate_limiter.limit("posts"))])
+
+# Include sync routes
+sync_router = create_sync_router(db)
+api_router.include_router(sync_router, dependencies=[Depends(rate_limiter.limit("sync"))])
+
+# Include home feed routes
+feed_router = create_feed_router(db)
+api_router.include_router(feed_router, dependencies=[Depends(rate_limiter.limit("feed"))])
+
+# Include app store routes
+app_router = create_app_router(db)
+api_router.include_router(app_router, dependencies=[Depends(rate_limiter.limit("apps"))])
+
+# Include admin routes
+admin_router = create_admin_router(db)
+api_router.include_router(admin_router)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the worker's event loop is serving requests"""
+    return lifecycle.liveness()
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: pool warmed, MongoDB reachable and not shutting down"""
+    readiness = await lifecycle.readiness(db)
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -83,6 +140,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(RequestStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -94,17 +154,37 @@ logger = logging.getLogger(__name__)
 async def startup_event():
     logger.info("EMI API starting up...")
     
-    # Create indexes
-    try:
-        await db.users.create_index([("wallet_address", 1), ("network", 1)], unique=True)
-        await db.chats.create_index("participants")
-        await db.messages.create_index([("chat_id", 1), ("timestamp", -1)])
-        await db.posts.create_index([("channel_id", 1), ("created_at", -1)])
-        await db.posts.create_index("author_id")
-        logger.info("Database indexes created successfully")
-    except Exception as e:
-        logger.warning(f"Error creating indexes: {e}")
+    # Explain slow queries on this worker's event loop
+    slow_query_profiler.attach(client, asyncio.get_running_loop())
+    
+    # Verify indexes and warm the connection pool in the background
+    await lifecycle.startup(db)
+    
+    # Start presence expiry and last_seen flushes
+    presence.start(db)
+    
+    # Move old messages to the archive (MESSAGE_ARCHIVE_ENABLED)
+    message_archive.start(db)
+    
+    # Fan new posts out to subscriber timelines
+    timeline_fanout.start(db)
+    
+    # Keep the app catalog snapshot fresh
+    app_catalog.start(db)
+    
+    # Check app rating sums against reviews
+    rating_reconciler.start(db)
+    
+    # Group-commit message inserts (MESSAGE_WRITE_COALESCING)
+    message_coalescer.start(db)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    lifecycle.shutdown()
+    await message_coalescer.stop()
+    await rating_reconciler.stop()
+    await app_catalog.stop()
+    await timeline_fanout.stop(db)
+    await message_archive.stop()
+    await presence.stop(db)
     client.close()
@@ -0,0 +1,156 @@
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import os
+import re
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from ..models.app import App
+from .data_access import reads
+
+logger = logging.getLogger(__name__)
+
+# Catalog snapshot settings
+APP_CATALOG_REFRESH_SECONDS = float(os.getenv("APP_CATALOG_REFRESH_SECONDS", "300"))
+# Lower bound between refreshes triggered by writes
+APP_CATALOG_MIN_REFRESH_SECONDS = float(os.getenv("APP_CATALOG_MIN_REFRESH_SECONDS", "1"))
+
+SORT_KEYS = {
+    "rating": lambda app: (-app.rating, -app.rating_count),
+    "downloads": lambda app: -app.download_count,
+    "name": lambda app: app.name,
+    "updated": lambda app: -app.last_updated.timestamp(),
+}
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def app_from_doc(doc: dict) -> App:
+    """App model from a db.apps document, keeping its Mongo id"""
+    return App(**{**doc, "id": str(doc["_id"])})
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+class CatalogSnapshot:
+    """Immutable view of the catalog with precomputed orders and indexes"""
+
+    def __init__(self, apps: List[App]):
+        self.apps = apps
+        self.by_id: Dict[str, App] = {app.id: app for app in apps}
+        self.loaded_at = datetime.utcnow()
+        # Positions into self.apps, per sort key and per (category, sort key)
+        self.orders: Dict[str, List[int]] = {}
+        self.category_orders: Dict[Tuple[str, str], List[int]] = {}
+        for sort_by, key in SORT_KEYS.items():
+            order = sorted(range(len(apps)), key=lambda position: key(apps[position]))
+            self.orders[sort_by] = order
+            for position in order:
+                self.category_orders.setdefault((apps[position].category, sort_by), []).append(position)
+
+        postings: Dict[str, Set[int]] = {}
+        for position, app in enumerate(apps):
+            for field in (app.name, app.developer, app.description):
+                for token in tokenize(field):
+                    postings.setdefault(token, set()).add(position)
+        self.tokens = sorted(postings)
+        self.postings = [postings[token] for token in self.tokens]
+
+    def _prefix_matches(self, prefix: str) -> Set[int]:
+        matches: Set[int] = set()
+        start = bisect_left(self.tokens, prefix)
+        for index in range(start, len(self.tokens)):
+            if not self.tokens[index].startswith(prefix):
+                break
+            matches |= self.postings[index]
+        return matches
+
+    def search(self, query: str) -> Set[int]:
+        """Apps where every query word prefixes a word of name, developer or description"""
+        matches: Optional[Set[int]] = None
+        for word in tokenize(query):
+            word_matches = self._prefix_matches(word)
+            matches = word_matches if matches is None else matches & word_matches
+            if not matches:
+                break
+        return matches if matches is not None else set()
+
+    def page(self, sort_by: str, skip: int, limit: int, category: Optional[str] = None,
+             search: Optional[str] = None) -> Tuple[List[App], int]:
+        """Apps for one page and the total matching count"""
+        order = self.category_orders.get((category, sort_by), []) if category else self.orders[sort_by]
+        if search and tokenize(search):
+            matches = self.search(search)
+            order = [position for position in order if position in matches]
+        return [self.apps[position] for position in order[skip:skip + limit]], len(order)
+
+class AppCatalog:
+    """In-memory snapshot of db.apps for listing, filtering and search.
+
+    The catalog is small and changes rarely, so it is loaded whole and
+    swapped atomically. A background task reloads it every
+    APP_CATALOG_REFRESH_SECONDS, and sooner after invalidate() is called by
+    a write in this process. Those reloads read from the primary so they
+    include the write; periodic ones may use a secondary.
+    """
+
+    def __init__(self):
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self._lock = asyncio.Lock()
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self, db: AsyncIOMotorDatabase, after_write: bool = False) -> CatalogSnapshot:
+        apps = []
+        source = reads(db, "read_after_write" if after_write else "app_listing")
+        async for doc in source.apps.find():
+            try:
+                apps.append(app_from_doc(doc))
+            except ValueError as e:
+                logger.warning(f"Skipping invalid app {doc.get('_id')} in catalog: {e}")
+        self.snapshot = CatalogSnapshot(apps)
+        return self.snapshot
+
+    async def get(self, db: AsyncIOMotorDatabase) -> CatalogSnapshot:
+        """Current snapshot, loading it on first use"""
+        if self.snapshot is None:
+            async with self._lock:
+                if self.snapshot is None:
+                    await self.refresh(db)
+        return self.snapshot
+
+    def invalidate(self):
+        """Ask the refresh task to reload after a catalog write"""
+        self._changed.set()
+
+    async def _run(self, db: AsyncIOMotorDatabase):
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=APP_CATALOG_REFRESH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            after_write = self._changed.is_set()
+            self._changed.clear()
+            try:
+                async with self._lock:
+                    await self.refresh(db, after_write=after_write)
+            except Exception as e:
+                logger.error(f"Error refreshing app catalog: {e}")
+            await asyncio.sleep(APP_CATALOG_MIN_REFRESH_SECONDS)
+
+    def start(self, db: AsyncIOMotorDatabase):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+app_catalog = AppCatalog()
@@ -0,0 +1,152 @@
+from datetime import datetime
+from typing import Dict, Optional
+import asyncio
+import os
+import logging
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Rating reconciliation settings
+APP_RATING_RECONCILE_SECONDS = int(os.getenv("APP_RATING_RECONCILE_SECONDS", "3600"))
+
+STARS = ("1", "2", "3", "4", "5")
+
+def app_filter_for(app_id: str) -> dict:
+    return {"_id": ObjectId(app_id)} if ObjectId.is_valid(app_id) else {"_id": app_id}
+
+def rating_fields(rating_sum: int, rating_count: int, histogram: Dict[str, int]) -> dict:
+    return {
+        "rating": round(rating_sum / rating_count, 1) if rating_count else 0.0,
+        "rating_sum": rating_sum,
+        "rating_count": rating_count,
+        "rating_histogram": {star: histogram.get(star, 0) for star in STARS},
+    }
+
+async def add_rating(db: AsyncIOMotorDatabase, app_id: str, rating: int) -> Optional[dict]:
+    """Count one new review in the app's running sums; O(1) in the number of reviews"""
+    app_filter = app_filter_for(app_id)
+    app = await db.apps.find_one_and_update(
+        app_filter,
+        {"$inc": {"rating_sum": rating, "rating_count": 1, f"rating_histogram.{rating}": 1}},
+        projection={"rating_sum": 1, "rating_count": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if app:
+        # Only applies if no other review was counted meanwhile; that one sets it instead
+        await db.apps.update_one(
+            {**app_filter, "rating_sum": app["rating_sum"], "rating_count": app["rating_count"]},
+            {"$set": {
+                "rating": round(app["rating_sum"] / app["rating_count"], 1),
+                "updated_at": datetime.utcnow()
+            }}
+        )
+    return app
+
+async def rebuild(db: AsyncIOMotorDatabase, app_id: str) -> dict:
+    """Recompute the app's rating fields from its reviews"""
+    histogram = {}
+    async for row in db.app_reviews.aggregate([
+        {"$match": {"app_id": app_id}},
+        {"$group": {"_id": "$rating", "count": {"$sum": 1}}}
+    ]):
+        histogram[str(row["_id"])] = row["count"]
+    fields = rating_fields(
+        sum(int(star) * count for star, count in histogram.items()),
+        sum(histogram.values()),
+        histogram
+    )
+    await db.apps.update_one(app_filter_for(app_id), {"$set": {**fields, "updated_at": datetime.utcnow()}})
+    return fields
+
+class RatingReconciler:
+    """Periodically checks apps' running rating sums against their reviews.
+
+    create_app_review only increments the sums, so a failure between the
+    review insert and the increment would leave them off for good. This
+    job recomputes every reviewed app's sums in one aggregation. A review
+    being written can make an app look off for a moment, so an app is only
+    fixed when the same mismatch is seen on two consecutive runs.
+    """
+
+    def __init__(self, interval_seconds: int = APP_RATING_RECONCILE_SECONDS, batch_size: int = 1000):
+        self.interval = interval_seconds
+        self.batch_size = batch_size
+        self._suspects: Dict[str, tuple] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self, db: AsyncIOMotorDatabase) -> int:
+        histograms: Dict[str, Dict[str, int]] = {}
+        async for row in db.app_reviews.aggregate([
+            {"$group": {"_id": {"app_id": "$app_id", "rating": "$rating"}, "count": {"$sum": 1}}}
+        ], allowDiskUse=True):
+            histograms.setdefault(row["_id"]["app_id"], {})[str(row["_id"]["rating"])] = row["count"]
+
+        # Fetch the reviewed apps in batches rather than one round trip each
+        apps: Dict[str, dict] = {}
+        app_ids = list(histograms)
+        for start in range(0, len(app_ids), self.batch_size):
+            cursor = db.apps.find(
+                {"_id": {"$in": [app_filter_for(app_id)["_id"] for app_id in app_ids[start:start + self.batch_size]]}},
+                {"rating_sum": 1, "rating_count": 1, "rating_histogram": 1}
+            )
+            async for app in cursor:
+                apps[str(app["_id"])] = app
+
+        operations = []
+        suspects = {}
+        for app_id, histogram in histograms.items():
+            expected = rating_fields(
+                sum(int(star) * count for star, count in histogram.items()),
+                sum(histogram.values()),
+                histogram
+            )
+            app = apps.get(str(app_id))
+            if not app:
+                continue
+            actual_histogram = app.get("rating_histogram") or {}
+            if (app.get("rating_sum") != expected["rating_sum"]
+                    or app.get("rating_count") != expected["rating_count"]
+                    or any(actual_histogram.get(star, 0) != count for star, count in expected["rating_histogram"].items())):
+                actual = (app.get("rating_sum"), app.get("rating_count"), expected["rating_sum"], expected["rating_count"])
+                suspects[app_id] = actual
+                if self._suspects.get(app_id) == actual:
+                    # Match the values just read so a concurrent review isn't overwritten
+                    operations.append(UpdateOne(
+                        {"_id": app["_id"], "rating_sum": app.get("rating_sum"), "rating_count": app.get("rating_count")},
+                        {"$set": expected}
+                    ))
+        self._suspects = suspects
+
+        if operations:
+            await db.apps.bulk_write(operations, ordered=False)
+            logger.info(f"Reconciled ratings of {len(operations)} apps")
+        return len(operations)
+
+    async def _run(self, db: AsyncIOMotorDatabase):
+        while True:
+            # Wait first: every worker starts one of these, and a restart
+            # shouldn't set them all aggregating the reviews at once
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once(db)
+            except Exception as e:
+                logger.error(f"Error reconciling app ratings: {e}")
+
+    def start(self, db: AsyncIOMotorDatabase):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+rating_reconciler = RatingReconciler()
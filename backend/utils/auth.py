@@ -5,6 +5,8 @@ import os
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+from .presence import presence
+
 # JWT settings
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
@@ -44,4 +46,20 @@ def verify_token(token: str) -> dict:
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """Get current user from JWT token"""
-    return verify_token(credentials.credentials)
\ No newline at end of file
+    payload = verify_token(credentials.credentials)
+    # Any authenticated request counts as activity for presence
+    if payload.get("sub"):
+        presence.touch(payload["sub"])
+    return payload
+
+# Comma-separated user IDs allowed to use the admin endpoints
+ADMIN_USER_IDS = {user_id.strip() for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
+
+def get_admin_user(current_user: dict = Depends(get_current_user)) -> dict:
+    """Get current user and require admin rights"""
+    if current_user.get("sub") not in ADMIN_USER_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    return current_user
@@ -0,0 +1,186 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+import os
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Change log settings
+CHANGE_LOG_RETENTION_DAYS = int(os.getenv("CHANGE_LOG_RETENTION_DAYS", "7"))
+# Sequence numbers are allocated before the entry is inserted, so a reader could
+# see seq N+1 before seq N lands. Readers stop at such a gap until it is this
+# old by the server's clock; after that its entry is taken to have failed.
+CHANGE_LOG_SETTLE_MS = int(os.getenv("CHANGE_LOG_SETTLE_MS", "1000"))
+# Sequence numbers checked for gaps per read
+CHANGE_LOG_SCAN_SIZE = int(os.getenv("CHANGE_LOG_SCAN_SIZE", "2000"))
+
+SEQUENCE_COUNTER_ID = "change_log"
+CLOCK_COUNTER_ID = "change_log_clock"
+
+class ChangeType:
+    CHAT_CREATED = "chat.created"
+    CHAT_UPDATED = "chat.updated"
+    CHAT_SUBSCRIBED = "chat.subscribed"
+    MESSAGE_CREATED = "message.created"
+    POST_CREATED = "post.created"
+    POST_DELETED = "post.deleted"
+
+def compact(data: dict) -> dict:
+    """Drop empty fields so deltas stay small on the wire"""
+    return {key: value for key, value in data.items() if value is not None}
+
+async def next_sequence(db: AsyncIOMotorDatabase, count: int = 1) -> int:
+    """Allocate count sequence numbers and return the last one"""
+    counter = await db.counters.find_one_and_update(
+        {"_id": SEQUENCE_COUNTER_ID},
+        {"$inc": {"seq": count}, "$currentDate": {"allocated_at": True}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"]
+
+async def current_sequence(db: AsyncIOMotorDatabase) -> int:
+    counter = await db.counters.find_one({"_id": SEQUENCE_COUNTER_ID})
+    return counter["seq"] if counter else 0
+
+async def server_time(db: AsyncIOMotorDatabase) -> datetime:
+    """Current time by the database server's clock"""
+    clock = await db.counters.find_one_and_update(
+        {"_id": CLOCK_COUNTER_ID},
+        {"$currentDate": {"now": True}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return clock["now"]
+
+def entry_write(entry: dict) -> tuple:
+    """Filter and update that insert an entry stamped with the server's clock"""
+    fields = compact({key: value for key, value in entry.items() if key != "seq"})
+    return {"seq": entry["seq"]}, {"$setOnInsert": fields, "$currentDate": {"created_at": True}}
+
+async def record_change(
+    db: AsyncIOMotorDatabase,
+    change_type: str,
+    chat_id: Optional[str] = None,
+    entity_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    data: Optional[dict] = None
+) -> Optional[int]:
+    """Append an entry to the change log.
+
+    Entries are visible to every participant of chat_id and, when set, to
+    user_id. Failures are logged and swallowed: sync falls back to a full
+    reload, the write that triggered the change must not fail because of it.
+    """
+    try:
+        seq = await next_sequence(db)
+        entry_filter, update = entry_write({
+            "seq": seq,
+            "type": change_type,
+            "chat_id": chat_id,
+            "entity_id": entity_id,
+            "user_id": user_id,
+            "data": compact(data) if data else None
+        })
+        await db.change_log.update_one(entry_filter, update, upsert=True)
+        return seq
+    except Exception as e:
+        logger.warning(f"Error recording change {change_type}: {e}")
+        return None
+
+async def record_changes(db: AsyncIOMotorDatabase, changes: List[dict]) -> Optional[int]:
+    """Append several entries with one sequence allocation and one write.
+
+    Each change holds record_change's arguments (type, chat_id, entity_id,
+    user_id, data); entries get consecutive seqs in list order. Returns the
+    last seq. Failures are logged and swallowed like record_change.
+    """
+    if not changes:
+        return None
+    try:
+        last = await next_sequence(db, len(changes))
+        first = last - len(changes) + 1
+        operations = []
+        for seq, change in enumerate(changes, start=first):
+            entry_filter, update = entry_write({
+                "seq": seq,
+                "type": change["type"],
+                "chat_id": change.get("chat_id"),
+                "entity_id": change.get("entity_id"),
+                "user_id": change.get("user_id"),
+                "data": compact(change["data"]) if change.get("data") else None
+            })
+            operations.append(UpdateOne(entry_filter, update, upsert=True))
+        await db.change_log.bulk_write(operations, ordered=False)
+        return last
+    except Exception as e:
+        logger.warning(f"Error recording {len(changes)} changes: {e}")
+        return None
+
+async def settled_until(db: AsyncIOMotorDatabase, since: int, allocated_at: Optional[datetime]) -> tuple:
+    """Highest seq after since below which every seq has an entry or was given up on.
+
+    Returns it with whether the scan window was exhausted. A gap is given up
+    on once the entry after it is CHANGE_LOG_SETTLE_MS old, measured
+    against server-stamped times only.
+    """
+    settle = timedelta(milliseconds=CHANGE_LOG_SETTLE_MS)
+    scanned = await db.change_log.find(
+        {"seq": {"$gt": since}}, {"_id": 0, "seq": 1, "created_at": 1}
+    ).sort("seq", 1).limit(CHANGE_LOG_SCAN_SIZE).to_list(length=CHANGE_LOG_SCAN_SIZE)
+
+    settled = since
+    now = None
+    for entry in scanned:
+        if entry["seq"] != settled + 1:
+            # The missing seqs were allocated before this entry was written
+            if allocated_at is None or allocated_at - entry["created_at"] < settle:
+                if now is None:
+                    now = await server_time(db)
+                if now - entry["created_at"] < settle:
+                    return settled, False
+        settled = entry["seq"]
+    return settled, len(scanned) == CHANGE_LOG_SCAN_SIZE
+
+async def get_changes(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    chat_ids: List[str],
+    since: int,
+    limit: int
+) -> dict:
+    """Return up to limit changes after since that are visible to the user"""
+    counter = await db.counters.find_one({"_id": SEQUENCE_COUNTER_ID})
+    latest = counter["seq"] if counter else 0
+
+    # A fresh client or one that fell behind the retention window must reload
+    oldest = await db.change_log.find_one({}, {"seq": 1}, sort=[("seq", 1)])
+    if since <= 0 or since > latest or (oldest and since < oldest["seq"] - 1):
+        return {"changes": [], "next_since": latest, "has_more": False, "reset": True}
+
+    # Never hand out entries past a seq that may still be written
+    until, truncated = await settled_until(db, since, counter.get("allocated_at"))
+    entries = await db.change_log.find(
+        {
+            "seq": {"$gt": since, "$lte": until},
+            "$or": [
+                {"chat_id": {"$in": chat_ids}},
+                {"user_id": user_id}
+            ]
+        },
+        {"_id": 0, "created_at": 0}
+    ).sort("seq", 1).limit(limit + 1).to_list(length=limit + 1)
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    return {
+        "changes": entries,
+        # Past entries the user can't see too, so they aren't scanned again
+        "next_since": entries[-1]["seq"] if has_more else until,
+        "has_more": has_more or truncated,
+        "reset": False
+    }
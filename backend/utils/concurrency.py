@@ -0,0 +1,30 @@
+from typing import Any, Awaitable, Optional, Tuple
+import asyncio
+import os
+
+# Upper bound for a group of concurrent sub-queries within one request
+QUERY_GROUP_TIMEOUT_SECONDS = float(os.getenv("QUERY_GROUP_TIMEOUT_SECONDS", "10"))
+
+async def gather_queries(*queries: Awaitable, timeout: Optional[float] = QUERY_GROUP_TIMEOUT_SECONDS) -> Tuple[Any, ...]:
+    """Run independent queries concurrently and return their results in order.
+
+    Unlike a bare asyncio.gather, the group is structured: if one query
+    fails or the timeout expires, the others are cancelled and awaited
+    before the error (or asyncio.TimeoutError) propagates, and cancelling
+    the caller cancels all of them. Latency is that of the slowest query.
+    """
+    tasks = [asyncio.ensure_future(query) for query in queries]
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_EXCEPTION)
+        errors = [task.exception() for task in tasks if task in done and not task.cancelled() and task.exception()]
+        if errors:
+            raise errors[0]
+        if pending:
+            raise asyncio.TimeoutError(f"Queries did not finish within {timeout}s")
+        return tuple(task.result() for task in tasks)
+    finally:
+        unfinished = [task for task in tasks if not task.done()]
+        for task in unfinished:
+            task.cancel()
+        if unfinished:
+            await asyncio.gather(*unfinished, return_exceptions=True)
@@ -0,0 +1,69 @@
+from typing import Dict, Optional, Tuple
+import os
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = "primary"
+SECONDARY_PREFERRED = "secondaryPreferred"
+
+# Read preference settings. MongoDB requires a max staleness of at least 90s;
+# -1 disables the staleness bound.
+READ_MAX_STALENESS_SECONDS = int(os.getenv("READ_MAX_STALENESS_SECONDS", "90"))
+SECONDARY_READS_ENABLED = os.getenv("SECONDARY_READS_ENABLED", "true").lower() == "true"
+
+# Consistency needs per query class. Auth and permission checks, and reads
+# of data the caller just wrote, must see the primary. List and search
+# traffic tolerates replication lag and is served by secondaries.
+QUERY_CLASSES: Dict[str, str] = {
+    "auth": PRIMARY,
+    "membership": PRIMARY,
+    "read_after_write": PRIMARY,
+    "channel_feed": SECONDARY_PREFERRED,
+    "user_search": SECONDARY_PREFERRED,
+    "channel_search": SECONDARY_PREFERRED,
+    "app_listing": SECONDARY_PREFERRED,
+}
+
+def load_query_classes() -> Dict[str, str]:
+    """QUERY_CLASSES overridden by READ_PREFERENCES="channel_feed=primary,..." """
+    classes = dict(QUERY_CLASSES)
+    for item in os.getenv("READ_PREFERENCES", "").split(","):
+        if "=" in item:
+            name, mode = (part.strip() for part in item.split("=", 1))
+            if mode not in (PRIMARY, SECONDARY_PREFERRED):
+                logger.warning(f"Ignoring unknown read preference {mode!r} for {name}")
+                continue
+            classes[name] = mode
+    return classes
+
+def read_preference(mode: str):
+    if mode == SECONDARY_PREFERRED and SECONDARY_READS_ENABLED:
+        return SecondaryPreferred(max_staleness=READ_MAX_STALENESS_SECONDS)
+    return Primary()
+
+class DataAccess:
+    """Database handles configured with the read preference of a query class"""
+
+    def __init__(self, query_classes: Optional[Dict[str, str]] = None):
+        self.query_classes = query_classes if query_classes is not None else load_query_classes()
+        self._handles: Dict[Tuple[int, str], Tuple[AsyncIOMotorDatabase, AsyncIOMotorDatabase]] = {}
+
+    def reads(self, db: AsyncIOMotorDatabase, query_class: str) -> AsyncIOMotorDatabase:
+        """`db` with the read preference declared for query_class"""
+        key = (id(db), query_class)
+        cached = self._handles.get(key)
+        if cached is not None and cached[0] is db:
+            return cached[1]
+
+        if query_class not in self.query_classes:
+            raise ValueError(f"Unknown query class: {query_class}")
+        handle = db.with_options(read_preference=read_preference(self.query_classes[query_class]))
+        self._handles[key] = (db, handle)
+        return handle
+
+data_access = DataAccess()
+reads = data_access.reads
@@ -0,0 +1,120 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+import asyncio
+import base64
+import heapq
+import json
+import os
+import logging
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+# Home feed settings
+FEED_MAX_CHANNELS_PER_PAGE = int(os.getenv("FEED_MAX_CHANNELS_PER_PAGE", "50"))
+FEED_OPEN_BATCH = int(os.getenv("FEED_OPEN_BATCH", "8"))  # channel queries issued concurrently
+
+FeedCursor = Tuple[datetime, ObjectId]
+
+def encode_cursor(post: dict) -> str:
+    payload = json.dumps({"t": post["created_at"].isoformat(), "id": str(post["_id"])})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(token: str) -> FeedCursor:
+    """Parse a continuation token; raises ValueError when malformed"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return datetime.fromisoformat(payload["t"]), ObjectId(payload["id"])
+    except Exception:
+        raise ValueError("Invalid feed cursor")
+
+class _Head:
+    """Newest unread post of one channel; orders newest first in a heap"""
+
+    __slots__ = ("post", "posts", "position")
+
+    def __init__(self, posts: List[dict]):
+        self.posts = posts
+        self.position = 0
+        self.post = posts[0]
+
+    @property
+    def key(self) -> FeedCursor:
+        return self.post["created_at"], self.post["_id"]
+
+    def __lt__(self, other: "_Head") -> bool:
+        return self.key > other.key
+
+    def advance(self) -> bool:
+        self.position += 1
+        if self.position < len(self.posts):
+            self.post = self.posts[self.position]
+            return True
+        return False
+
+def channel_bound(channel: dict, before: Optional[FeedCursor]) -> datetime:
+    """Upper bound for the creation time of any post the channel can add"""
+    # Channels without last_post_at predate its tracking and must always be scanned
+    bound = channel.get("last_post_at") or datetime.max
+    if before is not None and before[0] < bound:
+        return before[0]
+    return bound
+
+async def merge_channel_posts(
+    db: AsyncIOMotorDatabase,
+    channels: List[dict],
+    limit: int,
+    before: Optional[FeedCursor] = None,
+    max_channels: int = FEED_MAX_CHANNELS_PER_PAGE
+) -> Tuple[List[dict], bool]:
+    """Newest posts across channels, merged lazily.
+
+    Channels are opened in order of their last post time, and only while an
+    unopened channel could still beat the newest post in the heap, so a page
+    usually touches a few channels even for users in hundreds of them. Each
+    opened channel costs one indexed query of at most `limit` posts. Once
+    max_channels have been opened the page ends early (has_more stays true)
+    rather than returning posts out of order.
+    """
+    channels = sorted(channels, key=lambda channel: channel_bound(channel, before), reverse=True)
+    post_filter = {}
+    if before is not None:
+        post_filter = {"$or": [
+            {"created_at": {"$lt": before[0]}},
+            {"created_at": before[0], "_id": {"$lt": before[1]}}
+        ]}
+
+    async def open_channel(channel: dict) -> Optional[_Head]:
+        posts = await db.posts.find(
+            {"channel_id": str(channel["_id"]), **post_filter}
+        ).sort([("created_at", -1), ("_id", -1)]).limit(limit).to_list(length=None)
+        return _Head(posts) if posts else None
+
+    heap: List[_Head] = []
+    results: List[dict] = []
+    opened = 0
+    truncated = False
+
+    while len(results) < limit:
+        # Open channels whose newest possible post could come before the heap top
+        while opened < len(channels) and (not heap or channel_bound(channels[opened], before) >= heap[0].key[0]):
+            if opened >= max_channels and results:
+                truncated = True
+                break
+            batch = channels[opened:opened + FEED_OPEN_BATCH]
+            opened += len(batch)
+            for head in await asyncio.gather(*(open_channel(channel) for channel in batch)):
+                if head is not None:
+                    heapq.heappush(heap, head)
+        if truncated or not heap:
+            break
+
+        head = heapq.heappop(heap)
+        results.append(head.post)
+        if head.advance():
+            heapq.heappush(heap, head)
+
+    has_more = truncated or len(results) == limit
+    return results, has_more
@@ -0,0 +1,233 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from .change_log import CHANGE_LOG_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Options compared when checking an existing index against its declaration
+_COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: Tuple[Tuple[str, Any], ...]
+    options: Dict[str, Any] = field(default_factory=dict, hash=False)
+    query: str = ""  # the query shape this index serves
+
+    @property
+    def name(self) -> str:
+        return self.options.get("name") or "_".join(f"{key}_{direction}" for key, direction in self.keys)
+
+    def model(self) -> IndexModel:
+        return IndexModel(list(self.keys), background=True, **{"name": self.name, **self.options})
+
+    def differences(self, info: dict) -> List[str]:
+        """Differences between this declaration and an index_information() entry"""
+        differences = []
+        if [tuple(key) for key in info.get("key", [])] != [(key, direction) for key, direction in self.keys]:
+            differences.append(f"keys {info.get('key')} != {list(self.keys)}")
+        for option in _COMPARED_OPTIONS:
+            declared, actual = self.options.get(option), info.get(option)
+            if option in ("unique", "sparse"):
+                declared, actual = bool(declared), bool(actual)
+            if declared != actual:
+                differences.append(f"{option} {actual!r} != {declared!r}")
+        return differences
+
+def index(collection: str, keys: Sequence[Tuple[str, Any]], query: str = "", **options) -> IndexSpec:
+    return IndexSpec(collection=collection, keys=tuple(keys), options=options, query=query)
+
+# Every index the application relies on. Query shapes that cannot use an
+# index (case-insensitive $regex searches) are bounded by limits instead.
+INDEXES: List[IndexSpec] = [
+    # users
+    index("users", [("wallet_address", ASCENDING), ("network", ASCENDING)], unique=True,
+          query="login / register by wallet"),
+    index("users", [("created_at", DESCENDING)],
+          query="GET /users sorted by created_at"),
+
+    # chats
+    index("chats", [("participants", ASCENDING), ("updated_at", DESCENDING)],
+          query="chat list, chat search and sync membership by participant"),
+    index("chats", [("chat_type", ASCENDING), ("channel_username", ASCENDING)], unique=True,
+          partialFilterExpression={"chat_type": "channel", "channel_username": {"$type": "string"}},
+          query="channel username lookup and uniqueness"),
+    index("chats", [("chat_type", ASCENDING), ("is_public", ASCENDING), ("updated_at", DESCENDING)],
+          query="public channel search"),
+
+    # messages
+    index("messages", [("chat_id", ASCENDING), ("timestamp", DESCENDING)],
+          query="message history and unread counts"),
+    index("message_buckets", [("chat_id", ASCENDING), ("last_ts", DESCENDING)],
+          query="bucketed message pages, lookups and unread counts"),
+    index("message_archive", [("chat_id", ASCENDING), ("last_ts", DESCENDING)],
+          query="archived segment index of a chat"),
+
+    # posts
+    index("posts", [("channel_id", ASCENDING), ("sequence_number", DESCENDING)],
+          query="channel feed pages and next sequence number"),
+    index("posts", [("channel_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+          query="home feed merge per channel"),
+    index("posts", [("author_id", ASCENDING)],
+          query="posts by author"),
+
+    # apps
+    index("apps", [("category", ASCENDING), ("rating", DESCENDING), ("rating_count", DESCENDING)],
+          query="app listing by category sorted by rating"),
+    index("apps", [("rating", DESCENDING), ("rating_count", DESCENDING)],
+          query="app listing sorted by rating"),
+    index("apps", [("download_count", DESCENDING)],
+          query="app listing sorted by downloads"),
+    index("apps", [("last_updated", DESCENDING)],
+          query="app listing sorted by update time"),
+    index("app_reviews", [("app_id", ASCENDING), ("created_at", DESCENDING)],
+          query="latest reviews of an app"),
+    index("app_reviews", [("app_id", ASCENDING), ("user_id", ASCENDING)],
+          query="existing review by user"),
+
+    # status checks
+    index("status_checks", [("timestamp", DESCENDING)],
+          query="GET /status latest checks"),
+
+    # read state and sync
+    index("read_cursors", [("user_id", ASCENDING), ("chat_id", ASCENDING)], unique=True,
+          query="read cursors of a user"),
+    index("change_log", [("chat_id", ASCENDING), ("seq", ASCENDING)],
+          query="sync changes of a user's chats"),
+    index("change_log", [("user_id", ASCENDING), ("seq", ASCENDING)], sparse=True,
+          query="sync changes addressed to a user"),
+    index("change_log", [("seq", ASCENDING)], unique=True,
+          query="oldest retained sequence"),
+    index("change_log", [("created_at", ASCENDING)],
+          expireAfterSeconds=CHANGE_LOG_RETENTION_DAYS * 24 * 3600,
+          query="retention"),
+]
+
+class IndexRegistry:
+    """Verifies declared indexes against the database and builds missing ones.
+
+    verify() only lists indexes, so it is cheap enough to run on every boot.
+    Missing indexes are built in a background task; existing indexes whose
+    definition differs and undeclared indexes are reported, never dropped.
+    """
+
+    def __init__(self, indexes: List[IndexSpec] = INDEXES):
+        self.indexes = indexes
+        self.missing: List[str] = []
+        self.building: List[str] = []
+        self.built: List[str] = []
+        self.failed: Dict[str, str] = {}
+        self.changed: Dict[str, List[str]] = {}
+        self.unexpected: List[str] = []
+        self.checked_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def by_collection(self) -> Dict[str, List[IndexSpec]]:
+        collections: Dict[str, List[IndexSpec]] = {}
+        for spec in self.indexes:
+            collections.setdefault(spec.collection, []).append(spec)
+        return collections
+
+    async def verify(self, db: AsyncIOMotorDatabase) -> Dict[str, List[IndexSpec]]:
+        """Diff declared indexes against list_indexes(); returns the missing ones"""
+        missing: Dict[str, List[IndexSpec]] = {}
+        changed: Dict[str, List[str]] = {}
+        unexpected: List[str] = []
+
+        for collection, specs in self.by_collection().items():
+            existing = await db[collection].index_information()
+            declared = {spec.name for spec in specs}
+            for spec in specs:
+                info = existing.get(spec.name)
+                if info is None:
+                    missing.setdefault(collection, []).append(spec)
+                else:
+                    differences = spec.differences(info)
+                    if differences:
+                        changed[f"{collection}.{spec.name}"] = differences
+            unexpected.extend(f"{collection}.{name}" for name in existing
+                              if name != "_id_" and name not in declared)
+
+        # Missing indexes are recorded before checked_at, so verified can't be
+        # true between the check and the builds starting
+        self.missing = [f"{collection}.{spec.name}" for collection, specs in missing.items() for spec in specs]
+        self.changed = changed
+        self.unexpected = unexpected
+        self.checked_at = datetime.utcnow()
+
+        for name, differences in changed.items():
+            logger.warning(f"Index {name} differs from its declaration: {'; '.join(differences)}")
+        if unexpected:
+            logger.info(f"Undeclared indexes (not dropped): {', '.join(unexpected)}")
+        return missing
+
+    async def build(self, db: AsyncIOMotorDatabase, missing: Dict[str, List[IndexSpec]]):
+        """Build missing indexes, one create_indexes call per collection"""
+
+        async def build_collection(collection: str, specs: List[IndexSpec]):
+            names = [f"{collection}.{spec.name}" for spec in specs]
+            try:
+                await db[collection].create_indexes([spec.model() for spec in specs])
+                self.built.extend(names)
+                logger.info(f"Built indexes: {', '.join(names)}")
+            except Exception:
+                # Retry one by one so a single failure (e.g. duplicates) doesn't block the rest
+                for spec, name in zip(specs, names):
+                    try:
+                        await db[collection].create_indexes([spec.model()])
+                        self.built.append(name)
+                    except Exception as index_error:
+                        self.failed[name] = str(index_error)
+                        logger.error(f"Failed to build index {name}: {index_error}")
+            finally:
+                for name in names:
+                    self.building.remove(name)
+                    if name in self.missing and name not in self.failed:
+                        self.missing.remove(name)
+
+        # Register every build before any starts, so none looks finished early
+        self.building.extend(f"{collection}.{spec.name}" for collection, specs in missing.items() for spec in specs)
+        await asyncio.gather(*(build_collection(collection, specs) for collection, specs in missing.items()))
+
+    async def ensure(self, db: AsyncIOMotorDatabase):
+        try:
+            missing = await self.verify(db)
+            if missing:
+                await self.build(db, missing)
+            logger.info("Database indexes verified")
+        except Exception as e:
+            logger.warning(f"Error verifying indexes: {e}")
+
+    def start(self, db: AsyncIOMotorDatabase):
+        """Verify and build indexes without blocking startup"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.ensure(db))
+
+    @property
+    def verified(self) -> bool:
+        return self.checked_at is not None and not self.building and not self.missing
+
+    def report(self) -> dict:
+        return {
+            "checked_at": self.checked_at,
+            "declared": [
+                {"collection": spec.collection, "name": spec.name, "keys": [list(key) for key in spec.keys],
+                 "options": spec.options, "query": spec.query}
+                for spec in self.indexes
+            ],
+            "missing": self.missing,
+            "building": self.building,
+            "built": self.built,
+            "failed": self.failed,
+            "changed": self.changed,
+            "unexpected": self.unexpected,
+        }
+
+index_registry = IndexRegistry()
@@ -0,0 +1,133 @@
+from datetime import datetime
+from typing import Optional
+import asyncio
+import os
+import signal
+import time
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from .indexes import index_registry
+
+logger = logging.getLogger(__name__)
+
+# Lifecycle settings
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+POOL_WARMUP_TIMEOUT_SECONDS = float(os.getenv("POOL_WARMUP_TIMEOUT_SECONDS", "10"))
+POOL_WARMUP_RETRY_SECONDS = float(os.getenv("POOL_WARMUP_RETRY_SECONDS", "5"))
+READINESS_PING_TTL_SECONDS = float(os.getenv("READINESS_PING_TTL_SECONDS", "2"))
+READINESS_PING_TIMEOUT_SECONDS = float(os.getenv("READINESS_PING_TIMEOUT_SECONDS", "1"))
+READINESS_REQUIRES_INDEXES = os.getenv("READINESS_REQUIRES_INDEXES", "false").lower() == "true"
+
+class Lifecycle:
+    """Startup warm-up and liveness/readiness state for one worker.
+
+    The worker reports ready once the connection pool has been warmed to
+    MONGO_MIN_POOL_SIZE, so load balancers don't route traffic to it while
+    connections are still being established. Warm-up and index verification
+    run in the background, so startup doesn't block on MongoDB; indexes
+    only gate readiness with READINESS_REQUIRES_INDEXES. SIGTERM marks the
+    worker as draining before the server begins shutting down.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.utcnow()
+        self.warmed = False
+        self.draining = False
+        self._ping_ok = False
+        self._ping_error: Optional[str] = None
+        self._ping_checked = 0.0
+        self._ping_lock = asyncio.Lock()
+        self._warm_task: Optional[asyncio.Task] = None
+
+    async def warm_pool(self, db: AsyncIOMotorDatabase, connections: int = MONGO_MIN_POOL_SIZE) -> bool:
+        """Open connections up front by running concurrent pings"""
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(db.command("ping") for _ in range(max(connections, 1)))),
+                timeout=POOL_WARMUP_TIMEOUT_SECONDS
+            )
+        except Exception as e:
+            logger.warning(f"MongoDB pool warm-up failed: {e}")
+            return False
+        self._ping_ok, self._ping_checked = True, time.monotonic()
+        logger.info(f"Warmed MongoDB pool with {connections} connections "
+                    f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+        self.warmed = True
+        return True
+
+    async def _warm(self, db: AsyncIOMotorDatabase):
+        # Not ready until a warm-up succeeds, so keep retrying
+        while not await self.warm_pool(db):
+            await asyncio.sleep(POOL_WARMUP_RETRY_SECONDS)
+
+    def install_signal_handlers(self):
+        """Start draining as soon as SIGTERM arrives, then hand it to the server's handler"""
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def handle_sigterm(signum, frame):
+            self.draining = True
+            if callable(previous):
+                previous(signum, frame)
+            elif previous != signal.SIG_IGN:
+                signal.signal(signum, signal.SIG_DFL)
+                signal.raise_signal(signum)
+
+        try:
+            signal.signal(signal.SIGTERM, handle_sigterm)
+        except ValueError:
+            # Signal handlers can only be set from the main thread
+            logger.info("Not in the main thread; draining starts at shutdown")
+
+    async def startup(self, db: AsyncIOMotorDatabase):
+        index_registry.start(db)
+        self.install_signal_handlers()
+        if self._warm_task is None:
+            self._warm_task = asyncio.create_task(self._warm(db))
+
+    def shutdown(self):
+        """Fail readiness first so traffic drains before connections close"""
+        self.draining = True
+        if self._warm_task is not None:
+            self._warm_task.cancel()
+            self._warm_task = None
+
+    async def mongo_ok(self, db: AsyncIOMotorDatabase) -> bool:
+        """Mongo ping result, cached for READINESS_PING_TTL_SECONDS"""
+        if time.monotonic() - self._ping_checked < READINESS_PING_TTL_SECONDS:
+            return self._ping_ok
+        async with self._ping_lock:
+            # Probes arriving together share one ping
+            if time.monotonic() - self._ping_checked >= READINESS_PING_TTL_SECONDS:
+                try:
+                    await asyncio.wait_for(db.command("ping"), timeout=READINESS_PING_TIMEOUT_SECONDS)
+                    self._ping_ok, self._ping_error = True, None
+                except Exception as e:
+                    self._ping_ok, self._ping_error = False, str(e) or type(e).__name__
+                self._ping_checked = time.monotonic()
+        return self._ping_ok
+
+    async def readiness(self, db: AsyncIOMotorDatabase) -> dict:
+        mongo = await self.mongo_ok(db)
+        checks = {
+            "warmed": self.warmed,
+            "mongo": mongo,
+            "indexes": index_registry.verified,
+            "draining": self.draining,
+        }
+        ready = self.warmed and mongo and not self.draining
+        if READINESS_REQUIRES_INDEXES:
+            ready = ready and index_registry.verified
+        if self._ping_error and not mongo:
+            checks["mongo_error"] = self._ping_error
+        return {"ready": ready, "checks": checks}
+
+    def liveness(self) -> dict:
+        return {
+            "status": "ok",
+            "uptime_seconds": round((datetime.utcnow() - self.started_at).total_seconds(), 1),
+        }
+
+lifecycle = Lifecycle()
@@ -0,0 +1,70 @@
+from typing import Dict, Optional, Tuple
+import os
+import time
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from .data_access import reads
+
+# Membership cache settings
+MEMBERSHIP_CACHE_TTL_SECONDS = float(os.getenv("MEMBERSHIP_CACHE_TTL_SECONDS", "30"))
+MEMBERSHIP_CACHE_MAX_ENTRIES = int(os.getenv("MEMBERSHIP_CACHE_MAX_ENTRIES", "100000"))
+
+class MembershipCache:
+    """Short-lived cache of "is user a participant of chat" answers.
+
+    Entries are cached per (chat, user) rather than per chat so that
+    channels with huge participant lists never have to be loaded whole.
+    """
+
+    def __init__(self, ttl_seconds: float = MEMBERSHIP_CACHE_TTL_SECONDS,
+                 max_entries: int = MEMBERSHIP_CACHE_MAX_ENTRIES):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[str, Dict[str, Tuple[float, bool]]] = {}
+        self._size = 0
+
+    async def is_participant(self, db: AsyncIOMotorDatabase, chat_id: str, user_id: str) -> bool:
+        now = time.monotonic()
+        cached = self._entries.get(chat_id, {}).get(user_id)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        chat_filter = {"_id": ObjectId(chat_id)} if ObjectId.is_valid(chat_id) else {"_id": chat_id}
+        chat_filter["participants"] = user_id
+        is_member = await reads(db, "membership").chats.find_one(chat_filter, {"_id": 1}) is not None
+
+        self._store(chat_id, user_id, is_member, now)
+        return is_member
+
+    def _store(self, chat_id: str, user_id: str, is_member: bool, now: float):
+        if self._size >= self.max_entries:
+            self._prune(now)
+        chat_entries = self._entries.setdefault(chat_id, {})
+        if user_id not in chat_entries:
+            self._size += 1
+        chat_entries[user_id] = (now + self.ttl, is_member)
+
+    def _prune(self, now: float):
+        for chat_id in list(self._entries):
+            chat_entries = self._entries[chat_id]
+            for user_id in [uid for uid, (expires, _) in chat_entries.items() if expires <= now]:
+                del chat_entries[user_id]
+                self._size -= 1
+            if not chat_entries:
+                del self._entries[chat_id]
+        # Everything is still fresh: start over rather than grow without bound
+        if self._size >= self.max_entries:
+            self._entries.clear()
+            self._size = 0
+
+    def invalidate(self, chat_id: str, user_id: Optional[str] = None):
+        """Forget cached answers after participants change"""
+        if user_id is None:
+            self._size -= len(self._entries.pop(chat_id, {}))
+        elif user_id in self._entries.get(chat_id, {}):
+            del self._entries[chat_id][user_id]
+            self._size -= 1
+
+membership_cache = MembershipCache()
@@ -0,0 +1,258 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import asyncio
+import os
+import zlib
+import logging
+
+import bson
+from bson import Binary, ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from .message_store import BUCKETED_LAYOUT, MessageStore
+
+try:
+    import zstandard
+except ImportError:  # zlib fallback when zstandard isn't installed
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Archive settings
+MESSAGE_ARCHIVE_ENABLED = os.getenv("MESSAGE_ARCHIVE_ENABLED", "false").lower() == "true"
+MESSAGE_ARCHIVE_INTERVAL_SECONDS = int(os.getenv("MESSAGE_ARCHIVE_INTERVAL_SECONDS", "3600"))
+MESSAGE_ARCHIVE_SEGMENT_SIZE = int(os.getenv("MESSAGE_ARCHIVE_SEGMENT_SIZE", "1000"))
+# A worker archiving a chat holds its lease this long, renewed per segment
+MESSAGE_ARCHIVE_LEASE_SECONDS = int(os.getenv("MESSAGE_ARCHIVE_LEASE_SECONDS", "300"))
+# Days a message stays in db.messages, per chat type; 0 never archives
+DEFAULT_ARCHIVE_AFTER_DAYS: Dict[str, int] = {
+    "personal": 90,
+    "group": 60,
+    "channel": 30,
+    "secret": 0,  # secret messages expire instead
+}
+
+def load_archive_after_days() -> Dict[str, int]:
+    """Defaults overridden by MESSAGE_ARCHIVE_AFTER_DAYS="group=30,personal=120" """
+    days = dict(DEFAULT_ARCHIVE_AFTER_DAYS)
+    for item in os.getenv("MESSAGE_ARCHIVE_AFTER_DAYS", "").split(","):
+        if "=" in item:
+            chat_type, value = item.split("=", 1)
+            days[chat_type.strip()] = int(value)
+    return days
+
+def compress(data: bytes) -> tuple:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=3).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd archive segments")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+class MessageArchive:
+    """Cold tier for old messages of document-layout chats.
+
+    Messages past their chat type's threshold are moved from db.messages
+    into db.message_archive segments: one compressed BSON array of up to
+    MESSAGE_ARCHIVE_SEGMENT_SIZE messages plus chat_id, time range and
+    count. The segment fields without `data` act as the per-chat segment
+    index. Chats with archived messages carry `archived_until`, so reads
+    only look at the archive for those chats. Every worker runs the
+    archiver; a per-chat lease in db.message_archive_leases makes sure
+    only one of them moves a given chat at a time.
+    """
+
+    def __init__(self, segment_size: int = MESSAGE_ARCHIVE_SEGMENT_SIZE,
+                 archive_after_days: Optional[Dict[str, int]] = None,
+                 lease_seconds: int = MESSAGE_ARCHIVE_LEASE_SECONDS):
+        self.segment_size = segment_size
+        self.archive_after_days = archive_after_days if archive_after_days is not None else load_archive_after_days()
+        self.lease = timedelta(seconds=lease_seconds)
+        self.worker_id = str(ObjectId())
+        self._task: Optional[asyncio.Task] = None
+
+    # Reads
+
+    @staticmethod
+    def _unpack(segment: dict) -> List[dict]:
+        messages = bson.decode(decompress(segment["codec"], segment["data"]))["messages"]
+        for message in messages:
+            message["chat_id"] = segment["chat_id"]
+        return messages
+
+    async def page(self, db: AsyncIOMotorDatabase, chat_id: str, skip: int, limit: int,
+                   hot_returned: int, store: MessageStore) -> List[dict]:
+        """Continue a newest-first page past the hot window.
+
+        hot_returned is how many messages the chat's store contributed to
+        this page; when it is zero the page starts inside the archive.
+        """
+        needed = limit - hot_returned
+        if needed <= 0:
+            return []
+        archive_skip = 0
+        if hot_returned == 0:
+            hot_total = await store.count(db, chat_id)
+            archive_skip = max(skip - hot_total, 0)
+
+        messages: List[dict] = []
+        seen = set()
+        segments = db.message_archive.find(
+            {"chat_id": chat_id}, {"data": 0}
+        ).sort("last_ts", -1)
+        async for segment in segments:
+            if archive_skip >= segment["count"]:
+                # Skip whole segments without fetching or decompressing them
+                archive_skip -= segment["count"]
+                continue
+            full_segment = await db.message_archive.find_one({"_id": segment["_id"]})
+            entries = sorted(self._unpack(full_segment), key=lambda entry: entry["timestamp"], reverse=True)
+            for entry in entries[archive_skip:]:
+                # A segment rewritten after an interrupted run may repeat messages
+                if entry["_id"] in seen:
+                    continue
+                seen.add(entry["_id"])
+                messages.append(entry)
+                if len(messages) == needed:
+                    return messages
+            archive_skip = 0
+        return messages
+
+    async def find(self, db: AsyncIOMotorDatabase, chat_id: str, message_id: str) -> Optional[dict]:
+        if not ObjectId.is_valid(message_id):
+            return None
+        oid = ObjectId(message_id)
+        created = oid.generation_time.replace(tzinfo=None)
+        segments = db.message_archive.find({
+            "chat_id": chat_id,
+            "last_ts": {"$gte": created - timedelta(seconds=1)},
+            "first_ts": {"$lte": created + timedelta(seconds=1)}
+        })
+        async for segment in segments:
+            for entry in self._unpack(segment):
+                if entry["_id"] == oid:
+                    return entry
+        return None
+
+    async def count_after(self, db: AsyncIOMotorDatabase, chat_id: str, timestamp: datetime) -> int:
+        count = 0
+        # Whole segments newer than timestamp count without decompressing
+        async for segment in db.message_archive.find(
+            {"chat_id": chat_id, "last_ts": {"$gt": timestamp}}, {"data": 0}
+        ):
+            if segment["first_ts"] > timestamp:
+                count += segment["count"]
+            else:
+                full_segment = await db.message_archive.find_one({"_id": segment["_id"]})
+                count += sum(1 for entry in self._unpack(full_segment) if entry["timestamp"] > timestamp)
+        return count
+
+    # Archiving
+
+    async def acquire_lease(self, db: AsyncIOMotorDatabase, chat_id: str) -> bool:
+        """Take or renew this worker's lease on the chat; False if another worker holds it"""
+        now = datetime.utcnow()
+        try:
+            await db.message_archive_leases.update_one(
+                {"_id": chat_id, "$or": [{"owner": self.worker_id}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.worker_id, "expires_at": now + self.lease}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The filter missed because the lease is live and someone else's
+            return False
+        return True
+
+    async def release_lease(self, db: AsyncIOMotorDatabase, chat_id: str):
+        await db.message_archive_leases.delete_one({"_id": chat_id, "owner": self.worker_id})
+
+    async def archive_chat(self, db: AsyncIOMotorDatabase, chat_id: str, cutoff: datetime) -> int:
+        """Move messages older than cutoff into segments, under the chat's lease"""
+        archived = 0
+        try:
+            while await self.acquire_lease(db, chat_id):
+                moved = await self._archive_segment(db, chat_id, cutoff)
+                if not moved:
+                    break
+                archived += moved
+        finally:
+            await self.release_lease(db, chat_id)
+        return archived
+
+    async def _archive_segment(self, db: AsyncIOMotorDatabase, chat_id: str, cutoff: datetime) -> int:
+        """Move the oldest segment's worth of messages older than cutoff"""
+        messages = await db.messages.find(
+            {"chat_id": chat_id, "timestamp": {"$lt": cutoff}}
+        ).sort("timestamp", 1).limit(self.segment_size).to_list(length=None)
+        if not messages:
+            return 0
+
+        entries = [{key: value for key, value in message.items() if key != "chat_id"} for message in messages]
+        codec, data = compress(bson.encode({"messages": entries}))
+        # Segment id derived from its first message keeps re-runs idempotent
+        await db.message_archive.replace_one(
+            {"_id": f"{chat_id}:{messages[0]['_id']}"},
+            {
+                "chat_id": chat_id,
+                "first_ts": messages[0]["timestamp"],
+                "last_ts": messages[-1]["timestamp"],
+                "count": len(messages),
+                "codec": codec,
+                "data": Binary(data),
+                "created_at": datetime.utcnow()
+            },
+            upsert=True
+        )
+        chat_filter = {"_id": ObjectId(chat_id)} if ObjectId.is_valid(chat_id) else {"_id": chat_id}
+        await db.chats.update_one(chat_filter, {"$max": {"archived_until": messages[-1]["timestamp"]}})
+        await db.messages.delete_many({"_id": {"$in": [message["_id"] for message in messages]}})
+        return len(messages)
+
+    async def run_once(self, db: AsyncIOMotorDatabase) -> int:
+        now = datetime.utcnow()
+        archived = 0
+        for chat_type, days in self.archive_after_days.items():
+            if days <= 0:
+                continue
+            cutoff = now - timedelta(days=days)
+            # Only chats old enough to hold archivable messages
+            chats = db.chats.find(
+                {"chat_type": chat_type, "created_at": {"$lt": cutoff},
+                 "message_layout": {"$ne": BUCKETED_LAYOUT}},
+                {"_id": 1}
+            )
+            async for chat in chats:
+                chat_id = str(chat["_id"])
+                if await db.messages.find_one({"chat_id": chat_id, "timestamp": {"$lt": cutoff}}, {"_id": 1}):
+                    archived += await self.archive_chat(db, chat_id, cutoff)
+        if archived:
+            logger.info(f"Archived {archived} messages")
+        return archived
+
+    async def _run(self, db: AsyncIOMotorDatabase):
+        while True:
+            try:
+                await self.run_once(db)
+            except Exception as e:
+                logger.error(f"Error archiving messages: {e}")
+            await asyncio.sleep(MESSAGE_ARCHIVE_INTERVAL_SECONDS)
+
+    def start(self, db: AsyncIOMotorDatabase):
+        if MESSAGE_ARCHIVE_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+message_archive = MessageArchive()
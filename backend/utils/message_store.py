@@ -0,0 +1,215 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import List, Optional
+import os
+import logging
+
+import bson
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_LAYOUT = "document"
+BUCKETED_LAYOUT = "bucketed"
+
+# Layout given to newly created chats; existing chats are moved with
+# backend/migrate_message_buckets.py
+MESSAGE_LAYOUT = os.getenv("MESSAGE_LAYOUT", DOCUMENT_LAYOUT)
+# A bucket is closed when it holds this many messages or spans this long
+MESSAGE_BUCKET_SIZE = int(os.getenv("MESSAGE_BUCKET_SIZE", "200"))
+MESSAGE_BUCKET_SPAN_HOURS = int(os.getenv("MESSAGE_BUCKET_SPAN_HOURS", "24"))
+# ...or would grow past this many BSON bytes (well under the 16MB document limit)
+MESSAGE_BUCKET_MAX_BYTES = int(os.getenv("MESSAGE_BUCKET_MAX_BYTES", str(4 * 1024 * 1024)))
+
+def chat_layout(chat: dict) -> str:
+    return chat.get("message_layout") or DOCUMENT_LAYOUT
+
+class MessageStore(ABC):
+    """Storage layout for chat messages.
+
+    Messages are returned as dicts shaped like documents of db.messages
+    (with ObjectId `_id` and string `chat_id`) whatever the layout.
+    """
+
+    @abstractmethod
+    async def insert(self, db: AsyncIOMotorDatabase, message: dict) -> str:
+        """Store a message dict (without id) and return the new message id"""
+
+    @abstractmethod
+    async def page(self, db: AsyncIOMotorDatabase, chat_id: str, skip: int, limit: int) -> List[dict]:
+        """Messages of a chat, newest first"""
+
+    @abstractmethod
+    async def find(self, db: AsyncIOMotorDatabase, chat_id: str, message_id: str) -> Optional[dict]:
+        """A message of the chat by id, or None"""
+
+    @abstractmethod
+    async def count_after(self, db: AsyncIOMotorDatabase, chat_id: str, timestamp: datetime) -> int:
+        """Number of messages newer than timestamp"""
+
+    @abstractmethod
+    async def count(self, db: AsyncIOMotorDatabase, chat_id: str) -> int:
+        """Number of messages of a chat"""
+
+class DocumentMessageStore(MessageStore):
+    """One document per message in db.messages"""
+
+    async def insert(self, db: AsyncIOMotorDatabase, message: dict) -> str:
+        result = await db.messages.insert_one(message)
+        return str(result.inserted_id)
+
+    async def page(self, db: AsyncIOMotorDatabase, chat_id: str, skip: int, limit: int) -> List[dict]:
+        messages_cursor = db.messages.find({
+            "chat_id": chat_id
+        }).sort("timestamp", -1).skip(skip).limit(limit)
+        return await messages_cursor.to_list(length=None)
+
+    async def find(self, db: AsyncIOMotorDatabase, chat_id: str, message_id: str) -> Optional[dict]:
+        message_filter = {"_id": ObjectId(message_id)} if ObjectId.is_valid(message_id) else {"_id": message_id}
+        message = await db.messages.find_one(message_filter)
+        if not message or message.get("chat_id") != chat_id:
+            return None
+        return message
+
+    async def count_after(self, db: AsyncIOMotorDatabase, chat_id: str, timestamp: datetime) -> int:
+        return await db.messages.count_documents({
+            "chat_id": chat_id,
+            "timestamp": {"$gt": timestamp}
+        })
+
+    async def count(self, db: AsyncIOMotorDatabase, chat_id: str) -> int:
+        return await db.messages.count_documents({"chat_id": chat_id})
+
+class BucketedMessageStore(MessageStore):
+    """Messages grouped into per-chat documents in db.message_buckets.
+
+    Each bucket holds up to MESSAGE_BUCKET_SIZE messages from a window of
+    MESSAGE_BUCKET_SPAN_HOURS, and at most MESSAGE_BUCKET_MAX_BYTES of
+    messages as tracked by its running `bytes` field, so a page of messages is one or two document
+    fetches and the (chat_id, last_ts) index grows per bucket, not per
+    message. Concurrent appends may open two buckets with overlapping time
+    ranges; reads merge by timestamp, so this only costs space.
+    """
+
+    def __init__(self, bucket_size: int = MESSAGE_BUCKET_SIZE,
+                 span_hours: int = MESSAGE_BUCKET_SPAN_HOURS,
+                 max_bytes: int = MESSAGE_BUCKET_MAX_BYTES):
+        self.bucket_size = bucket_size
+        self.span = timedelta(hours=span_hours)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def _entry(message: dict) -> dict:
+        entry = dict(message)
+        entry.pop("chat_id", None)
+        entry.setdefault("_id", ObjectId())
+        return entry
+
+    @staticmethod
+    def _message(chat_id: str, entry: dict) -> dict:
+        return {**entry, "chat_id": chat_id}
+
+    async def insert(self, db: AsyncIOMotorDatabase, message: dict) -> str:
+        entry = self._entry(message)
+        timestamp = entry["timestamp"]
+        size = len(bson.encode(entry))
+        # Append to an open bucket, or start a new one when none has room.
+        # last_ts >= first_ts, so the last_ts bound drops no open bucket but
+        # lets the (chat_id, last_ts) index skip the chat's closed history
+        await db.message_buckets.update_one(
+            {
+                "chat_id": message["chat_id"],
+                "last_ts": {"$gt": timestamp - self.span},
+                "count": {"$lt": self.bucket_size},
+                "bytes": {"$lte": self.max_bytes - size},
+                "first_ts": {"$gt": timestamp - self.span}
+            },
+            {
+                "$push": {"messages": entry},
+                "$inc": {"count": 1, "bytes": size},
+                "$min": {"first_ts": timestamp},
+                "$max": {"last_ts": timestamp}
+            },
+            upsert=True
+        )
+        return str(entry["_id"])
+
+    async def insert_many(self, db: AsyncIOMotorDatabase, chat_id: str, messages: List[dict]) -> List[str]:
+        """Write pre-sorted messages as full buckets (used by the migration)"""
+        entries = [self._entry(message) for message in messages]
+        buckets = []
+        for entry in entries:
+            size = len(bson.encode(entry))
+            if (not buckets or buckets[-1]["count"] >= self.bucket_size
+                    or buckets[-1]["bytes"] + size > self.max_bytes
+                    or entry["timestamp"] - buckets[-1]["first_ts"] >= self.span):
+                buckets.append({"chat_id": chat_id, "count": 0, "bytes": 0, "first_ts": entry["timestamp"], "messages": []})
+            bucket = buckets[-1]
+            bucket["messages"].append(entry)
+            bucket["count"] += 1
+            bucket["bytes"] += size
+            bucket["last_ts"] = entry["timestamp"]
+        if buckets:
+            await db.message_buckets.insert_many(buckets, ordered=True)
+        return [str(entry["_id"]) for entry in entries]
+
+    async def page(self, db: AsyncIOMotorDatabase, chat_id: str, skip: int, limit: int) -> List[dict]:
+        needed = skip + limit
+        collected: List[dict] = []
+        buckets = db.message_buckets.find({"chat_id": chat_id}).sort("last_ts", -1)
+        async for bucket in buckets:
+            if len(collected) >= needed:
+                # Older buckets can't contribute once they end before the page's oldest message
+                collected.sort(key=lambda entry: entry["timestamp"], reverse=True)
+                collected = collected[:needed]
+                if bucket["last_ts"] < collected[-1]["timestamp"]:
+                    break
+            collected.extend(bucket.get("messages", []))
+        collected.sort(key=lambda entry: entry["timestamp"], reverse=True)
+        return [self._message(chat_id, entry) for entry in collected[skip:needed]]
+
+    async def find(self, db: AsyncIOMotorDatabase, chat_id: str, message_id: str) -> Optional[dict]:
+        if not ObjectId.is_valid(message_id):
+            return None
+        oid = ObjectId(message_id)
+        # The id's embedded creation time narrows the search to one or two buckets
+        created = oid.generation_time.replace(tzinfo=None)
+        bucket = await db.message_buckets.find_one(
+            {
+                "chat_id": chat_id,
+                "last_ts": {"$gte": created - timedelta(seconds=1)},
+                "first_ts": {"$lte": created + timedelta(seconds=1)},
+                "messages._id": oid
+            },
+            {"messages": {"$elemMatch": {"_id": oid}}}
+        )
+        if not bucket or not bucket.get("messages"):
+            return None
+        return self._message(chat_id, bucket["messages"][0])
+
+    async def count_after(self, db: AsyncIOMotorDatabase, chat_id: str, timestamp: datetime) -> int:
+        result = await db.message_buckets.aggregate([
+            {"$match": {"chat_id": chat_id, "last_ts": {"$gt": timestamp}}},
+            {"$project": {"newer": {"$size": {"$filter": {
+                "input": "$messages",
+                "cond": {"$gt": ["$$this.timestamp", timestamp]}
+            }}}}},
+            {"$group": {"_id": None, "count": {"$sum": "$newer"}}}
+        ]).to_list(1)
+        return result[0]["count"] if result else 0
+
+    async def count(self, db: AsyncIOMotorDatabase, chat_id: str) -> int:
+        # Buckets keep a running count, so this never reads the messages
+        result = await db.message_buckets.aggregate([
+            {"$match": {"chat_id": chat_id}},
+            {"$group": {"_id": None, "count": {"$sum": "$count"}}}
+        ]).to_list(1)
+        return result[0]["count"] if result else 0
+
+document_store = DocumentMessageStore()
+bucketed_store = BucketedMessageStore()
+
+def store_for(chat: dict) -> MessageStore:
+    """Message store matching the chat's layout"""
+    return bucketed_store if chat_layout(chat) == BUCKETED_LAYOUT else document_store
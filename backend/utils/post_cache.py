@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
+import asyncio
+import os
+import time
+
+from ..models.post import PostResponse
+
+# Channel post cache settings
+POST_CACHE_SIZE = int(os.getenv("POST_CACHE_SIZE", "50"))  # newest posts kept per channel
+POST_CACHE_TTL_SECONDS = float(os.getenv("POST_CACHE_TTL_SECONDS", "30"))
+POST_CACHE_MAX_CHANNELS = int(os.getenv("POST_CACHE_MAX_CHANNELS", "10000"))
+
+class ChannelPostCache:
+    """Newest posts of each channel, hydrated with author info.
+
+    Serves the first page of GET /posts/{channel_id}. Writes in this process
+    patch or drop the entry; the TTL bounds staleness from other workers and
+    from author profile changes. Concurrent misses for a channel share one
+    load.
+    """
+
+    def __init__(self, size: int = POST_CACHE_SIZE, ttl_seconds: float = POST_CACHE_TTL_SECONDS,
+                 max_channels: int = POST_CACHE_MAX_CHANNELS):
+        self.size = size
+        self.ttl = ttl_seconds
+        self.max_channels = max_channels
+        # channel_id -> (expires, posts newest first)
+        self._entries: "OrderedDict[str, Tuple[float, List[PostResponse]]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Channels written to while a load was running; that load is not stored
+        self._stale: Set[str] = set()
+
+    async def get(self, channel_id: str, load: Callable[[], Awaitable[List[PostResponse]]]) -> List[PostResponse]:
+        """Cached posts newest first; load() runs once for concurrent misses"""
+        entry = self._entries.get(channel_id)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(channel_id)
+            return entry[1]
+
+        future = self._loading.get(channel_id)
+        if future is None:
+            future = asyncio.ensure_future(self._load(channel_id, load))
+            self._loading[channel_id] = future
+        # A cancelled reader must not cancel the load other readers wait on
+        return await asyncio.shield(future)
+
+    async def _load(self, channel_id: str, load: Callable[[], Awaitable[List[PostResponse]]]) -> List[PostResponse]:
+        try:
+            posts = await load()
+            if channel_id not in self._stale:
+                self._store(channel_id, posts)
+            return posts
+        finally:
+            self._loading.pop(channel_id, None)
+            self._stale.discard(channel_id)
+
+    def _store(self, channel_id: str, posts: List[PostResponse]):
+        self._entries[channel_id] = (time.monotonic() + self.ttl, posts[:self.size])
+        self._entries.move_to_end(channel_id)
+        while len(self._entries) > self.max_channels:
+            self._entries.popitem(last=False)
+
+    def _mark_stale(self, channel_id: str):
+        if channel_id in self._loading:
+            self._stale.add(channel_id)
+
+    def post_created(self, channel_id: str, post: PostResponse):
+        self._mark_stale(channel_id)
+        entry = self._entries.get(channel_id)
+        if entry:
+            # Concurrent creates can finish out of order
+            posts = sorted([post, *entry[1]], key=lambda cached: cached.sequence_number, reverse=True)
+            self._entries[channel_id] = (entry[0], posts[:self.size])
+
+    def reactions_changed(self, channel_id: str, post_id: str, reactions: dict):
+        self._mark_stale(channel_id)
+        entry = self._entries.get(channel_id)
+        if entry:
+            posts = [
+                cached.copy(update={"reactions": reactions}) if cached.id == post_id else cached
+                for cached in entry[1]
+            ]
+            self._entries[channel_id] = (entry[0], posts)
+
+    def invalidate(self, channel_id: str):
+        self._mark_stale(channel_id)
+        self._entries.pop(channel_id, None)
+
+post_cache = ChannelPostCache()
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+import asyncio
+import os
+import logging
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Presence settings
+PRESENCE_TIMEOUT_SECONDS = int(os.getenv("PRESENCE_TIMEOUT_SECONDS", "60"))
+PRESENCE_FLUSH_INTERVAL_SECONDS = int(os.getenv("PRESENCE_FLUSH_INTERVAL_SECONDS", "15"))
+
+class PresenceService:
+    """In-memory online state with periodic last_seen flushes to MongoDB.
+
+    Every authenticated request and heartbeat calls touch(), which only
+    updates a dict. A background task expires idle users and writes the
+    accumulated last_seen / is_online changes with one bulk_write.
+    """
+
+    def __init__(self, timeout_seconds: int = PRESENCE_TIMEOUT_SECONDS,
+                 flush_interval_seconds: int = PRESENCE_FLUSH_INTERVAL_SECONDS):
+        self.timeout = timedelta(seconds=timeout_seconds)
+        self.flush_interval = flush_interval_seconds
+        self._last_seen: Dict[str, datetime] = {}
+        self._pending_online: Dict[str, datetime] = {}
+        self._pending_offline: Dict[str, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, user_id: str):
+        """Record activity for a user"""
+        now = datetime.utcnow()
+        self._last_seen[user_id] = now
+        self._pending_online[user_id] = now
+        self._pending_offline.pop(user_id, None)
+
+    def mark_offline(self, user_id: str):
+        """Drop a user from the online set (e.g. on logout)"""
+        last_seen = self._last_seen.pop(user_id, None) or datetime.utcnow()
+        self._pending_online.pop(user_id, None)
+        self._pending_offline[user_id] = last_seen
+
+    def is_online(self, user_id: str) -> bool:
+        last_seen = self._last_seen.get(user_id)
+        return last_seen is not None and datetime.utcnow() - last_seen < self.timeout
+
+    def last_seen(self, user_id: str) -> Optional[datetime]:
+        return self._last_seen.get(user_id)
+
+    def online_among(self, user_ids: Iterable[str]) -> Dict[str, datetime]:
+        """Return {user_id: last_seen} for the given users that are online"""
+        cutoff = datetime.utcnow() - self.timeout
+        online = {}
+        for user_id in user_ids:
+            last_seen = self._last_seen.get(user_id)
+            if last_seen is not None and last_seen > cutoff:
+                online[user_id] = last_seen
+        return online
+
+    def expire(self):
+        """Move users without recent activity to the pending offline set"""
+        cutoff = datetime.utcnow() - self.timeout
+        expired = [user_id for user_id, last_seen in self._last_seen.items() if last_seen <= cutoff]
+        for user_id in expired:
+            self.mark_offline(user_id)
+
+    async def flush(self, db: AsyncIOMotorDatabase):
+        """Write pending presence changes with a single bulk_write"""
+        pending_online, self._pending_online = self._pending_online, {}
+        pending_offline, self._pending_offline = self._pending_offline, {}
+
+        operations = []
+        for user_id, last_seen in pending_online.items():
+            if ObjectId.is_valid(user_id):
+                operations.append(UpdateOne(
+                    {"_id": ObjectId(user_id)},
+                    {"$set": {"is_online": True, "last_seen": last_seen}}
+                ))
+        for user_id, last_seen in pending_offline.items():
+            if ObjectId.is_valid(user_id):
+                # Another worker may have seen newer activity for this user
+                operations.append(UpdateOne(
+                    {"_id": ObjectId(user_id), "last_seen": {"$lte": last_seen}},
+                    {"$set": {"is_online": False}}
+                ))
+
+        if not operations:
+            return
+
+        try:
+            await db.users.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning(f"Error flushing presence: {e}")
+            # Keep the updates for the next flush unless newer ones arrived
+            for user_id, last_seen in pending_online.items():
+                self._pending_online.setdefault(user_id, last_seen)
+            for user_id, last_seen in pending_offline.items():
+                if user_id not in self._pending_online:
+                    self._pending_offline.setdefault(user_id, last_seen)
+
+    async def _run(self, db: AsyncIOMotorDatabase):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.expire()
+            await self.flush(db)
+
+    def start(self, db: AsyncIOMotorDatabase):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self, db: AsyncIOMotorDatabase):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush(db)
+
+presence = PresenceService()
@@ -0,0 +1,197 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import os
+import threading
+import logging
+
+from pymongo import monitoring
+
+from .metrics import current_route, route_label, command_collection
+
+logger = logging.getLogger(__name__)
+
+# Slow query profiler settings
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+SLOW_QUERY_MAX_ENTRIES = int(os.getenv("SLOW_QUERY_MAX_ENTRIES", "50"))
+
+# Commands explain() understands, with the fields describing their query shape
+EXPLAINABLE_COMMANDS = {
+    "find": ("filter", "sort", "projection"),
+    "aggregate": ("pipeline",),
+    "count": ("query",),
+    "distinct": ("key", "query"),
+    "findAndModify": ("query", "sort"),
+    "update": ("updates",),
+    "delete": ("deletes",),
+}
+# Session/transport fields that must not be replayed inside explain
+_TRANSPORT_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern",
+                     "writeConcern", "apiVersion", "apiStrict", "apiDeprecationErrors"}
+
+def query_shape(value: Any) -> Any:
+    """Replace literal values by their type so equal query shapes compare equal"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = query_shape(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return type(value).__name__
+
+def plan_summary(explain_result: dict) -> dict:
+    """Extract the winning plan stages, e.g. ["FETCH", "IXSCAN"]"""
+    planner = explain_result.get("queryPlanner")
+    if planner is None:
+        # Aggregations nest the planner under the $cursor stage
+        for stage in explain_result.get("stages", []):
+            if "$cursor" in stage:
+                planner = stage["$cursor"].get("queryPlanner")
+                break
+    if planner is None:
+        return {"stages": [], "collscan": False, "indexes": []}
+
+    stages, indexes = [], []
+    pending = [planner.get("winningPlan", {})]
+    while pending:
+        plan = pending.pop()
+        plan = plan.get("queryPlan", plan)
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        if "indexName" in plan:
+            indexes.append(plan["indexName"])
+        if "inputStage" in plan:
+            pending.append(plan["inputStage"])
+        pending.extend(plan.get("inputStages", []))
+
+    return {"stages": stages, "collscan": "COLLSCAN" in stages, "indexes": indexes}
+
+class SlowQueryProfiler(monitoring.CommandListener):
+    """Records commands slower than a threshold and explains their plans.
+
+    Listener callbacks run on Motor's executor threads; explains are
+    scheduled onto the event loop so they never block the command that
+    triggered them. Only the worst max_entries query shapes are kept.
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+                 max_entries: int = SLOW_QUERY_MAX_ENTRIES):
+        self.threshold_ms = threshold_ms
+        self.max_entries = max_entries
+        self._pending: Dict[Tuple, Tuple[str, dict, Optional[dict]]] = {}
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach(self, client, loop: asyncio.AbstractEventLoop):
+        """Enable explain capture using the given Motor client and event loop"""
+        self._client = client
+        self._loop = loop
+
+    def started(self, event):
+        if event.command_name in EXPLAINABLE_COMMANDS:
+            with self._lock:
+                self._pending[(event.connection_id, event.request_id)] = (
+                    event.database_name, dict(event.command), current_route.get()
+                )
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms >= self.threshold_ms:
+            self._record(event.command_name, duration_ms, *pending)
+
+    def _record(self, command_name: str, duration_ms: float, database: str, command: dict,
+                scope: Optional[dict]):
+        collection = command_collection(command_name, command)
+        shape = {field: query_shape(command[field]) for field in EXPLAINABLE_COMMANDS[command_name]
+                 if field in command}
+        fingerprint = json.dumps([database, collection, command_name, shape], sort_keys=True)
+
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                if len(self._entries) >= self.max_entries:
+                    mildest = min(self._entries, key=lambda key: self._entries[key]["max_ms"])
+                    if self._entries[mildest]["max_ms"] >= duration_ms:
+                        return
+                    del self._entries[mildest]
+                entry = self._entries[fingerprint] = {
+                    "database": database,
+                    "collection": collection,
+                    "command": command_name,
+                    "shape": shape,
+                    "routes": [],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "plan": None,
+                    "first_seen": datetime.utcnow(),
+                }
+                needs_explain = True
+            else:
+                needs_explain = False
+
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["last_seen"] = datetime.utcnow()
+            route = route_label(scope) if scope is not None else None
+            if route and route not in entry["routes"]:
+                entry["routes"].append(route)
+
+        if needs_explain and self._loop is not None and self._client is not None:
+            self._loop.call_soon_threadsafe(
+                lambda: asyncio.ensure_future(self._explain(fingerprint, database, command_name, command))
+            )
+
+    async def _explain(self, fingerprint: str, database: str, command_name: str, command: dict):
+        explainable = {key: value for key, value in command.items()
+                       if not key.startswith("$") and key not in _TRANSPORT_FIELDS}
+        # explain() accepts a single update/delete statement
+        for field in ("updates", "deletes"):
+            if explainable.get(field):
+                explainable[field] = explainable[field][:1]
+        try:
+            result = await self._client[database].command(
+                {"explain": explainable, "verbosity": "queryPlanner"}
+            )
+            plan = plan_summary(result)
+            if plan["collscan"]:
+                logger.warning(f"Slow {command_name} on {database}.{explainable.get(command_name)} "
+                               f"uses a collection scan")
+        except Exception as e:
+            plan = {"error": str(e)}
+
+        with self._lock:
+            if fingerprint in self._entries:
+                self._entries[fingerprint]["plan"] = plan
+
+    def worst(self, limit: int = SLOW_QUERY_MAX_ENTRIES) -> List[dict]:
+        """Slowest recorded query shapes, worst first"""
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+        entries.sort(key=lambda entry: entry["max_ms"], reverse=True)
+        for entry in entries:
+            entry["avg_ms"] = round(entry["total_ms"] / entry["count"], 3)
+        return entries[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+slow_query_profiler = SlowQueryProfiler()
@@ -0,0 +1,159 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+import math
+import os
+import time
+import logging
+
+import jwt
+from fastapi import HTTPException, Request, status
+
+from .auth import SECRET_KEY, ALGORITHM
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    capacity: int  # burst size
+    period_seconds: float  # time to refill a full bucket
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period_seconds
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimitRule":
+        """Parse "<requests>/<seconds>", e.g. "30/10" """
+        capacity, period = value.split("/")
+        return cls(capacity=int(capacity), period_seconds=float(period))
+
+# Limits per router name, optionally narrowed to "<router>.<endpoint function>"
+DEFAULT_RATE_LIMITS: Dict[str, str] = {
+    "auth": "30/60",
+    "chats": "300/60",
+    "chats.send_message": "30/10",
+    "chats.send_messages_batch": "5/10",
+    "chats.search_chats": "20/10",
+    "chats.report_typing": "20/10",
+    "users": "300/60",
+    "users.search_users": "20/10",
+    "posts": "300/60",
+    "sync": "60/60",
+    "feed": "120/60",
+    "apps": "300/60",
+}
+
+# Set to false to disable rate limiting entirely (e.g. for load tests)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+
+def load_rate_limits() -> Dict[str, RateLimitRule]:
+    """Default limits overridden by RATE_LIMITS="name=30/10,other=100/60" """
+    if not RATE_LIMIT_ENABLED:
+        return {}
+    limits = dict(DEFAULT_RATE_LIMITS)
+    for item in os.getenv("RATE_LIMITS", "").split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            limits[name.strip()] = value.strip()
+    return {name: RateLimitRule.parse(value) for name, value in limits.items() if value}
+
+class RateLimitStorage(ABC):
+    """Token bucket storage backend.
+
+    The in-memory backend limits each worker separately; a shared backend
+    (e.g. Redis or MongoDB) only has to implement consume().
+    """
+
+    @abstractmethod
+    async def consume(self, key: str, rule: RateLimitRule, cost: float = 1.0) -> float:
+        """Take cost tokens from the bucket.
+
+        Returns 0 when the request is allowed, otherwise the number of
+        seconds until enough tokens are available.
+        """
+
+class InMemoryRateLimitStorage(RateLimitStorage):
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> (tokens, updated_at, period_seconds of the bucket's rule)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+
+    async def consume(self, key: str, rule: RateLimitRule, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        tokens, updated_at, _ = self._buckets.get(key, (float(rule.capacity), now, rule.period_seconds))
+        tokens = min(float(rule.capacity), tokens + (now - updated_at) * rule.refill_per_second)
+
+        if key not in self._buckets and len(self._buckets) >= self.max_keys:
+            self._prune(now)
+
+        if tokens >= cost:
+            self._buckets[key] = (tokens - cost, now, rule.period_seconds)
+            return 0.0
+
+        self._buckets[key] = (tokens, now, rule.period_seconds)
+        return (cost - tokens) / rule.refill_per_second
+
+    def _prune(self, now: float):
+        # Buckets idle for a full period of their own rule have refilled and carry no state
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < bucket[2]
+        }
+        if len(self._buckets) >= self.max_keys:
+            # Still full of active buckets: drop the least recently used tenth,
+            # which at worst lets those callers start again with a full bucket
+            keep = sorted(self._buckets.items(), key=lambda item: item[1][1])[self.max_keys // 10 + 1:]
+            self._buckets = dict(keep)
+
+class RateLimiter:
+    """FastAPI dependency factory enforcing per-user, per-route token buckets"""
+
+    def __init__(self, storage: Optional[RateLimitStorage] = None,
+                 limits: Optional[Dict[str, RateLimitRule]] = None):
+        self.storage = storage or InMemoryRateLimitStorage()
+        self.limits = limits if limits is not None else load_rate_limits()
+
+    def limit(self, name: str) -> Callable:
+        """Dependency applying the limits configured for router `name`"""
+
+        async def check_rate_limit(request: Request):
+            route = request.scope.get("route")
+            endpoint_name = getattr(getattr(route, "endpoint", None), "__name__", "")
+            rule = self.limits.get(f"{name}.{endpoint_name}") or self.limits.get(name)
+            if rule is None:
+                return
+
+            route_path = getattr(route, "path", request.url.path)
+            key = f"{name}:{self._identity(request)}:{request.method}:{route_path}"
+
+            try:
+                retry_after = await self.storage.consume(key, rule)
+            except Exception as e:
+                # Never turn a storage outage into an API outage
+                logger.warning(f"Rate limit storage error: {e}")
+                return
+
+            if retry_after > 0:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests",
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+
+        return check_rate_limit
+
+    @staticmethod
+    def _identity(request: Request) -> str:
+        """JWT `sub` claim of the caller, falling back to the client address"""
+        authorization = request.headers.get("authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            try:
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+                if payload.get("sub"):
+                    return f"user:{payload['sub']}"
+            except jwt.InvalidTokenError:
+                pass
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,170 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import os
+import logging
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+
+from . import message_store
+from .message_archive import message_archive
+
+logger = logging.getLogger(__name__)
+
+# Keep individual bulk writes bounded for channels with many subscribers
+BULK_CHUNK_SIZE = 1000
+# Chats with more participants count messages on the chat instead of
+# bumping every participant's counter
+READ_STATE_FANOUT_MAX_PARTICIPANTS = int(os.getenv("READ_STATE_FANOUT_MAX_PARTICIPANTS", "200"))
+
+def unread_count(chat: dict, cursor: dict) -> int:
+    """Unread messages from the cursor's own counter plus chat-level counting.
+
+    Large chats bump `message_count` on the chat and cursors remember the
+    `read_count` they have seen, so a chat can switch between both ways of
+    counting as it grows or shrinks.
+    """
+    return cursor.get("unread_count", 0) + max(chat.get("message_count", 0) - cursor.get("read_count", 0), 0)
+
+async def record_message_sent(
+    db: AsyncIOMotorDatabase,
+    chat_id: str,
+    participants: Iterable[str],
+    sender_id: str,
+    message_id: str,
+    timestamp: datetime,
+    count: int = 1
+):
+    """Bump unread counters of every participant except the sender.
+
+    The sender's own cursor moves to the new message, so their own messages
+    never show up as unread. count covers batches, where message_id and
+    timestamp are those of the newest message. Chats above
+    READ_STATE_FANOUT_MAX_PARTICIPANTS cost two writes whatever their size.
+    Failures are logged and swallowed: the message is already stored.
+    """
+    try:
+        participants = list(participants)
+        now = datetime.utcnow()
+        sender_cursor = {
+            "$set": {
+                "last_read_message_id": message_id,
+                "last_read_at": timestamp,
+                "unread_count": 0,
+                "updated_at": now
+            }
+        }
+
+        if len(participants) > READ_STATE_FANOUT_MAX_PARTICIPANTS:
+            chat_filter = {"_id": ObjectId(chat_id)} if ObjectId.is_valid(chat_id) else {"_id": chat_id}
+            chat = await db.chats.find_one_and_update(
+                chat_filter,
+                {"$inc": {"message_count": count}},
+                projection={"message_count": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if chat:
+                sender_cursor["$max"] = {"read_count": chat["message_count"]}
+                await db.read_cursors.update_one(
+                    {"user_id": sender_id, "chat_id": chat_id}, sender_cursor, upsert=True
+                )
+            return
+
+        operations = []
+        for participant_id in participants:
+            cursor_filter = {"user_id": participant_id, "chat_id": chat_id}
+            if participant_id == sender_id:
+                operations.append(UpdateOne(cursor_filter, sender_cursor, upsert=True))
+            else:
+                operations.append(UpdateOne(
+                    cursor_filter,
+                    {
+                        "$inc": {"unread_count": count},
+                        "$set": {"updated_at": now}
+                    },
+                    upsert=True
+                ))
+
+        for start in range(0, len(operations), BULK_CHUNK_SIZE):
+            await db.read_cursors.bulk_write(operations[start:start + BULK_CHUNK_SIZE], ordered=False)
+    except Exception as e:
+        logger.error(f"Error updating unread counters for chat {chat_id}: {e}")
+
+async def joined(db: AsyncIOMotorDatabase, chat: dict, user_id: str):
+    """Start a new participant's cursor at the chat's current message count"""
+    if chat.get("message_count"):
+        await db.read_cursors.update_one(
+            {"user_id": user_id, "chat_id": str(chat["_id"])},
+            {"$max": {"read_count": chat["message_count"]}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+async def get_read_cursors(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    chat_ids: List[str]
+) -> Dict[str, dict]:
+    """Load the user's read cursors for the given chats with a single query"""
+    if not chat_ids:
+        return {}
+
+    cursors = await db.read_cursors.find(
+        {"user_id": user_id, "chat_id": {"$in": chat_ids}},
+        {"_id": 0, "chat_id": 1, "unread_count": 1, "read_count": 1, "last_read_message_id": 1}
+    ).to_list(length=None)
+
+    return {cursor["chat_id"]: cursor for cursor in cursors}
+
+async def mark_read(
+    db: AsyncIOMotorDatabase,
+    chat: dict,
+    user_id: str,
+    message_id: Optional[str] = None
+) -> dict:
+    """Move the user's read cursor and reset (or recompute) the unread counter.
+
+    Without a message_id the chat is read up to its last message. Marking an
+    older message recounts the messages after it, which only happens on this
+    endpoint and never on the chat list.
+    """
+    chat_id = str(chat["_id"])
+    last_message_id = chat.get("last_message_id")
+    read_message_id = message_id or last_message_id
+    unread_count = 0
+    read_at = chat.get("last_message_time")
+
+    if read_message_id and read_message_id != last_message_id:
+        store = message_store.store_for(chat)
+        archived = chat.get("archived_until") is not None
+        message = await store.find(db, chat_id, read_message_id)
+        if not message and archived:
+            message = await message_archive.find(db, chat_id, read_message_id)
+        if not message:
+            raise ValueError("Message does not belong to this chat")
+
+        read_at = message["timestamp"]
+        unread_count = await store.count_after(db, chat_id, read_at)
+        if archived and read_at < chat["archived_until"]:
+            unread_count += await message_archive.count_after(db, chat_id, read_at)
+
+    await db.read_cursors.update_one(
+        {"user_id": user_id, "chat_id": chat_id},
+        {
+            "$set": {
+                "last_read_message_id": read_message_id,
+                "last_read_at": read_at,
+                "unread_count": unread_count,
+                # Chat-level counting restarts from here
+                "read_count": chat.get("message_count", 0),
+                "updated_at": datetime.utcnow()
+            }
+        },
+        upsert=True
+    )
+
+    return {
+        "chat_id": chat_id,
+        "last_read_message_id": read_message_id,
+        "unread_count": unread_count
+    }
@@ -0,0 +1,149 @@
+from contextvars import ContextVar
+from typing import Callable, Optional
+import asyncio
+import functools
+import os
+import threading
+import time
+import logging
+
+import bson
+from fastapi.routing import APIRoute
+from pymongo import monitoring
+
+from .metrics import route_label
+
+logger = logging.getLogger(__name__)
+
+# Request accounting settings
+REQUEST_STATS_ENABLED = os.getenv("REQUEST_STATS_ENABLED", "true").lower() == "true"
+REQUEST_STATS_LOG = os.getenv("REQUEST_STATS_LOG", "false").lower() == "true"
+# Measuring reply sizes re-encodes every command reply, so it is opt-in
+REQUEST_STATS_REPLY_BYTES = os.getenv("REQUEST_STATS_REPLY_BYTES", "false").lower() == "true"
+
+class RequestStats:
+    """Database and handler time accumulated while serving one request.
+
+    Motor runs commands on executor threads with a copy of the request's
+    context, so the listener updates this object from other threads.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_ops = 0
+        self.db_seconds = 0.0
+        self.db_bytes = 0
+        self.handler_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_command(self, seconds: float, reply_bytes: int):
+        with self._lock:
+            self.db_ops += 1
+            self.db_seconds += seconds
+            self.db_bytes += reply_bytes
+
+    def timings(self) -> dict:
+        """Split wall time into Mongo, handler code and everything else.
+
+        Mongo time is measured per command and can overlap when queries run
+        concurrently, so the handler share is clamped at zero. The remainder
+        outside the endpoint is validation, dependencies and serialization.
+        """
+        total = time.perf_counter() - self.start
+        return {
+            "total": total,
+            "db": self.db_seconds,
+            "app": max(self.handler_seconds - self.db_seconds, 0.0),
+            "ser": max(total - self.handler_seconds, 0.0),
+        }
+
+    def server_timing(self) -> str:
+        timings = self.timings()
+        db_desc = f"{self.db_ops} ops, {self.db_bytes} B" if REQUEST_STATS_REPLY_BYTES else f"{self.db_ops} ops"
+        return ", ".join([
+            f'db;dur={timings["db"] * 1000:.2f};desc="{db_desc}"',
+            f'app;dur={timings["app"] * 1000:.2f}',
+            f'ser;dur={timings["ser"] * 1000:.2f}',
+            f'total;dur={timings["total"] * 1000:.2f}',
+        ])
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+class RequestStatsListener(monitoring.CommandListener):
+    """Charges every Mongo command to the request that issued it"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        stats = request_stats.get()
+        if stats is not None:
+            reply_bytes = len(bson.encode(event.reply)) if REQUEST_STATS_REPLY_BYTES else 0
+            stats.add_command(event.duration_micros / 1e6, reply_bytes)
+
+    def failed(self, event):
+        stats = request_stats.get()
+        if stats is not None:
+            stats.add_command(event.duration_micros / 1e6, 0)
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    @functools.wraps(endpoint)
+    async def timed_endpoint(*args, **kwargs):
+        stats = request_stats.get()
+        if stats is None:
+            return await endpoint(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            stats.handler_seconds += time.perf_counter() - start
+
+    timed_endpoint.request_timed = True
+    return timed_endpoint
+
+class TimedRoute(APIRoute):
+    """APIRoute that measures time spent inside the endpoint function"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        # include_router rebuilds routes from their (already timed) endpoint
+        # once per level of nesting; wrap only the first time
+        if asyncio.iscoroutinefunction(endpoint) and not getattr(endpoint, "request_timed", False):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+class RequestStatsMiddleware:
+    """ASGI middleware emitting per-request accounting as Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not REQUEST_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", stats.server_timing().encode("latin-1")),
+                    (b"timing-allow-origin", b"*"),
+                ]
+                if REQUEST_STATS_LOG:
+                    timings = stats.timings()
+                    logger.info(
+                        f"{scope['method']} {route_label(scope)} {message['status']} "
+                        f"total={timings['total'] * 1000:.1f}ms db={timings['db'] * 1000:.1f}ms "
+                        f"ops={stats.db_ops} bytes={stats.db_bytes} "
+                        f"app={timings['app'] * 1000:.1f}ms ser={timings['ser'] * 1000:.1f}ms"
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_stats.reset(token)
+
+request_stats_listener = RequestStatsListener()
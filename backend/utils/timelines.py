@@ -0,0 +1,243 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+import asyncio
+import os
+import logging
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+
+from .home_feed import FeedCursor, merge_channel_posts
+
+logger = logging.getLogger(__name__)
+
+# Timeline settings
+TIMELINE_MAX_ENTRIES = int(os.getenv("TIMELINE_MAX_ENTRIES", "500"))
+# Channels with more subscribers are merged at read time instead of fanned out
+TIMELINE_FANOUT_MAX_SUBSCRIBERS = int(os.getenv("TIMELINE_FANOUT_MAX_SUBSCRIBERS", "10000"))
+TIMELINE_QUEUE_SIZE = int(os.getenv("TIMELINE_QUEUE_SIZE", "10000"))
+# Keep individual bulk writes bounded for channels near the threshold
+BULK_CHUNK_SIZE = 1000
+
+def is_fanout_channel(channel: dict) -> bool:
+    return channel.get("subscriber_count", 0) <= TIMELINE_FANOUT_MAX_SUBSCRIBERS
+
+def _entry(post: dict) -> dict:
+    return {"post_id": post["_id"], "channel_id": post["channel_id"], "created_at": post["created_at"]}
+
+def _key(item: dict) -> FeedCursor:
+    return item["created_at"], item.get("post_id", item.get("_id"))
+
+class TimelineFanout:
+    """Per-user timelines of post references for small and medium channels.
+
+    Each user has one document in db.timelines holding the newest
+    TIMELINE_MAX_ENTRIES post references, kept sorted and capped by
+    $push/$each/$sort/$slice. A background worker pushes new posts to every
+    subscriber of channels at or below TIMELINE_FANOUT_MAX_SUBSCRIBERS and
+    pulls deleted ones. Larger channels are merged at read time. Timelines
+    that have hit the cap are flagged `capped`; pages reaching past their
+    oldest entry are merged from the channels instead.
+    """
+
+    def __init__(self, max_entries: int = TIMELINE_MAX_ENTRIES, queue_size: int = TIMELINE_QUEUE_SIZE):
+        self.max_entries = max_entries
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+
+    # Writes (queued)
+
+    def _enqueue(self, job: tuple):
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # Dropped entries only cost freshness; the posts stay reachable in channels
+            logger.warning(f"Timeline queue full, dropping {job[0]} job")
+
+    def post_created(self, channel: dict, post: dict):
+        if is_fanout_channel(channel):
+            self._enqueue(("push", list(channel.get("participants", [])), _entry(post)))
+
+    def post_deleted(self, channel: dict, post_id: str):
+        # Entries of other channels are never served, and a deleted post is
+        # dropped at read time if its channel is fanned out again later
+        if is_fanout_channel(channel) and ObjectId.is_valid(post_id):
+            self._enqueue(("pull", list(channel.get("participants", [])), ObjectId(post_id)))
+
+    def subscribed(self, channel: dict, user_id: str):
+        if is_fanout_channel(channel):
+            self._enqueue(("backfill", str(channel["_id"]), user_id))
+
+    async def push(self, db: AsyncIOMotorDatabase, user_ids: List[str], entries: List[dict]):
+        # Timelines that don't exist yet are built from the channels on first read
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": user_id},
+                {
+                    "$push": {"entries": {
+                        "$each": entries,
+                        "$sort": {"created_at": -1, "post_id": -1},
+                        "$slice": self.max_entries
+                    }},
+                    "$set": {"updated_at": now}
+                }
+            )
+            for user_id in user_ids
+        ]
+        for start in range(0, len(operations), BULK_CHUNK_SIZE):
+            await db.timelines.bulk_write(operations[start:start + BULK_CHUNK_SIZE], ordered=False)
+            # Full timelines may have sliced off older posts; reads past their
+            # end fall back to merging channels
+            await db.timelines.update_many(
+                {
+                    "_id": {"$in": user_ids[start:start + BULK_CHUNK_SIZE]},
+                    f"entries.{self.max_entries - 1}": {"$exists": True},
+                    "capped": {"$ne": True}
+                },
+                {"$set": {"capped": True}}
+            )
+
+    async def pull(self, db: AsyncIOMotorDatabase, user_ids: List[str], post_id: ObjectId):
+        for start in range(0, len(user_ids), BULK_CHUNK_SIZE):
+            await db.timelines.update_many(
+                {"_id": {"$in": user_ids[start:start + BULK_CHUNK_SIZE]}},
+                {"$pull": {"entries": {"post_id": post_id}}}
+            )
+
+    async def backfill(self, db: AsyncIOMotorDatabase, channel_id: str, user_id: str):
+        """Add a newly subscribed channel's recent posts to the user's timeline"""
+        posts = await db.posts.find(
+            {"channel_id": channel_id}, {"channel_id": 1, "created_at": 1}
+        ).sort([("created_at", -1), ("_id", -1)]).limit(self.max_entries).to_list(length=None)
+        if posts:
+            await self.push(db, [user_id], [_entry(post) for post in posts])
+
+    async def _process(self, db: AsyncIOMotorDatabase, job: tuple):
+        kind = job[0]
+        if kind == "push":
+            await self.push(db, job[1], [job[2]])
+        elif kind == "pull":
+            await self.pull(db, job[1], job[2])
+        elif kind == "backfill":
+            await self.backfill(db, job[1], job[2])
+
+    async def _run(self, db: AsyncIOMotorDatabase):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(db, job)
+            except Exception as e:
+                logger.error(f"Error processing timeline {job[0]} job: {e}")
+            finally:
+                self._queue.task_done()
+
+    def start(self, db: AsyncIOMotorDatabase):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self, db: AsyncIOMotorDatabase):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Apply what is still queued so posts aren't lost on shutdown
+        while not self._queue.empty():
+            try:
+                await self._process(db, self._queue.get_nowait())
+            except Exception as e:
+                logger.error(f"Error draining timeline queue: {e}")
+
+    # Reads
+
+    async def _build(self, db: AsyncIOMotorDatabase, user_id: str, channels: List[dict]) -> dict:
+        """Create a missing timeline from the channels' newest posts"""
+        posts, has_more = await merge_channel_posts(db, channels, self.max_entries)
+        # $push rather than $setOnInsert keeps entries fanned out meanwhile;
+        # duplicates from concurrent builds are dropped at read time
+        timeline = await db.timelines.find_one_and_update(
+            {"_id": user_id},
+            {
+                "$push": {"entries": {
+                    "$each": [_entry(post) for post in posts],
+                    "$sort": {"created_at": -1, "post_id": -1},
+                    "$slice": self.max_entries
+                }},
+                "$set": {"updated_at": datetime.utcnow()},
+                "$max": {"capped": has_more}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return timeline
+
+    async def read_feed(
+        self,
+        db: AsyncIOMotorDatabase,
+        feed_db: AsyncIOMotorDatabase,
+        user_id: str,
+        channels: List[dict],
+        limit: int,
+        before: Optional[FeedCursor] = None
+    ) -> Tuple[List[dict], bool]:
+        """Home feed page: fan-out channels from the timeline, the rest merged.
+
+        The timeline document is read from db (the primary); posts come from
+        feed_db. A missing timeline is built once from the fan-out channels.
+        """
+        pushed = [channel for channel in channels if is_fanout_channel(channel)]
+        pulled = [channel for channel in channels if not is_fanout_channel(channel)]
+        pushed_ids = {str(channel["_id"]) for channel in pushed}
+
+        timeline = await db.timelines.find_one({"_id": user_id}) if pushed else {"entries": []}
+        if timeline is None:
+            timeline = await self._build(db, user_id, pushed)
+        entries = timeline.get("entries", [])
+        capped = timeline.get("capped", False)
+
+        candidates, candidate_ids = [], set()
+        for entry in entries:
+            if (entry["channel_id"] in pushed_ids and entry["post_id"] not in candidate_ids
+                    and (before is None or _key(entry) < before)):
+                candidate_ids.add(entry["post_id"])
+                candidates.append(entry)
+
+        # Entries of deleted posts may not be pulled yet: keep fetching until
+        # limit + 1 posts exist so the page isn't short while there are more
+        timeline_posts, position = [], 0
+        while len(timeline_posts) <= limit and position < len(candidates):
+            window = candidates[position:position + limit + 1 - len(timeline_posts)]
+            position += len(window)
+            timeline_posts += await feed_db.posts.find(
+                {"_id": {"$in": [entry["post_id"] for entry in window]}}
+            ).to_list(length=None)
+        if len(timeline_posts) < limit and capped:
+            # The page runs past the capped timeline: merge every channel instead
+            return await merge_channel_posts(feed_db, channels, limit, before)
+        timeline_more = len(timeline_posts) > limit or position < len(candidates)
+        timeline_posts = sorted(timeline_posts, key=_key, reverse=True)[:limit]
+
+        pulled_posts, pulled_more = [], False
+        if pulled:
+            pulled_posts, pulled_more = await merge_channel_posts(feed_db, pulled, limit, before)
+
+        # Merge both sources newest first; a post can appear in both right
+        # after its channel crosses the threshold
+        posts, seen = [], set()
+        for post in sorted(timeline_posts + pulled_posts, key=_key, reverse=True):
+            if post["_id"] not in seen:
+                seen.add(post["_id"])
+                posts.append(post)
+        has_more = timeline_more or pulled_more or len(posts) > limit
+        posts = posts[:limit]
+        if pulled_more and len(pulled_posts) < limit and pulled_posts:
+            # The pulled merge stopped early; don't return timeline posts beyond it
+            oldest_pulled = _key(pulled_posts[-1])
+            posts = [post for post in posts if _key(post) >= oldest_pulled]
+        return posts, has_more
+
+timeline_fanout = TimelineFanout()
@@ -0,0 +1,104 @@
+from typing import AsyncIterator, Dict, List, Optional, Set
+import asyncio
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Typing indicator settings
+TYPING_TTL_SECONDS = float(os.getenv("TYPING_TTL_SECONDS", "6"))
+TYPING_COALESCE_SECONDS = float(os.getenv("TYPING_COALESCE_MS", "300")) / 1000
+TYPING_SUBSCRIBER_QUEUE_SIZE = 8
+
+class _ChatTypingState:
+    def __init__(self):
+        self.typing: Dict[str, float] = {}  # user_id -> expires at (monotonic)
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.last_snapshot: List[str] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+
+class TypingHub:
+    """Ephemeral per-chat typing state with coalesced fan-out.
+
+    Nothing here touches MongoDB. Clients report typing as often as they
+    like; state only changes when someone starts or stops typing (repeated
+    reports just extend the TTL), and subscribers get at most one snapshot
+    per coalescing window.
+    """
+
+    def __init__(self, ttl_seconds: float = TYPING_TTL_SECONDS,
+                 coalesce_seconds: float = TYPING_COALESCE_SECONDS):
+        self.ttl = ttl_seconds
+        self.coalesce = coalesce_seconds
+        self._chats: Dict[str, _ChatTypingState] = {}
+
+    def publish(self, chat_id: str, user_id: str, is_typing: bool):
+        state = self._chats.setdefault(chat_id, _ChatTypingState())
+        if is_typing:
+            changed = user_id not in state.typing
+            state.typing[user_id] = time.monotonic() + self.ttl
+        else:
+            changed = state.typing.pop(user_id, None) is not None
+
+        if changed:
+            self._schedule_flush(chat_id, state, self.coalesce)
+        elif not state.subscribers and not state.typing:
+            self._chats.pop(chat_id, None)
+
+    def typing_users(self, chat_id: str) -> List[str]:
+        state = self._chats.get(chat_id)
+        if not state:
+            return []
+        now = time.monotonic()
+        return sorted(user_id for user_id, expires in state.typing.items() if expires > now)
+
+    async def subscribe(self, chat_id: str) -> AsyncIterator[List[str]]:
+        """Yield the list of typing users whenever it changes"""
+        state = self._chats.setdefault(chat_id, _ChatTypingState())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=TYPING_SUBSCRIBER_QUEUE_SIZE)
+        state.subscribers.add(queue)
+        try:
+            yield self.typing_users(chat_id)
+            while True:
+                yield await queue.get()
+        finally:
+            state.subscribers.discard(queue)
+            if not state.subscribers and not state.typing:
+                self._chats.pop(chat_id, None)
+
+    def _schedule_flush(self, chat_id: str, state: _ChatTypingState, delay: float):
+        loop = asyncio.get_running_loop()
+        if state.flush_handle is not None:
+            # A pending expiry wake-up must not hold back a state change
+            if state.flush_handle.when() <= loop.time() + delay:
+                return
+            state.flush_handle.cancel()
+        state.flush_handle = loop.call_later(delay, self._flush, chat_id)
+
+    def _flush(self, chat_id: str):
+        state = self._chats.get(chat_id)
+        if state is None:
+            return
+        state.flush_handle = None
+
+        # Expire stale typers, then wake up again when the next one expires
+        now = time.monotonic()
+        for user_id in [uid for uid, expires in state.typing.items() if expires <= now]:
+            del state.typing[user_id]
+        if state.typing:
+            self._schedule_flush(chat_id, state, max(min(state.typing.values()) - now, self.coalesce))
+
+        snapshot = sorted(state.typing)
+        if snapshot != state.last_snapshot:
+            state.last_snapshot = snapshot
+            for queue in state.subscribers:
+                if queue.full():
+                    # Slow subscriber: only the newest snapshot matters
+                    queue.get_nowait()
+                queue.put_nowait(snapshot)
+
+        if not state.subscribers and not state.typing:
+            self._chats.pop(chat_id, None)
+
+typing_hub = TypingHub()
@@ -0,0 +1,121 @@
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Set
+import asyncio
+import os
+import logging
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Write coalescing settings (opt-in)
+MESSAGE_WRITE_COALESCING = os.getenv("MESSAGE_WRITE_COALESCING", "false").lower() == "true"
+MESSAGE_COALESCE_WINDOW_MS = float(os.getenv("MESSAGE_COALESCE_WINDOW_MS", "2"))
+MESSAGE_COALESCE_MAX_DOCS = int(os.getenv("MESSAGE_COALESCE_MAX_DOCS", "64"))
+
+class _PendingWrite(NamedTuple):
+    message: dict
+    chat_filter: dict
+    future: asyncio.Future
+
+class MessageWriteCoalescer:
+    """Group commit for message inserts of document-layout chats.
+
+    Inserts arriving within MESSAGE_COALESCE_WINDOW_MS of the first one, up
+    to MESSAGE_COALESCE_MAX_DOCS, are written with one insert_many, and
+    their chats' last_message_* fields with one bulk_write. Each caller
+    waits for its own message id, so a send costs a few milliseconds of
+    latency but far fewer round trips under load.
+    """
+
+    def __init__(self, window_ms: float = MESSAGE_COALESCE_WINDOW_MS,
+                 max_docs: int = MESSAGE_COALESCE_MAX_DOCS):
+        self.window = window_ms / 1000
+        self.max_docs = max_docs
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._pending: List[_PendingWrite] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._writes: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    async def insert(self, message: dict, chat_filter: dict) -> str:
+        """Queue a message (without id) and its chat update; returns the message id"""
+        message = {**message, "_id": ObjectId()}
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_PendingWrite(message, chat_filter, future))
+        if len(self._pending) >= self.max_docs:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._write(batch))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch: List[_PendingWrite]):
+        failed = {}
+        try:
+            await self._db.messages.insert_many([pending.message for pending in batch], ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error.get("errmsg", "write error") for error in e.details.get("writeErrors", [])}
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        # Newest stored message per chat
+        newest = {}
+        for position, pending in enumerate(batch):
+            if position not in failed:
+                chat_key = str(pending.chat_filter["_id"])
+                if chat_key not in newest or pending.message["timestamp"] >= newest[chat_key].message["timestamp"]:
+                    newest[chat_key] = pending
+        if newest:
+            now = datetime.utcnow()
+            try:
+                await self._db.chats.bulk_write([
+                    UpdateOne(pending.chat_filter, {"$set": {
+                        "last_message_id": str(pending.message["_id"]),
+                        "last_message_time": pending.message["timestamp"],
+                        "updated_at": now
+                    }})
+                    for pending in newest.values()
+                ], ordered=False)
+            except Exception as e:
+                # The messages are stored; failing their senders would only cause resends
+                logger.error(f"Error updating last messages of {len(newest)} chats: {e}")
+
+        for position, pending in enumerate(batch):
+            if pending.future.done():
+                continue
+            if position in failed:
+                pending.future.set_exception(RuntimeError(f"Message insert failed: {failed[position]}"))
+            else:
+                pending.future.set_result(str(pending.message["_id"]))
+
+    def start(self, db: AsyncIOMotorDatabase):
+        if MESSAGE_WRITE_COALESCING:
+            self._db = db
+
+    async def stop(self):
+        """Write what is still queued and wait for in-flight batches"""
+        self._flush()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+        self._db = None
+
+message_coalescer = MessageWriteCoalescer()
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Bulk-load a production-shaped synthetic dataset for performance work.
+
+Everything is derived from --seed (including ObjectIds and timestamps), so
+two runs with the same arguments produce identical databases:
+
+    python -m benchmarks.generate_dataset --profile small --db-name emi_bench
+    python -m benchmarks.generate_dataset --profile large --parallelism 16
+
+Distributions:
+- users are spread over BSC/TRON/TON/ETHEREUM, and a few users are far
+  more active than the rest (power-law participation)
+- chat sizes and chat activity follow Zipf distributions
+- channel subscriber counts follow a power law, so the top channels reach
+  --max-subscribers (100k+ in the large profile)
+"""
+import argparse
+import asyncio
+import hashlib
+import struct
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+
+import numpy as np
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+PROFILES = {
+    "small": dict(users=10_000, chats=5_000, channels=100, max_subscribers=5_000,
+                  messages=1_000_000, posts=100_000),
+    "medium": dict(users=200_000, chats=100_000, channels=2_000, max_subscribers=100_000,
+                   messages=20_000_000, posts=2_000_000),
+    "large": dict(users=2_000_000, chats=1_000_000, channels=20_000, max_subscribers=200_000,
+                  messages=300_000_000, posts=100_000_000),
+}
+
+NETWORKS = np.array(["BSC", "TRON", "TON", "ETHEREUM"])
+NETWORK_WEIGHTS = np.array([0.45, 0.25, 0.15, 0.15])
+CHAT_TYPES = np.array(["personal", "group", "secret"])
+CHAT_TYPE_WEIGHTS = np.array([0.60, 0.35, 0.05])
+BASE58 = np.array(list("123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"))
+BASE64URL = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"))
+WORDS = np.array(
+    "hey hi ok yes no thanks wallet token price pump dump moon hodl buy sell gm gn wen lambo "
+    "airdrop stake swap bridge fees gas chain block tx send check link soon today tomorrow "
+    "what why how when where who lol nice cool great sure maybe later meeting call".split()
+)
+REACTIONS = ["like", "love", "laugh", "wow", "sad", "angry"]
+
+# Entity families, used to derive ObjectIds and per-batch random streams
+USERS, CHATS, CHANNELS, MESSAGES, POSTS = range(1, 6)
+
+def object_id(family: int, index: int, created_at: datetime) -> ObjectId:
+    """Deterministic ObjectId whose timestamp part matches created_at"""
+    return ObjectId(struct.pack(">IB", int(created_at.replace(tzinfo=timezone.utc).timestamp()), family) + int(index).to_bytes(7, "big"))
+
+def batch_rng(seed: int, family: int, batch: int) -> np.random.Generator:
+    """Independent random stream per batch, so parallel loading stays deterministic"""
+    return np.random.default_rng([seed, family, batch])
+
+def skewed_indices(rng: np.random.Generator, count: int, size: int, skew: float = 3.0) -> np.ndarray:
+    """Indices in [0, count) where low indices are much more likely (activity skew)"""
+    return np.minimum((count * rng.random(size) ** skew).astype(np.int64), count - 1)
+
+def zipf_weights(count: int, exponent: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+def random_text(rng: np.random.Generator, mean_words: float) -> str:
+    length = max(1, int(rng.lognormal(np.log(mean_words), 0.6)))
+    return " ".join(rng.choice(WORDS, length))
+
+def wallet_address(rng: np.random.Generator, network: str, index: int, seed: int) -> str:
+    digest = hashlib.sha256(f"{seed}:{index}".encode()).hexdigest()
+    if network in ("BSC", "ETHEREUM"):
+        return "0x" + digest[:40]
+    if network == "TRON":
+        return "T" + "".join(rng.choice(BASE58, 33))
+    return "EQ" + "".join(rng.choice(BASE64URL, 46))
+
+class DatasetGenerator:
+    def __init__(self, db, args: argparse.Namespace):
+        self.db = db
+        self.args = args
+        self.end = datetime.fromisoformat(args.end_date)
+        self.start = self.end - timedelta(days=args.days)
+        self.span = (self.end - self.start).total_seconds()
+        self.semaphore = asyncio.Semaphore(args.parallelism)
+        self.pending: List[asyncio.Task] = []
+
+        self.user_ids: List[str] = []
+        self.chat_participants: List[np.ndarray] = []
+        self.chat_ids: List[str] = []
+        self.channel_ids: List[str] = []
+        self.channel_owners: List[str] = []
+
+    def timestamps(self, rng: np.random.Generator, size: int, recency: float = 2.0) -> np.ndarray:
+        """Seconds since self.start, biased towards recent activity"""
+        return self.span * (1 - rng.random(size) ** recency)
+
+    def at(self, seconds: float) -> datetime:
+        return self.start + timedelta(seconds=float(seconds))
+
+    async def _insert(self, collection: str, documents: List[dict]):
+        try:
+            await self.db[collection].insert_many(documents, ordered=False)
+        finally:
+            self.semaphore.release()
+
+    async def insert(self, collection: str, documents: List[dict]):
+        """Schedule an unordered insert_many, keeping --parallelism batches in flight"""
+        await self.semaphore.acquire()
+        self.pending.append(asyncio.create_task(self._insert(collection, documents)))
+        if len(self.pending) > self.args.parallelism * 4:
+            done = [task for task in self.pending if task.done()]
+            await asyncio.gather(*done)
+            self.pending = [task for task in self.pending if not task.done()]
+
+    async def drain(self):
+        await asyncio.gather(*self.pending)
+        self.pending = []
+
+    def batches(self, total: int) -> Iterator[range]:
+        size = self.args.batch_size
+        for batch, start in enumerate(range(0, total, size)):
+            yield batch, range(start, min(start + size, total))
+
+    async def generate_users(self):
+        total = self.args.users
+        for batch, indices in self.batches(total):
+            rng = batch_rng(self.args.seed, USERS, batch)
+            networks = rng.choice(NETWORKS, len(indices), p=NETWORK_WEIGHTS)
+            created = self.timestamps(rng, len(indices), recency=1.2)
+            documents = []
+            for offset, index in enumerate(indices):
+                created_at = self.at(created[offset])
+                address = wallet_address(rng, networks[offset], index, self.args.seed)
+                documents.append({
+                    "_id": object_id(USERS, index, created_at),
+                    "wallet_address": address.lower(),
+                    "network": str(networks[offset]),
+                    "username": f"user_{address[-6:]}",
+                    "avatar": f"https://api.dicebear.com/7.x/identicon/svg?seed={address}",
+                    "trust_score": int(rng.integers(0, 100)),
+                    "is_online": False,
+                    "last_seen": created_at,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+            self.user_ids.extend(str(document["_id"]) for document in documents)
+            await self.insert("users", documents)
+            progress("users", indices.stop, total)
+        await self.drain()
+
+    async def generate_chats(self):
+        total = self.args.chats
+        users = np.array(self.user_ids)
+        for batch, indices in self.batches(total):
+            rng = batch_rng(self.args.seed, CHATS, batch)
+            chat_types = rng.choice(CHAT_TYPES, len(indices), p=CHAT_TYPE_WEIGHTS)
+            group_sizes = np.minimum(rng.zipf(1.8, len(indices)) + 2, self.args.max_group_size)
+            created = self.timestamps(rng, len(indices), recency=1.5)
+            documents = []
+            for offset, index in enumerate(indices):
+                chat_type = str(chat_types[offset])
+                size = 2 if chat_type == "personal" else int(group_sizes[offset])
+                members = np.unique(skewed_indices(rng, len(users), size))
+                if len(members) < 2:
+                    members = np.unique(np.append(members, rng.integers(len(users))))
+                participants = users[members].tolist()
+                created_at = self.at(created[offset])
+                documents.append({
+                    "_id": object_id(CHATS, index, created_at),
+                    "name": None if chat_type == "personal" else random_text(rng, 2).title(),
+                    "chat_type": chat_type,
+                    "participants": participants,
+                    "admins": [] if chat_type == "personal" else participants[:1],
+                    "is_secret": chat_type == "secret",
+                    "secret_timer": 86400 if chat_type == "secret" else None,
+                    "is_public": False,
+                    "subscriber_count": len(participants),
+                    "created_by": participants[0],
+                    "owner_id": None,
+                    "allow_all_messages": False,
+                    "background_style": "default",
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+                self.chat_participants.append(members)
+            self.chat_ids.extend(str(document["_id"]) for document in documents)
+            await self.insert("chats", documents)
+            progress("chats", indices.stop, total)
+        await self.drain()
+
+    async def generate_channels(self):
+        total = self.args.channels
+        users = np.array(self.user_ids)
+        # Power-law subscriber counts: rank 1 gets --max-subscribers
+        ranks = np.arange(1, total + 1)
+        subscribers = np.maximum(
+            (min(self.args.max_subscribers, len(users)) / ranks ** self.args.subscriber_exponent).astype(np.int64), 1
+        )
+        for batch, indices in self.batches(total):
+            rng = batch_rng(self.args.seed, CHANNELS, batch)
+            created = self.timestamps(rng, len(indices), recency=1.2)
+            documents = []
+            for offset, index in enumerate(indices):
+                owner = str(users[skewed_indices(rng, len(users), 1)[0]])
+                count = int(subscribers[index])
+                members = rng.choice(len(users), count, replace=False) if count > 1 else np.array([], dtype=np.int64)
+                participants = list(dict.fromkeys([owner] + users[members].tolist()))
+                created_at = self.at(created[offset])
+                documents.append({
+                    "_id": object_id(CHANNELS, index, created_at),
+                    "name": random_text(rng, 2).title(),
+                    "chat_type": "channel",
+                    "participants": participants,
+                    "admins": [owner],
+                    "description": random_text(rng, 12),
+                    "is_secret": False,
+                    "is_public": True,
+                    "channel_username": f"channel_{self.args.seed}_{index}",
+                    "subscriber_count": len(participants) - 1,
+                    "created_by": owner,
+                    "owner_id": owner,
+                    "allow_all_messages": False,
+                    "background_style": "default",
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+                self.channel_owners.append(owner)
+                # Large channels are big documents: keep batches small
+                if len(documents) * max(count, 1) > 2_000_000:
+                    await self.insert("chats", documents)
+                    self.channel_ids.extend(str(document["_id"]) for document in documents)
+                    documents = []
+            if documents:
+                self.channel_ids.extend(str(document["_id"]) for document in documents)
+                await self.insert("chats", documents)
+            progress("channels", indices.stop, total)
+        await self.drain()
+
+    async def generate_messages(self):
+        total = self.args.messages
+        users = np.array(self.user_ids)
+        chat_count = len(self.chat_ids)
+        cumulative = np.cumsum(zipf_weights(chat_count, self.args.chat_activity_exponent))
+        # Latest message per chat, to fill last_message_* afterwards
+        last_seconds = np.full(chat_count, -1.0)
+        last_index = np.full(chat_count, -1, dtype=np.int64)
+
+        for batch, indices in self.batches(total):
+            rng = batch_rng(self.args.seed, MESSAGES, batch)
+            chats = np.minimum(np.searchsorted(cumulative, rng.random(len(indices))), chat_count - 1)
+            seconds = self.timestamps(rng, len(indices))
+            stickers = rng.random(len(indices)) < 0.05
+            documents = []
+            for offset, index in enumerate(indices):
+                chat = chats[offset]
+                participants = self.chat_participants[chat]
+                timestamp = self.at(seconds[offset])
+                documents.append({
+                    "_id": object_id(MESSAGES, index, timestamp),
+                    "chat_id": self.chat_ids[chat],
+                    "sender_id": str(users[participants[rng.integers(len(participants))]]),
+                    "content": "" if stickers[offset] else random_text(rng, 6),
+                    "message_type": "sticker" if stickers[offset] else "text",
+                    "sticker_url": f"https://stickers.example/{rng.integers(500)}.webp" if stickers[offset] else None,
+                    "file_url": None,
+                    "file_name": None,
+                    "file_size": None,
+                    "is_encrypted": False,
+                    "expires_at": None,
+                    "timestamp": timestamp,
+                })
+
+            order = np.lexsort((seconds, chats))
+            sorted_chats = chats[order]
+            last_positions = np.r_[np.nonzero(np.diff(sorted_chats))[0], len(sorted_chats) - 1]
+            candidate_chats = sorted_chats[last_positions]
+            candidate_seconds = seconds[order][last_positions]
+            newer = candidate_seconds > last_seconds[candidate_chats]
+            last_seconds[candidate_chats[newer]] = candidate_seconds[newer]
+            last_index[candidate_chats[newer]] = indices.start + order[last_positions][newer]
+
+            await self.insert("messages", documents)
+            progress("messages", indices.stop, total)
+        await self.drain()
+
+        from pymongo import UpdateOne
+        operations = []
+        for chat in np.nonzero(last_index >= 0)[0]:
+            timestamp = self.at(last_seconds[chat])
+            operations.append(UpdateOne(
+                {"_id": ObjectId(self.chat_ids[chat])},
+                {"$set": {
+                    "last_message_id": str(object_id(MESSAGES, last_index[chat], timestamp)),
+                    "last_message_time": timestamp,
+                    "updated_at": timestamp,
+                }}
+            ))
+            if len(operations) == self.args.batch_size:
+                await self.db.chats.bulk_write(operations, ordered=False)
+                operations = []
+        if operations:
+            await self.db.chats.bulk_write(operations, ordered=False)
+
+    async def generate_posts(self):
+        total = self.args.posts
+        channel_count = len(self.channel_ids)
+        rng = batch_rng(self.args.seed, POSTS, 0)
+        # Bigger channels post more; sequence numbers must be consecutive per channel
+        per_channel = rng.multinomial(total, zipf_weights(channel_count, 0.9))
+
+        index, documents = 0, []
+        for channel, count in enumerate(per_channel):
+            if not count:
+                continue
+            rng = batch_rng(self.args.seed, POSTS, channel + 1)
+            seconds = np.sort(self.timestamps(rng, int(count), recency=1.5))
+            media = rng.random(int(count)) < 0.3
+            for sequence in range(int(count)):
+                created_at = self.at(seconds[sequence])
+                reactions = {}
+                if rng.random() < 0.4:
+                    for reaction in rng.choice(REACTIONS, int(rng.integers(1, 4)), replace=False):
+                        reactions[str(reaction)] = [f"reactor_{value}" for value in rng.integers(0, 10_000, rng.integers(1, 20))]
+                documents.append({
+                    "_id": object_id(POSTS, index, created_at),
+                    "channel_id": self.channel_ids[channel],
+                    "author_id": self.channel_owners[channel],
+                    "sequence_number": sequence + 1,
+                    "text": random_text(rng, 25),
+                    "media_url": f"https://media.example/{index}.jpg" if media[sequence] else None,
+                    "media_type": "image" if media[sequence] else None,
+                    "post_type": "media" if media[sequence] else "text",
+                    "reactions": reactions,
+                    "views": int(rng.integers(0, 100_000)),
+                    "comments_count": 0,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+                index += 1
+                if len(documents) == self.args.batch_size:
+                    await self.insert("posts", documents)
+                    documents = []
+                    progress("posts", index, total)
+        if documents:
+            await self.insert("posts", documents)
+            progress("posts", index, total)
+        await self.drain()
+
+def progress(name: str, done: int, total: int):
+    print(f"\r{name}: {done:,}/{total:,}", end="\n" if done >= total else "", file=sys.stderr, flush=True)
+
+async def generate(args: argparse.Namespace):
+    client = AsyncIOMotorClient(args.mongo_url, maxPoolSize=max(args.parallelism * 2, 10))
+    db = client[args.db_name]
+    try:
+        if args.drop:
+            await client.drop_database(args.db_name)
+
+        generator = DatasetGenerator(db, args)
+        for step in ("users", "chats", "channels", "messages", "posts"):
+            started = time.perf_counter()
+            await getattr(generator, f"generate_{step}")()
+            print(f"{step} loaded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    finally:
+        client.close()
+
+    print("Start the API once to build indexes before benchmarking", file=sys.stderr)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="emi_bench")
+    parser.add_argument("--drop", action="store_true", help="drop the database first")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--chats", type=int)
+    parser.add_argument("--channels", type=int)
+    parser.add_argument("--max-subscribers", type=int)
+    parser.add_argument("--messages", type=int)
+    parser.add_argument("--posts", type=int)
+    parser.add_argument("--max-group-size", type=int, default=5_000)
+    parser.add_argument("--subscriber-exponent", type=float, default=0.8)
+    parser.add_argument("--chat-activity-exponent", type=float, default=1.1)
+    parser.add_argument("--days", type=int, default=365, help="history length")
+    parser.add_argument("--end-date", default="2026-01-01T00:00:00", help="fixed so runs are reproducible")
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument("--parallelism", type=int, default=8, help="insert_many calls in flight")
+    args = parser.parse_args(argv)
+
+    for key, value in PROFILES[args.profile].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+    return args
+
+def main(argv: Optional[List[str]] = None):
+    asyncio.run(generate(parse_args(argv)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Asyncio load test for the EMI API against a local MongoDB.
+
+Runs the ASGI app in-process (default) or under uvicorn, drives scripted
+scenarios with concurrent clients and writes throughput and latency
+percentiles as JSON so runs can be compared between commits:
+
+    python -m benchmarks.load_test --output before.json
+    python -m benchmarks.load_test --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+SCENARIOS = ["login_storm", "chat_send_fanin", "channel_feed_reads", "search_typing"]
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class ScenarioResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, latency: float, status_code: Optional[int]):
+        self.latencies.append(latency)
+        if status_code is None or status_code >= 400:
+            self.errors += 1
+        self.statuses[str(status_code) if status_code is not None else "error"] += 1
+
+    def to_dict(self) -> dict:
+        duration = (self.finished or time.perf_counter()) - self.started
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "duration_s": round(duration, 3),
+            "throughput_rps": round(len(latencies) / duration, 1) if duration > 0 else 0.0,
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+                "p50": round(percentile(latencies, 0.50) * 1000, 2),
+                "p95": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99": round(percentile(latencies, 0.99) * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            },
+            "status_counts": dict(self.statuses),
+        }
+
+class BenchContext:
+    def __init__(self, http: httpx.AsyncClient, args: argparse.Namespace):
+        self.http = http
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.users: List[dict] = []  # {"id", "token", "username", "wallet"}
+
+    @staticmethod
+    def headers(user: dict) -> dict:
+        return {"Authorization": f"Bearer {user['token']}"}
+
+    async def call(self, result: Optional[ScenarioResult], method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.http.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            if result is not None:
+                result.record(time.perf_counter() - start, None)
+            return None
+        if result is not None:
+            result.record(time.perf_counter() - start, response.status_code)
+        return response
+
+async def run_concurrently(concurrency: int, total: int, task: Callable[[int], Awaitable[None]]):
+    """Run task(0..total-1) with at most `concurrency` in flight"""
+    counter = iter(range(total))
+
+    async def worker():
+        for index in counter:
+            await task(index)
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+
+def bench_wallet(seed: int, index: int) -> str:
+    return "0x" + hashlib.sha256(f"bench-{seed}-{index}".encode()).hexdigest()[:40]
+
+async def login(ctx: BenchContext, result: Optional[ScenarioResult], wallet: str) -> Optional[dict]:
+    response = await ctx.call(result, "POST", "/api/auth/generate-message",
+                              params={"wallet_address": wallet, "network": "BSC"})
+    if response is None or response.status_code != 200:
+        return None
+    # BSC signatures are format-checked only (see Web3Auth._verify_bsc_signature)
+    signature = "0x" + hashlib.sha256(wallet.encode()).hexdigest() * 2 + "1b"
+    response = await ctx.call(result, "POST", "/api/auth/login", json={
+        "wallet_address": wallet,
+        "network": "BSC",
+        "signature": signature,
+        "message": response.json()["message"],
+    })
+    if response is None or response.status_code != 200:
+        return None
+    body = response.json()
+    return {
+        "id": body["user"]["id"],
+        "token": body["access_token"],
+        "username": body["user"]["username"],
+        "wallet": wallet,
+    }
+
+async def scenario_login_storm(ctx: BenchContext, result: ScenarioResult):
+    """Every client logs in at once (generate-message + login)"""
+    users: List[Optional[dict]] = [None] * ctx.args.users
+
+    async def task(index: int):
+        users[index] = await login(ctx, result, bench_wallet(ctx.args.seed, index))
+
+    await run_concurrently(ctx.args.concurrency, ctx.args.users, task)
+    ctx.users = [user for user in users if user]
+
+async def scenario_chat_send_fanin(ctx: BenchContext, result: ScenarioResult):
+    """All clients send messages into one group chat"""
+    owner, members = ctx.users[0], ctx.users[:ctx.args.group_size]
+    response = await ctx.call(None, "POST", "/api/chats/", headers=ctx.headers(owner), json={
+        "name": "Bench group",
+        "chat_type": "group",
+        "participants": [member["id"] for member in members],
+    })
+    chat_id = response.json()["id"]
+
+    async def task(index: int):
+        sender = members[index % len(members)]
+        await ctx.call(result, "POST", f"/api/chats/{chat_id}/messages", headers=ctx.headers(sender),
+                       json={"content": f"bench message {index}"})
+
+    await run_concurrently(ctx.args.concurrency, ctx.args.messages, task)
+
+async def scenario_channel_feed_reads(ctx: BenchContext, result: ScenarioResult):
+    """Subscribers page through a channel feed, mostly the first page"""
+    owner = ctx.users[0]
+    response = await ctx.call(None, "POST", "/api/chats/", headers=ctx.headers(owner), json={
+        "name": "Bench channel",
+        "chat_type": "channel",
+        "is_public": True,
+        "channel_username": f"bench_{ctx.args.seed}_{int(time.time())}",
+    })
+    channel_id = response.json()["id"]
+
+    async def subscribe(index: int):
+        await ctx.call(None, "POST", f"/api/chats/{channel_id}/subscribe",
+                       headers=ctx.headers(ctx.users[index + 1]))
+
+    async def publish(index: int):
+        await ctx.call(None, "POST", f"/api/posts/{channel_id}", headers=ctx.headers(owner),
+                       json={"text": f"bench post {index}"})
+
+    await run_concurrently(ctx.args.concurrency, len(ctx.users) - 1, subscribe)
+    # Posts get sequence numbers from the previous post, so publish serially
+    await run_concurrently(1, ctx.args.posts, publish)
+    result.started = time.perf_counter()
+
+    async def task(index: int):
+        reader = ctx.users[index % len(ctx.users)]
+        params = {"limit": 20}
+        if ctx.rng.random() < 0.3:
+            params["before_sequence"] = ctx.rng.randint(21, max(21, ctx.args.posts))
+        await ctx.call(result, "GET", f"/api/posts/{channel_id}", headers=ctx.headers(reader), params=params)
+
+    await run_concurrently(ctx.args.concurrency, ctx.args.reads, task)
+
+async def scenario_search_typing(ctx: BenchContext, result: ScenarioResult):
+    """Clients type a username one keystroke at a time, searching on each"""
+    searches = []
+    for index in range(ctx.args.searches):
+        target = ctx.rng.choice(ctx.users)["username"]
+        searcher = ctx.users[index % len(ctx.users)]
+        searches.append((searcher, target[:ctx.rng.randint(3, len(target))]))
+
+    async def task(index: int):
+        searcher, text = searches[index]
+        for length in range(1, len(text) + 1):
+            await ctx.call(result, "GET", "/api/users/search", headers=ctx.headers(searcher),
+                           params={"query": text[:length]})
+        await ctx.call(result, "GET", "/api/chats/search", headers=ctx.headers(searcher),
+                       params={"query": "bench", "chat_type": "channel"})
+
+    await run_concurrently(ctx.args.concurrency, len(searches), task)
+
+SCENARIO_FUNCTIONS = {
+    "login_storm": scenario_login_storm,
+    "chat_send_fanin": scenario_chat_send_fanin,
+    "channel_feed_reads": scenario_channel_feed_reads,
+    "search_typing": scenario_search_typing,
+}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def wait_until_up(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as http:
+        while time.monotonic() < deadline:
+            try:
+                if (await http.get("/api/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not come up")
+
+async def drop_bench_database(args: argparse.Namespace):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    if "bench" not in args.db_name:
+        raise SystemExit("Refusing to drop a database whose name does not contain 'bench'")
+    client = AsyncIOMotorClient(args.mongo_url)
+    await client.drop_database(args.db_name)
+    client.close()
+
+async def run(args: argparse.Namespace) -> dict:
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    if not args.keep_data:
+        await drop_bench_database(args)
+
+    server_process = None
+    app = None
+    if args.mode == "uvicorn":
+        port = free_port()
+        server_process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.server:app", "--host", "127.0.0.1",
+             "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=ROOT_DIR, env=os.environ.copy()
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        await wait_until_up(base_url)
+        http = httpx.AsyncClient(base_url=base_url, timeout=60,
+                                 limits=httpx.Limits(max_connections=args.concurrency))
+    elif args.mode == "url":
+        http = httpx.AsyncClient(base_url=args.base_url, timeout=60,
+                                 limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        sys.path.insert(0, str(ROOT_DIR))
+        app = importlib.import_module("backend.server").app
+        await app.router.startup()
+        http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    results: Dict[str, dict] = {}
+    try:
+        ctx = BenchContext(http, args)
+        for name in SCENARIOS:
+            if name != "login_storm" and name not in args.scenarios:
+                continue
+            result = ScenarioResult(name)
+            await SCENARIO_FUNCTIONS[name](ctx, result)
+            result.finished = time.perf_counter()
+            if name in args.scenarios:
+                results[name] = result.to_dict()
+            print(f"{name}: {json.dumps(result.to_dict()['latency_ms'])}", file=sys.stderr)
+            if name == "login_storm" and len(ctx.users) < 2:
+                raise RuntimeError("Login storm produced fewer than two users")
+    finally:
+        await http.aclose()
+        if app is not None:
+            await app.router.shutdown()
+        if server_process is not None:
+            server_process.terminate()
+            server_process.wait()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "mode": args.mode,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "seed": args.seed,
+        },
+        "scenarios": results,
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline: dict, current: dict) -> List[str]:
+    """Human readable deltas between two result files"""
+    lines = [f"{'scenario':<20} {'metric':<15} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for name, stats in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        metrics = [("throughput_rps", old["throughput_rps"], stats["throughput_rps"])]
+        metrics += [(key, old["latency_ms"][key], stats["latency_ms"][key]) for key in ("p50", "p95", "p99")]
+        for metric, before, after in metrics:
+            change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+            lines.append(f"{name:<20} {metric:<15} {before:>10} {after:>10} {change:>8}")
+    return lines
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn", "url"], default="inprocess")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8001", help="server for --mode url")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --mode uvicorn")
+    parser.add_argument("--mongo-url", default=os.environ.get("BENCH_MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="emi_bench")
+    parser.add_argument("--keep-data", action="store_true", help="do not drop the bench database first")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--group-size", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        print("\n".join(compare(baseline, report)), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
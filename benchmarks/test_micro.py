@@ -0,0 +1,239 @@
+"""
+Micro-benchmarks for per-item hot paths: document-to-response conversion,
+JWT decode, Web3Auth message parsing and ObjectId handling.
+
+Fixtures are fixed, so results are comparable between commits. Compare
+against the checked-in baseline (fails when a mean regresses by >25%):
+
+    pytest benchmarks/test_micro.py --benchmark-storage=benchmarks/baselines \
+        --benchmark-compare=0001 --benchmark-compare-fail=mean:25%
+
+Refresh the baseline after an intentional change with --benchmark-save=micro.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from bson import ObjectId
+
+from backend.models.chat import ChatResponse, Message, MessageResponse
+from backend.models.post import PostResponse
+from backend.models.user import User, UserResponse
+from backend.utils.auth import create_access_token, verify_token
+from backend.utils.web3_auth import Web3Auth
+
+PAGE_SIZE = 50
+CREATED_AT = datetime(2025, 6, 1, 12, 0, 0)
+USER_ID = "665b1a2f9c1e4a0012345678"
+CHAT_ID = "665b1a2f9c1e4a0087654321"
+WALLET = "0x8ba1f109551bd432803012645ac136ddd64dba72"
+
+MESSAGE_DOCS = [
+    {
+        "_id": ObjectId(f"665b1a2f9c1e4a00000{i:05d}"),
+        "chat_id": CHAT_ID,
+        "sender_id": USER_ID,
+        "content": f"Message number {i} with a bit of text in it",
+        "message_type": "text",
+        "sticker_url": None,
+        "file_url": None,
+        "file_name": None,
+        "file_size": None,
+        "is_encrypted": False,
+        "expires_at": None,
+        "timestamp": CREATED_AT + timedelta(seconds=i),
+    }
+    for i in range(PAGE_SIZE)
+]
+
+CHAT_DOCS = [
+    {
+        "_id": ObjectId(f"665b1a2f9c1e4a00001{i:05d}"),
+        "name": f"Group {i}",
+        "chat_type": "group",
+        "participants": [USER_ID] + [f"665b1a2f9c1e4a0000{j:06d}" for j in range(20)],
+        "admins": [USER_ID],
+        "avatar": None,
+        "description": "A group chat",
+        "is_secret": False,
+        "secret_timer": None,
+        "is_public": False,
+        "channel_username": None,
+        "subscriber_count": 21,
+        "last_message_id": str(MESSAGE_DOCS[-1]["_id"]),
+        "last_message_time": CREATED_AT,
+        "created_by": USER_ID,
+        "owner_id": None,
+        "allow_all_messages": False,
+        "created_at": CREATED_AT,
+    }
+    for i in range(PAGE_SIZE)
+]
+
+POST_DOCS = [
+    {
+        "_id": ObjectId(f"665b1a2f9c1e4a00002{i:05d}"),
+        "channel_id": CHAT_ID,
+        "author_id": USER_ID,
+        "sequence_number": i + 1,
+        "text": f"Channel post {i} " * 10,
+        "media_url": None,
+        "media_type": None,
+        "post_type": "text",
+        "reactions": {"like": [f"665b1a2f9c1e4a0000{j:06d}" for j in range(30)], "wow": [USER_ID]},
+        "views": 1000 + i,
+        "comments_count": 0,
+        "created_at": CREATED_AT + timedelta(minutes=i),
+    }
+    for i in range(PAGE_SIZE)
+]
+
+USER_DOCS = [
+    {
+        "_id": ObjectId(f"665b1a2f9c1e4a00003{i:05d}"),
+        "wallet_address": WALLET,
+        "network": "BSC",
+        "username": f"user_{i:06d}",
+        "avatar": f"https://api.dicebear.com/7.x/identicon/svg?seed={i}",
+        "trust_score": 50,
+        "is_online": False,
+        "last_seen": CREATED_AT,
+        "created_at": CREATED_AT,
+        "updated_at": CREATED_AT,
+    }
+    for i in range(PAGE_SIZE)
+]
+
+# The conversions below mirror the list loops in backend/routes/*.py
+
+def convert_messages(docs):
+    responses = []
+    for msg_doc in docs:
+        message = Message(**msg_doc)
+        message.id = str(msg_doc["_id"])
+        responses.append(MessageResponse(
+            id=message.id,
+            chat_id=message.chat_id,
+            sender_id=message.sender_id,
+            content=message.content,
+            message_type=message.message_type,
+            sticker_url=message.sticker_url,
+            file_url=message.file_url,
+            file_name=message.file_name,
+            file_size=message.file_size,
+            is_encrypted=message.is_encrypted,
+            expires_at=message.expires_at,
+            timestamp=message.timestamp
+        ))
+    return responses
+
+def convert_chats(docs):
+    return [
+        ChatResponse(
+            id=str(chat_doc["_id"]),
+            name=chat_doc.get("name"),
+            chat_type=chat_doc.get("chat_type"),
+            participants=chat_doc.get("participants", []),
+            admins=chat_doc.get("admins", []),
+            avatar=chat_doc.get("avatar"),
+            description=chat_doc.get("description"),
+            is_secret=chat_doc.get("is_secret", False),
+            secret_timer=chat_doc.get("secret_timer"),
+            is_public=chat_doc.get("is_public", False),
+            channel_username=chat_doc.get("channel_username"),
+            subscriber_count=chat_doc.get("subscriber_count", 0),
+            last_message_id=chat_doc.get("last_message_id"),
+            last_message_time=chat_doc.get("last_message_time"),
+            created_by=chat_doc.get("created_by"),
+            owner_id=chat_doc.get("owner_id"),
+            allow_all_messages=chat_doc.get("allow_all_messages", False),
+            unread_count=0,
+            last_read_message_id=None,
+            created_at=chat_doc.get("created_at")
+        )
+        for chat_doc in docs
+    ]
+
+def convert_posts(docs):
+    return [
+        PostResponse(
+            id=str(post_doc["_id"]),
+            channel_id=post_doc["channel_id"],
+            author_id=post_doc["author_id"],
+            sequence_number=post_doc.get("sequence_number", 0),
+            author_name="Unknown",
+            author_avatar=None,
+            channel_name="Channel",
+            text=post_doc.get("text"),
+            media_url=post_doc.get("media_url"),
+            media_type=post_doc.get("media_type"),
+            post_type=post_doc.get("post_type", "text"),
+            reactions=post_doc.get("reactions", {}),
+            views=post_doc.get("views", 0),
+            comments_count=post_doc.get("comments_count", 0),
+            created_at=post_doc["created_at"]
+        )
+        for post_doc in docs
+    ]
+
+def convert_users(docs):
+    responses = []
+    for user_doc in docs:
+        user = User(**user_doc)
+        responses.append(UserResponse(
+            id=str(user_doc["_id"]),
+            wallet_address=user.wallet_address,
+            network=user.network,
+            username=user.username,
+            avatar=user.avatar,
+            trust_score=user.trust_score,
+            is_online=user.is_online,
+            last_seen=user.last_seen,
+            created_at=user.created_at
+        ))
+    return responses
+
+def test_message_page_conversion(benchmark):
+    assert len(benchmark(convert_messages, MESSAGE_DOCS)) == PAGE_SIZE
+
+def test_chat_page_conversion(benchmark):
+    assert len(benchmark(convert_chats, CHAT_DOCS)) == PAGE_SIZE
+
+def test_post_page_conversion(benchmark):
+    assert len(benchmark(convert_posts, POST_DOCS)) == PAGE_SIZE
+
+def test_user_page_conversion(benchmark):
+    assert len(benchmark(convert_users, USER_DOCS)) == PAGE_SIZE
+
+def test_response_serialization(benchmark):
+    responses = convert_messages(MESSAGE_DOCS)
+    result = benchmark(lambda: [response.model_dump(mode="json") for response in responses])
+    assert len(result) == PAGE_SIZE
+
+def test_jwt_decode(benchmark):
+    token = create_access_token({"sub": USER_ID, "wallet": WALLET})
+    assert benchmark(verify_token, token)["sub"] == USER_ID
+
+def test_web3_auth_message_parsing(benchmark):
+    message, _ = Web3Auth.generate_auth_message(WALLET)
+    signature = "0x" + "ab" * 65
+
+    def parse():
+        return (
+            Web3Auth.is_message_valid(message),
+            Web3Auth.extract_wallet_from_message(message),
+            Web3Auth.verify_signature(message, signature, WALLET, "BSC"),
+        )
+
+    assert benchmark(parse) == (True, WALLET, True)
+
+def test_object_id_handling(benchmark):
+    ids = [str(doc["_id"]) for doc in MESSAGE_DOCS] + ["not-an-object-id"] * 10
+
+    def convert():
+        # The {"_id": ObjectId(id)} if ObjectId.is_valid(id) else {"_id": id} idiom
+        return [str(ObjectId(value)) if ObjectId.is_valid(value) else value for value in ids]
+
+    assert benchmark(convert) == ids
@@ -0,0 +1,78 @@
+"""
+Shared helpers: a `run` fixture for driving coroutines without an async
+pytest plugin, and in-memory stand-ins for the few motor calls the
+helpers under test make.
+"""
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+@pytest.fixture
+def run():
+    return asyncio.run
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.documents.sort(key=lambda document: document[field], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return self.documents
+
+class FakeCollection:
+    """Records queries and writes; find() filters with matcher(document, query).
+
+    insert_many rejects the documents at fail_indexes with a duplicate key
+    BulkWriteError, or raises error outright.
+    """
+
+    def __init__(self, documents=(), matcher=None, fail_indexes=(), error=None):
+        self.documents = list(documents)
+        self.matcher = matcher or (lambda document, query: True)
+        self.fail_indexes = set(fail_indexes)
+        self.error = error
+        self.queries = []
+        self.inserts = []
+        self.bulk_writes = []
+
+    def find(self, query):
+        self.queries.append(query)
+        return FakeCursor([document for document in self.documents if self.matcher(document, query)])
+
+    async def insert_many(self, documents, ordered=True):
+        self.inserts.append(list(documents))
+        if self.error is not None:
+            raise self.error
+        if self.fail_indexes:
+            raise BulkWriteError({
+                "writeErrors": [
+                    {"index": index, "code": 11000, "errmsg": f"duplicate key {index}"}
+                    for index in sorted(self.fail_indexes)
+                ],
+                "nInserted": len(documents) - len(self.fail_indexes),
+            })
+
+    async def bulk_write(self, operations, ordered=True):
+        self.bulk_writes.append(list(operations))
+
+class FakeDatabase:
+    """Collections passed by name; any other collection starts out empty"""
+
+    def __init__(self, **collections):
+        self.__dict__.update(collections)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        collection = FakeCollection()
+        setattr(self, name, collection)
+        return collection
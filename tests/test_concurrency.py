@@ -0,0 +1,87 @@
+"""
+Structured concurrent sub-queries: results keep their order, and a failure,
+timeout or cancellation of the caller cancels the queries still running.
+"""
+import asyncio
+
+import pytest
+
+from backend.utils.concurrency import gather_queries
+
+class SlowQuery:
+    """Query that records whether it finished or was cancelled"""
+
+    def __init__(self, result=None, delay=10.0, error=None):
+        self.result = result
+        self.delay = delay
+        self.error = error
+        self.finished = False
+        self.cancelled = False
+
+    async def __call__(self):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        self.finished = True
+        return self.result
+
+def test_results_are_returned_in_query_order(run):
+    slow = SlowQuery("slow", delay=0.03)
+    fast = SlowQuery("fast", delay=0.0)
+
+    assert run(gather_queries(slow(), fast())) == ("slow", "fast")
+
+def test_failure_cancels_the_other_queries(run):
+    failing = SlowQuery(delay=0.0, error=LookupError("not found"))
+    slow = SlowQuery("slow")
+
+    with pytest.raises(LookupError):
+        run(gather_queries(slow(), failing()))
+
+    assert slow.cancelled
+    assert not slow.finished
+
+def test_first_error_in_query_order_wins(run):
+    async def scenario():
+        return await gather_queries(
+            SlowQuery(delay=0.0, error=KeyError("first"))(),
+            SlowQuery(delay=0.0, error=ValueError("second"))(),
+        )
+
+    with pytest.raises(KeyError):
+        run(scenario())
+
+def test_timeout_cancels_unfinished_queries(run):
+    fast = SlowQuery("fast", delay=0.0)
+    slow = SlowQuery("slow")
+
+    with pytest.raises(asyncio.TimeoutError):
+        run(gather_queries(fast(), slow(), timeout=0.02))
+
+    assert fast.finished
+    assert slow.cancelled
+
+def test_cancelling_the_caller_cancels_the_queries(run):
+    first = SlowQuery("first")
+    second = SlowQuery("second")
+
+    async def scenario():
+        group = asyncio.ensure_future(gather_queries(first(), second()))
+        await asyncio.sleep(0.01)
+        group.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await group
+
+    run(scenario())
+
+    assert first.cancelled and second.cancelled
+
+def test_no_timeout_waits_for_every_query(run):
+    slow = SlowQuery("slow", delay=0.05)
+
+    assert run(gather_queries(slow(), timeout=None)) == ("slow",)
+    assert slow.finished
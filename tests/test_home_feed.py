@@ -0,0 +1,109 @@
+"""
+Lazy heap merge of channel posts for the home feed: pages come out in
+global (created_at, _id) order, cursors continue without gaps, and
+channels that can't reach the page are never queried.
+"""
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from backend.utils import home_feed
+from backend.utils.home_feed import merge_channel_posts
+
+from .conftest import FakeCollection, FakeDatabase
+
+START = datetime(2025, 6, 1, 12, 0, 0)
+
+def keyset_match(post, query):
+    """The channel and (created_at, _id) cursor conditions of merge_channel_posts' queries"""
+    if post["channel_id"] != query["channel_id"]:
+        return False
+    if "$or" not in query:
+        return True
+    older, same_time = query["$or"]
+    return (post["created_at"] < older["created_at"]["$lt"]
+            or (post["created_at"] == same_time["created_at"] and post["_id"] < same_time["_id"]["$lt"]))
+
+def posts_database(posts):
+    return FakeDatabase(posts=FakeCollection(posts, matcher=keyset_match))
+
+def queried_channels(db):
+    return [query["channel_id"] for query in db.posts.queries]
+
+def make_feed(channel_count, posts_per_channel, step_seconds=7):
+    """Channels whose posts interleave in time, with some equal timestamps"""
+    channels, posts = [], []
+    serial = 0
+    for channel_index in range(channel_count):
+        channel_id = f"665b1a2f9c1e4a00000000{channel_index:02d}"
+        created = []
+        for post_index in range(posts_per_channel):
+            serial += 1
+            created_at = START + timedelta(seconds=(post_index * step_seconds + channel_index * 3) // 2 * 2)
+            posts.append({"_id": ObjectId(f"665b1a2f9c1e4a01{serial:08x}"), "channel_id": channel_id,
+                          "created_at": created_at})
+            created.append(created_at)
+        channels.append({"_id": ObjectId(channel_id), "last_post_at": max(created)})
+    return channels, posts
+
+def feed_order(posts):
+    return sorted(posts, key=lambda post: (post["created_at"], post["_id"]), reverse=True)
+
+def test_page_matches_global_order(run):
+    channels, posts = make_feed(channel_count=6, posts_per_channel=10)
+    db = posts_database(posts)
+
+    page, has_more = run(merge_channel_posts(db, channels, limit=15))
+
+    assert page == feed_order(posts)[:15]
+    assert has_more
+
+def test_cursor_pages_cover_every_post_once(run):
+    channels, posts = make_feed(channel_count=5, posts_per_channel=9)
+    db = posts_database(posts)
+
+    collected, before = [], None
+    while True:
+        page, has_more = run(merge_channel_posts(db, channels, limit=7, before=before))
+        collected += page
+        if not has_more or not page:
+            break
+        before = (page[-1]["created_at"], page[-1]["_id"])
+
+    assert collected == feed_order(posts)
+
+def test_channels_that_cannot_reach_the_page_are_not_opened(run, monkeypatch):
+    # One channel per round trip, so every opened channel is one the merge asked for
+    monkeypatch.setattr(home_feed, "FEED_OPEN_BATCH", 1)
+    channels, posts = make_feed(channel_count=3, posts_per_channel=20)
+    # Channels whose newest post is older than everything on the first page
+    quiet_channels = [
+        {"_id": ObjectId(f"665b1a2f9c1e4a00000001{index:02d}"), "last_post_at": START - timedelta(days=30)}
+        for index in range(20)
+    ]
+    db = posts_database(posts)
+
+    page, _ = run(merge_channel_posts(db, channels + quiet_channels, limit=10))
+
+    assert page == feed_order(posts)[:10]
+    assert set(queried_channels(db)) == {str(channel["_id"]) for channel in channels}
+
+def test_page_ends_early_at_the_channel_limit(run, monkeypatch):
+    monkeypatch.setattr(home_feed, "FEED_OPEN_BATCH", 1)
+    # Channel k posted in its own hour, newest channel first
+    channels, posts = [], []
+    for channel_index in range(5):
+        channel_id = f"665b1a2f9c1e4a00000000{channel_index:02d}"
+        hour = START - timedelta(hours=channel_index)
+        for post_index in range(4):
+            posts.append({"_id": ObjectId(f"665b1a2f9c1e4a02{channel_index:04x}{post_index:04x}"),
+                          "channel_id": channel_id, "created_at": hour - timedelta(minutes=post_index)})
+        channels.append({"_id": ObjectId(channel_id), "last_post_at": hour})
+    db = posts_database(posts)
+
+    page, has_more = run(merge_channel_posts(db, channels, limit=20, max_channels=2))
+
+    # Stops after two channels rather than skip ahead of unopened ones
+    assert page == feed_order(posts)[:8]
+    assert has_more
+    assert len(queried_channels(db)) == 2
@@ -0,0 +1,126 @@
+"""
+Single-flight loading of the channel post cache: concurrent misses share
+one load, and a load that overlaps a write is served but not stored.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from backend.models.post import PostResponse
+from backend.utils.post_cache import ChannelPostCache
+
+CHANNEL_ID = "665b1a2f9c1e4a0000000001"
+
+def post(sequence_number):
+    return PostResponse(
+        id=f"665b1a2f9c1e4a00000{sequence_number:05d}",
+        channel_id=CHANNEL_ID,
+        author_id="665b1a2f9c1e4a0012345678",
+        sequence_number=sequence_number,
+        text=f"Post {sequence_number}",
+        media_url=None,
+        media_type=None,
+        post_type="text",
+        reactions={},
+        views=0,
+        comments_count=0,
+        created_at=datetime(2025, 6, 1, 12, 0, sequence_number),
+    )
+
+class CountingLoader:
+    def __init__(self, posts, delay=0.01, error=None):
+        self.posts = posts
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return list(self.posts)
+
+def test_concurrent_misses_share_one_load(run):
+    cache = ChannelPostCache(size=10, ttl_seconds=60)
+    load = CountingLoader([post(2), post(1)])
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get(CHANNEL_ID, load) for _ in range(20)))
+
+    pages = run(scenario())
+
+    assert load.calls == 1
+    assert all([cached.sequence_number for cached in page] == [2, 1] for page in pages)
+
+def test_cached_page_is_served_until_it_expires(run):
+    cache = ChannelPostCache(size=10, ttl_seconds=0.05)
+    load = CountingLoader([post(1)], delay=0)
+
+    async def scenario():
+        await cache.get(CHANNEL_ID, load)
+        await cache.get(CHANNEL_ID, load)
+        await asyncio.sleep(0.06)
+        await cache.get(CHANNEL_ID, load)
+        await cache.get(CHANNEL_ID, load)
+
+    run(scenario())
+
+    assert load.calls == 2
+
+def test_cancelled_reader_does_not_cancel_the_shared_load(run):
+    cache = ChannelPostCache(size=10, ttl_seconds=60)
+    load = CountingLoader([post(1)], delay=0.05)
+
+    async def scenario():
+        first = asyncio.ensure_future(cache.get(CHANNEL_ID, load))
+        second = asyncio.ensure_future(cache.get(CHANNEL_ID, load))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        page = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return page
+
+    page = run(scenario())
+
+    assert [cached.sequence_number for cached in page] == [1]
+    assert load.calls == 1
+
+def test_load_overlapping_a_write_is_not_stored(run):
+    cache = ChannelPostCache(size=10, ttl_seconds=60)
+    load = CountingLoader([post(1)], delay=0.05)
+
+    async def scenario():
+        loading = asyncio.ensure_future(cache.get(CHANNEL_ID, load))
+        await asyncio.sleep(0.01)
+        # Written after the load's query may have run: its result can't be trusted
+        cache.post_created(CHANNEL_ID, post(2))
+        stale_page = await loading
+        load.posts = [post(2), post(1)]
+        fresh_page = await cache.get(CHANNEL_ID, load)
+        return stale_page, fresh_page
+
+    stale_page, fresh_page = run(scenario())
+
+    assert [cached.sequence_number for cached in stale_page] == [1]
+    assert [cached.sequence_number for cached in fresh_page] == [2, 1]
+    assert load.calls == 2
+
+def test_failed_load_reaches_every_waiter_and_is_not_cached(run):
+    cache = ChannelPostCache(size=10, ttl_seconds=60)
+    load = CountingLoader([], error=RuntimeError("secondary unavailable"))
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get(CHANNEL_ID, load) for _ in range(3)), return_exceptions=True)
+
+    results = run(scenario())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert load.calls == 1
+
+    load.error = None
+    load.posts = [post(1)]
+    assert [cached.sequence_number for cached in run(cache.get(CHANNEL_ID, load))] == [1]
+    assert load.calls == 2
@@ -0,0 +1,52 @@
+"""
+Server-Timing accounting: handler time is charged once per request, even
+for routes mounted through several nested routers.
+"""
+import asyncio
+import re
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from backend.utils.request_stats import RequestStatsMiddleware, TimedRoute
+
+HANDLER_SECONDS = 0.05
+
+def server_timing(response) -> dict:
+    return {
+        name: float(duration)
+        for name, duration in re.findall(r"(\w+);dur=([\d.]+)", response.headers["server-timing"])
+    }
+
+def create_app() -> FastAPI:
+    # Same nesting as server.py: feature router -> api_router -> app
+    router = APIRouter(prefix="/things", route_class=TimedRoute)
+
+    @router.get("/")
+    async def list_things():
+        await asyncio.sleep(HANDLER_SECONDS)
+        return []
+
+    api_router = APIRouter(prefix="/api")
+    api_router.include_router(router)
+    app = FastAPI()
+    app.include_router(api_router)
+    app.add_middleware(RequestStatsMiddleware)
+    return app
+
+def test_nested_routes_are_timed_once():
+    app = create_app()
+    route = next(route for route in app.routes if getattr(route, "path", None) == "/api/things/")
+
+    assert route.endpoint.request_timed
+    assert not getattr(route.endpoint.__wrapped__, "request_timed", False)
+
+def test_handler_time_stays_within_total():
+    with TestClient(create_app()) as client:
+        response = client.get("/api/things/")
+
+    timings = server_timing(response)
+    assert response.status_code == 200
+    assert timings["app"] <= timings["total"]
+    assert timings["app"] >= HANDLER_SECONDS * 1000 * 0.9
+    assert timings["app"] + timings["ser"] <= timings["total"] + 0.01
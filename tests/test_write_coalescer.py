@@ -0,0 +1,140 @@
+"""
+Group commit of message inserts: every caller gets the id of its own
+message, and a partially failed insert_many only fails the callers whose
+messages were rejected.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from backend.utils import write_coalescer
+from backend.utils.write_coalescer import MessageWriteCoalescer
+
+from .conftest import FakeCollection, FakeDatabase
+
+SENT_AT = datetime(2025, 6, 1, 12, 0, 0)
+
+def message(chat_id, content, offset_ms=0):
+    return {
+        "chat_id": chat_id,
+        "sender_id": "sender",
+        "content": content,
+        "timestamp": SENT_AT + timedelta(milliseconds=offset_ms),
+    }
+
+def chat_filter(chat_id):
+    return {"_id": ObjectId(chat_id)}
+
+CHAT_A = "665b1a2f9c1e4a0000000001"
+CHAT_B = "665b1a2f9c1e4a0000000002"
+
+@pytest.fixture(autouse=True)
+def coalescing_enabled(monkeypatch):
+    monkeypatch.setattr(write_coalescer, "MESSAGE_WRITE_COALESCING", True)
+
+def test_each_caller_gets_its_own_message_id(run):
+    db = FakeDatabase()
+
+    async def scenario():
+        coalescer = MessageWriteCoalescer(window_ms=20, max_docs=64)
+        coalescer.start(db)
+        ids = await asyncio.gather(
+            coalescer.insert(message(CHAT_A, "a1", 0), chat_filter(CHAT_A)),
+            coalescer.insert(message(CHAT_B, "b1", 1), chat_filter(CHAT_B)),
+            coalescer.insert(message(CHAT_A, "a2", 2), chat_filter(CHAT_A)),
+        )
+        await coalescer.stop()
+        return ids
+
+    ids = run(scenario())
+
+    assert len(db.messages.inserts) == 1
+    written = db.messages.inserts[0]
+    assert [document["content"] for document in written] == ["a1", "b1", "a2"]
+    assert ids == [str(document["_id"]) for document in written]
+
+    # One chat update per chat, pointing at its newest message
+    (updates,) = db.chats.bulk_writes
+    last_messages = {str(update._filter["_id"]): update._doc["$set"]["last_message_id"] for update in updates}
+    assert last_messages == {CHAT_A: ids[2], CHAT_B: ids[1]}
+
+def test_full_batch_is_written_without_waiting_for_the_window(run):
+    db = FakeDatabase()
+
+    async def scenario():
+        coalescer = MessageWriteCoalescer(window_ms=60_000, max_docs=2)
+        coalescer.start(db)
+        ids = await asyncio.wait_for(asyncio.gather(
+            coalescer.insert(message(CHAT_A, "a1"), chat_filter(CHAT_A)),
+            coalescer.insert(message(CHAT_A, "a2", 1), chat_filter(CHAT_A)),
+        ), timeout=1)
+        await coalescer.stop()
+        return ids
+
+    assert len(run(scenario())) == 2
+    assert [len(batch) for batch in db.messages.inserts] == [2]
+
+def test_partial_bulk_write_error_fails_only_rejected_messages(run):
+    db = FakeDatabase(messages=FakeCollection(fail_indexes=[1]))
+
+    async def scenario():
+        coalescer = MessageWriteCoalescer(window_ms=20, max_docs=64)
+        coalescer.start(db)
+        results = await asyncio.gather(
+            coalescer.insert(message(CHAT_A, "a1", 0), chat_filter(CHAT_A)),
+            coalescer.insert(message(CHAT_A, "a2", 1), chat_filter(CHAT_A)),
+            coalescer.insert(message(CHAT_B, "b1", 2), chat_filter(CHAT_B)),
+            return_exceptions=True,
+        )
+        await coalescer.stop()
+        return results
+
+    first, second, third = run(scenario())
+    written = db.messages.inserts[0]
+
+    assert first == str(written[0]["_id"])
+    assert isinstance(second, RuntimeError)
+    assert "duplicate key 1" in str(second)
+    assert third == str(written[2]["_id"])
+
+    # The rejected message is newer, but the chat points at the stored one
+    (updates,) = db.chats.bulk_writes
+    last_messages = {str(update._filter["_id"]): update._doc["$set"]["last_message_id"] for update in updates}
+    assert last_messages == {CHAT_A: first, CHAT_B: third}
+
+def test_failed_insert_fails_every_caller_in_the_batch(run):
+    db = FakeDatabase(messages=FakeCollection(error=ConnectionError("primary stepped down")))
+
+    async def scenario():
+        coalescer = MessageWriteCoalescer(window_ms=20, max_docs=64)
+        coalescer.start(db)
+        results = await asyncio.gather(
+            coalescer.insert(message(CHAT_A, "a1"), chat_filter(CHAT_A)),
+            coalescer.insert(message(CHAT_B, "b1", 1), chat_filter(CHAT_B)),
+            return_exceptions=True,
+        )
+        await coalescer.stop()
+        return results
+
+    results = run(scenario())
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert db.chats.bulk_writes == []
+
+def test_stop_writes_queued_messages(run):
+    db = FakeDatabase()
+
+    async def scenario():
+        coalescer = MessageWriteCoalescer(window_ms=60_000, max_docs=64)
+        coalescer.start(db)
+        pending = asyncio.ensure_future(coalescer.insert(message(CHAT_A, "a1"), chat_filter(CHAT_A)))
+        await asyncio.sleep(0)
+        await coalescer.stop()
+        return await pending, coalescer.enabled
+
+    message_id, enabled = run(scenario())
+
+    assert message_id == str(db.messages.inserts[0][0]["_id"])
+    assert not enabled